@@ -0,0 +1,189 @@
+"""Replay a recorded Modbus trace against the simulated fancoil server.
+
+Starts the simulator seeded with the values the traced units first reported,
+issues the traced requests through ModbusHost at their recorded pace and
+reports the values that differ from the trace, the wire latency of both runs
+and the latency of the replayed requests including queueing and pacing.
+
+    python -m benchmarks.replay fischer_fancoil_192.168.1.10_502.trace
+"""
+
+import argparse
+import asyncio
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.run_benchmark import _async_wait_for_port, _free_port, _percentile
+from custom_components.fischer_fancoil.modbus_host import ModbusHost
+from custom_components.fischer_fancoil.register_cache import RegisterCache
+from custom_components.fischer_fancoil.trace import (
+    ERROR_NONE,
+    MAX_TRACE_VALUES,
+    READ_FUNCTION_CODES,
+    read_trace,
+)
+
+
+def _request(modbus_host, record):
+    """Return the ModbusHost call replaying a traced request."""
+    unit_id, address, count, values = (
+        record.unit_id,
+        record.address,
+        record.count,
+        record.values,
+    )
+    if record.function_code == 1:
+        return modbus_host.async_read_coils(unit_id, address, count)
+    if record.function_code == 3:
+        return modbus_host.async_read_holding_registers(unit_id, address, count)
+    if record.function_code == 4:
+        return modbus_host.async_read_input_registers(unit_id, address, count)
+    if record.function_code == 5:
+        return modbus_host.async_write_coil(unit_id, address, bool(values[0]))
+    if record.function_code == 6:
+        return modbus_host.async_write_register(unit_id, address, values[0])
+    if record.function_code == 15:
+        return modbus_host.async_write_coils(
+            unit_id, address, [bool(value) for value in values]
+        )
+    return modbus_host.async_write_registers(unit_id, address, list(values))
+
+
+def _replayable(record):
+    """Return whether a traced request can be replayed."""
+    if record.function_code in READ_FUNCTION_CODES:
+        return True
+    # The values of long writes are truncated in the trace
+    return (
+        record.function_code in (5, 6, 15, 16)
+        and record.count <= MAX_TRACE_VALUES
+        and len(record.values) == record.count
+    )
+
+
+async def async_replay(port, records, speed=1.0):
+    """Replay the records and return the results."""
+    modbus_host = ModbusHost("127.0.0.1", port)
+    # Replayed reads go to the bus like the traced ones did
+    modbus_host.cache = RegisterCache(default_ttl=0)
+    # The replayed requests are traced too, to compare their wire times
+    trace_file = tempfile.NamedTemporaryFile(suffix=".trace")
+    modbus_host.set_trace(trace_file.name, len(records))
+    latencies = []
+    mismatches = 0
+    errors = 0
+
+    async def replay(record):
+        nonlocal mismatches, errors
+        start = time.monotonic()
+        result = await _request(modbus_host, record)
+        latencies.append(time.monotonic() - start)
+        if not result:
+            errors += 1
+        elif (
+            record.function_code in READ_FUNCTION_CODES
+            and record.error == ERROR_NONE
+            and [int(value) for value in result[: len(record.values)]]
+            != list(record.values)
+        ):
+            mismatches += 1
+
+    start = time.monotonic()
+    if speed > 0:
+        # Requests are issued at their recorded offsets, overlapping like the
+        # traced ones did
+        first = records[0].timestamp
+        tasks = []
+        for record in records:
+            delay = (record.timestamp - first) / speed - (time.monotonic() - start)
+            if delay > 0:
+                await asyncio.sleep(delay)
+            tasks.append(asyncio.create_task(replay(record)))
+        await asyncio.gather(*tasks)
+    else:
+        for record in records:
+            await replay(record)
+    elapsed = time.monotonic() - start
+    await modbus_host.async_disconnect()
+    modbus_host.set_trace(None)
+    replayed = [record.latency for record in read_trace(trace_file.name)]
+    trace_file.close()
+
+    recorded = [record.latency for record in records]
+    return {
+        "replayed": len(records),
+        "mismatches": mismatches,
+        "recorded_errors": sum(record.error != ERROR_NONE for record in records),
+        "replayed_errors": errors,
+        "recorded_p50_ms": _percentile(recorded, 50) * 1000,
+        "recorded_p95_ms": _percentile(recorded, 95) * 1000,
+        "replayed_p50_ms": _percentile(replayed, 50) * 1000,
+        "replayed_p95_ms": _percentile(replayed, 95) * 1000,
+        "request_p95_ms": _percentile(latencies, 95) * 1000,
+        "elapsed_s": elapsed,
+    }
+
+
+def run(path, speed=1.0, latency=None):
+    """Replay a trace file against the simulator and return the results."""
+    records = [record for record in read_trace(path) if _replayable(record)]
+    if not records:
+        raise ValueError(f"No replayable requests in {path}")
+    if latency is None:
+        # The simulator answers like the traced units did on average
+        latency = statistics.median(
+            record.latency for record in records if record.error == ERROR_NONE
+        )
+
+    port = _free_port()
+    command = [
+        sys.executable,
+        "-m",
+        "benchmarks.simulator",
+        "--port",
+        str(port),
+        "--latency",
+        str(latency),
+        "--trace",
+        path,
+    ]
+    simulator = subprocess.Popen(command)
+    try:
+        asyncio.run(_async_wait_for_port(port))
+        return asyncio.run(async_replay(port, records, speed))
+    finally:
+        simulator.terminate()
+        simulator.wait()
+
+
+def main():
+    """Replay a trace from the command line."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("trace")
+    parser.add_argument(
+        "--speed",
+        type=float,
+        default=1.0,
+        help="replay speed factor, 0 replays as fast as possible",
+    )
+    parser.add_argument(
+        "--latency",
+        type=float,
+        help="simulator latency in seconds, defaults to the traced median",
+    )
+    args = parser.parse_args()
+
+    results = run(args.trace, args.speed, args.latency)
+    for name, value in results.items():
+        print(
+            f"{name:>20} {value:.2f}"
+            if isinstance(value, float)
+            else f"{name:>20} {value}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+"""Benchmark the integration against the simulated fancoil server.
+
+Starts the simulator for a growing number of units, refreshes every unit
+through ModbusHost the way the coordinators do, and reports the refresh
+latency, the transactions per second and the bus lock contention.
+
+    python -m benchmarks.run_benchmark --units 1 5 10 20 --latency 0.01
+"""
+
+import argparse
+import asyncio
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+from custom_components.fischer_fancoil.coordinator import async_fetch_unit
+from custom_components.fischer_fancoil.modbus_host import ModbusHost
+from custom_components.fischer_fancoil.register_cache import RegisterCache
+
+
+def _free_port():
+    """Return a free TCP port on localhost."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def _async_wait_for_port(port, timeout=10.0):
+    """Wait until the simulator accepts connections."""
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            _, writer = await asyncio.open_connection("127.0.0.1", port)
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+            await asyncio.sleep(0.1)
+        else:
+            writer.close()
+            return
+
+
+def _percentile(values, percentile):
+    """Return a percentile of the values."""
+    if len(values) < 2:
+        return values[0] if values else None
+    return statistics.quantiles(values, n=100)[percentile - 1]
+
+
+async def async_benchmark(port, unit_ids, rounds, cache_ttl=0, pipeline_depth=1):
+    """Refresh every unit for a number of rounds and return the results."""
+    modbus_host = ModbusHost("127.0.0.1", port, pipeline_depth=pipeline_depth)
+    modbus_host.cache = RegisterCache(default_ttl=cache_ttl)
+    latencies = []
+    failed = 0
+
+    async def refresh(unit_id):
+        nonlocal failed
+        start = time.monotonic()
+        data = await async_fetch_unit(modbus_host, unit_id)
+        latencies.append(time.monotonic() - start)
+        if not data:
+            failed += 1
+
+    # Every unit is refreshed concurrently, like the entities of all config
+    # entries sharing the host did on each poll tick
+    start = time.monotonic()
+    for _ in range(rounds):
+        await asyncio.gather(*(refresh(unit_id) for unit_id in unit_ids))
+    elapsed = time.monotonic() - start
+    await modbus_host.async_disconnect()
+
+    stats = modbus_host.metrics.host
+    return {
+        "units": len(unit_ids),
+        "refresh_p50_ms": _percentile(latencies, 50) * 1000,
+        "refresh_p95_ms": _percentile(latencies, 95) * 1000,
+        "transactions_per_s": stats.requests / elapsed,
+        "lock_wait_mean_ms": (stats.lock_wait.mean or 0) * 1000,
+        "lock_wait_max_ms": stats.lock_wait.max * 1000,
+        "failed_refreshes": failed,
+    }
+
+
+def run(
+    unit_counts,
+    rounds,
+    latency,
+    error_rate,
+    cache_ttl=0,
+    pipeline_depth=1,
+    independent_units=False,
+):
+    """Run the benchmark for each unit count and return the results."""
+    results = []
+    for units in unit_counts:
+        port = _free_port()
+        command = [
+            sys.executable,
+            "-m",
+            "benchmarks.simulator",
+            "--port",
+            str(port),
+            "--units",
+            str(units),
+            "--latency",
+            str(latency),
+            "--error-rate",
+            str(error_rate),
+        ]
+        if independent_units:
+            command.append("--independent-units")
+        simulator = subprocess.Popen(command)
+        try:
+            asyncio.run(_async_wait_for_port(port))
+            results.append(
+                asyncio.run(
+                    async_benchmark(
+                        port, range(1, units + 1), rounds, cache_ttl, pipeline_depth
+                    )
+                )
+            )
+        finally:
+            simulator.terminate()
+            simulator.wait()
+    return results
+
+
+def main():
+    """Run the benchmark from the command line."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--units", type=int, nargs="+", default=[1, 5, 10, 20])
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--latency", type=float, default=0.01, help="seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--cache-ttl", type=float, default=0.0, help="seconds")
+    parser.add_argument("--pipeline-depth", type=int, default=1)
+    parser.add_argument(
+        "--independent-units",
+        action="store_true",
+        help="let the simulator answer different units concurrently",
+    )
+    args = parser.parse_args()
+
+    results = run(
+        args.units,
+        args.rounds,
+        args.latency,
+        args.error_rate,
+        args.cache_ttl,
+        args.pipeline_depth,
+        args.independent_units,
+    )
+    columns = list(results[0])
+    print(" ".join(f"{column:>20}" for column in columns))
+    for result in results:
+        print(
+            " ".join(
+                (
+                    f"{result[column]:>20.1f}"
+                    if isinstance(result[column], float)
+                    else f"{result[column]:>20}"
+                )
+                for column in columns
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,256 @@
+"""Simulated Fischer fancoil Modbus server for offline benchmarks.
+
+Serves the register map of the integration for a range of unit IDs. Every
+datastore access is delayed by the configured latency and a share of the
+requests is answered with an exception response.
+
+    python -m benchmarks.simulator --port 5020 --units 20 --latency 0.02
+
+To serve RTU frames on a serial line without hardware, link two ptys with
+socat, serve one end and point the integration at the other:
+
+    socat -d -d pty,raw,echo=0,link=/tmp/fancoil-sim pty,raw,echo=0,link=/tmp/fancoil
+    python -m benchmarks.simulator --serial /tmp/fancoil-sim --baudrate 9600
+
+With --trace the simulator serves the units of a captured trace, seeded with
+the values they first reported.
+"""
+
+import argparse
+import asyncio
+import logging
+import random
+
+from pymodbus import Framer
+from pymodbus.datastore import (
+    ModbusSequentialDataBlock,
+    ModbusServerContext,
+    ModbusSlaveContext,
+)
+from pymodbus.server import StartAsyncSerialServer, StartAsyncTcpServer
+
+from custom_components.fischer_fancoil.const import (
+    DEFAULT_BAUDRATE,
+    REGISTER_COIL_TEMP,
+    REGISTER_FAN_SPEED,
+    REGISTER_INDOOR_TEMP,
+    REGISTER_OPMODE,
+    REGISTER_POWER,
+    REGISTER_SET_TEMP,
+)
+from custom_components.fischer_fancoil.trace import (
+    ERROR_NONE,
+    READ_FUNCTION_CODES,
+    read_trace,
+)
+
+TABLE_SIZE = 128
+
+
+def _encode_bcd(value):
+    """Encode a value as BCD."""
+    return int(str(value), 16)
+
+
+class FancoilUnitContext(ModbusSlaveContext):
+    """Datastore of a fancoil unit with injected latency and errors.
+
+    All units of a simulator share one bus lock, so like on a serial bus the
+    datastore accesses of different units are served one at a time.
+    """
+
+    def __init__(self, bus_lock, latency, error_rate, **kwargs) -> None:
+        """Initialize the unit context."""
+        super().__init__(**kwargs)
+        self._bus_lock = bus_lock
+        self._latency = latency
+        self._error_rate = error_rate
+
+    def validate(self, fc_as_hex, address, count=1):
+        """Validate a request, answering with an error for injected failures."""
+        if self._error_rate and random.random() < self._error_rate:
+            return False
+        return super().validate(fc_as_hex, address, count)
+
+    async def async_getValues(self, fc_as_hex, address, count=1):
+        """Read values after the injected latency."""
+        async with self._bus_lock:
+            await asyncio.sleep(self._latency)
+        return self.getValues(fc_as_hex, address, count)
+
+    async def async_setValues(self, fc_as_hex, address, values):
+        """Write values after the injected latency."""
+        async with self._bus_lock:
+            await asyncio.sleep(self._latency)
+        self.setValues(fc_as_hex, address, values)
+
+
+def trace_seed(records):
+    """Return the values each unit of a trace first reported.
+
+    Maps unit IDs to {(function code, address): value}. Addresses written
+    before they were first read are left out, the replayed write sets them.
+    """
+    seed = {}
+    written = set()
+    # Function codes of the reads of the table a write function code writes
+    read_codes = {5: 1, 15: 1, 6: 3, 16: 3}
+    for record in records:
+        if record.function_code in read_codes:
+            table = read_codes[record.function_code]
+            for offset in range(record.count):
+                written.add((record.unit_id, table, record.address + offset))
+            continue
+        if record.function_code not in READ_FUNCTION_CODES:
+            continue
+        if record.error != ERROR_NONE:
+            continue
+        values = seed.setdefault(record.unit_id, {})
+        for offset, value in enumerate(record.values):
+            key = (record.function_code, record.address + offset)
+            if (record.unit_id, *key) not in written:
+                values.setdefault(key, value)
+    return seed
+
+
+def build_unit_context(bus_lock, latency=0.0, error_rate=0.0, seed=None):
+    """Build the datastore of a single fancoil unit."""
+    coils = [False] * TABLE_SIZE
+    coils[REGISTER_POWER] = True
+
+    holding = [0] * TABLE_SIZE
+    holding[REGISTER_SET_TEMP] = 22
+    holding[REGISTER_FAN_SPEED] = 3
+    holding[REGISTER_OPMODE] = 1
+
+    inputs = [0] * TABLE_SIZE
+    inputs[REGISTER_INDOOR_TEMP] = _encode_bcd(24)
+    inputs[REGISTER_COIL_TEMP] = _encode_bcd(12)
+
+    tables = {1: coils, 3: holding, 4: inputs}
+    for (function_code, address), value in (seed or {}).items():
+        tables[function_code][address] = bool(value) if function_code == 1 else value
+
+    return FancoilUnitContext(
+        bus_lock,
+        latency,
+        error_rate,
+        di=ModbusSequentialDataBlock(0, [False] * TABLE_SIZE),
+        co=ModbusSequentialDataBlock(0, coils),
+        hr=ModbusSequentialDataBlock(0, holding),
+        ir=ModbusSequentialDataBlock(0, inputs),
+        zero_mode=True,
+    )
+
+
+def build_context(unit_ids, latency=0.0, error_rate=0.0, shared_bus=True, seed=None):
+    """Build the server context for the given unit IDs.
+
+    Without a shared bus every unit answers independently, like the devices
+    behind a Modbus TCP gateway that handles concurrent transactions.
+    """
+    bus_lock = asyncio.Lock()
+    return ModbusServerContext(
+        slaves={
+            unit_id: build_unit_context(
+                bus_lock if shared_bus else asyncio.Lock(),
+                latency,
+                error_rate,
+                (seed or {}).get(unit_id),
+            )
+            for unit_id in unit_ids
+        },
+        single=False,
+    )
+
+
+async def async_serve(
+    host,
+    port,
+    unit_ids,
+    latency=0.0,
+    error_rate=0.0,
+    shared_bus=True,
+    rtu=False,
+    seed=None,
+):
+    """Serve the simulated fancoils until cancelled.
+
+    With rtu set, the server speaks RTU frames over TCP like a transparent
+    serial gateway.
+    """
+    await StartAsyncTcpServer(
+        context=build_context(unit_ids, latency, error_rate, shared_bus, seed),
+        address=(host, port),
+        framer=Framer.RTU if rtu else Framer.SOCKET,
+        broadcast_enable=True,
+        # Absent units stay silent like on a serial bus
+        ignore_missing_slaves=True,
+    )
+
+
+async def async_serve_serial(
+    device,
+    unit_ids,
+    latency=0.0,
+    error_rate=0.0,
+    baudrate=DEFAULT_BAUDRATE,
+    seed=None,
+):
+    """Serve the simulated fancoils on a serial device until cancelled."""
+    await StartAsyncSerialServer(
+        context=build_context(unit_ids, latency, error_rate, True, seed),
+        port=device,
+        baudrate=baudrate,
+        framer=Framer.RTU,
+        broadcast_enable=True,
+        # Absent units stay silent like on a serial bus
+        ignore_missing_slaves=True,
+    )
+
+
+def main():
+    """Run the simulator from the command line."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5020)
+    parser.add_argument("--units", type=int, default=1, help="number of unit IDs")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument(
+        "--independent-units",
+        action="store_true",
+        help="answer the requests of different units concurrently",
+    )
+    parser.add_argument("--rtu", action="store_true", help="serve RTU frames over TCP")
+    parser.add_argument("--serial", help="serve RTU on this serial device instead")
+    parser.add_argument("--baudrate", type=int, default=DEFAULT_BAUDRATE)
+    parser.add_argument("--trace", help="serve the units of a trace file instead")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    unit_ids = range(1, args.units + 1)
+    seed = None
+    if args.trace:
+        seed = trace_seed(read_trace(args.trace))
+        unit_ids = sorted(seed)
+    if args.serial:
+        server = async_serve_serial(
+            args.serial, unit_ids, args.latency, args.error_rate, args.baudrate, seed
+        )
+    else:
+        server = async_serve(
+            args.host,
+            args.port,
+            unit_ids,
+            args.latency,
+            args.error_rate,
+            not args.independent_units,
+            args.rtu,
+            seed,
+        )
+    asyncio.run(server)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,10 +3,34 @@
 import logging
 
 from homeassistant.config_entries import ConfigEntry  # Used for config flow setup
-from homeassistant.core import HomeAssistant
-
-from .const import CONF_HOST, CONF_PORT, DOMAIN, PLATFORMS
-from .modbus_host import ModbusHost
+from homeassistant.const import EVENT_HOMEASSISTANT_STOP
+from homeassistant.core import Event, HomeAssistant
+
+from .const import (
+    CONF_HOST,
+    CONF_MAX_POLL_INTERVAL,
+    CONF_PIPELINE_DEPTH,
+    CONF_POLL_INTERVAL,
+    CONF_POLL_TIMEOUT,
+    CONF_PORT,
+    CONF_REQUEST_TIMEOUT,
+    CONF_TEMPERATURE_DEADBAND,
+    CONF_TRACE,
+    CONF_UNIT_ID,
+    DEFAULT_MAX_POLL_INTERVAL,
+    DEFAULT_PIPELINE_DEPTH,
+    DEFAULT_POLL_INTERVAL,
+    DEFAULT_POLL_TIMEOUT,
+    DEFAULT_REQUEST_TIMEOUT,
+    DEFAULT_TEMPERATURE_DEADBAND,
+    DOMAIN,
+    PLATFORMS,
+)
+from .coordinator import FischerFancoilCoordinator
+from .host_registry import HostRegistry
+from .register_map import MEASURED_TEMPERATURE_KEYS
+from .services import async_setup_services
+from .transport import transport_options
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -17,18 +41,36 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     port = entry.data[CONF_PORT]
     host_key = f"{host}:{port}"
 
-    # Create a new ModbusHost instance if it doesn't exist
-    if host_key not in hass.data[DOMAIN]:
-        hass.data[DOMAIN][host_key] = ModbusHost(host, port)
-        _LOGGER.debug("Created ModbusHost instance for %s", host_key)
-    else:
-        _LOGGER.debug("Using existing ModbusHost instance for %s", host_key)
-
-    # Increase the subscriber count
-    hass.data[DOMAIN][host_key].add_subscriber()
-
-    # Store the ModbusHost reference in the entry data for the climate entity to use
-    hass.data[entry.entry_id] = hass.data[DOMAIN][host_key]
+    pipeline_depth = entry.options.get(CONF_PIPELINE_DEPTH, DEFAULT_PIPELINE_DEPTH)
+    modbus_host = hass.data[DOMAIN].acquire(
+        host_key,
+        host,
+        port,
+        pipeline_depth=pipeline_depth,
+        **transport_options(entry.data),
+    )
+    temperature_deadband = entry.options.get(
+        CONF_TEMPERATURE_DEADBAND, DEFAULT_TEMPERATURE_DEADBAND
+    )
+
+    # One coordinator per unit polls the registers for all of its entities
+    coordinator = FischerFancoilCoordinator(
+        hass,
+        entry,
+        modbus_host,
+        entry.data[CONF_UNIT_ID],
+        entry.options.get(CONF_POLL_INTERVAL, DEFAULT_POLL_INTERVAL),
+        dict.fromkeys(MEASURED_TEMPERATURE_KEYS, temperature_deadband),
+        entry.options.get(CONF_MAX_POLL_INTERVAL, DEFAULT_MAX_POLL_INTERVAL),
+        entry.options.get(CONF_POLL_TIMEOUT, DEFAULT_POLL_TIMEOUT),
+    )
+    # The first poll runs in the background with those of the other units of
+    # the host, the entities start from their last known state meanwhile
+    entry.async_on_unload(coordinator.async_schedule())
+
+    # Store the coordinator reference in the entry data for the entities to use
+    hass.data[entry.entry_id] = coordinator
+    await _async_apply_host_options(hass, host_key)
 
     entry.async_on_unload(entry.add_update_listener(update_listener))
     await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
@@ -41,16 +83,58 @@ async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     unload_ok = await hass.config_entries.async_unload_platforms(entry, PLATFORMS)
 
     if unload_ok:
-        modbus_host = hass.data[DOMAIN][host_key]
-        modbus_host.remove_subscriber()
-        if modbus_host.get_subscriber_count() == 0:
-            await modbus_host.async_disconnect()
-            del hass.data[DOMAIN][host_key]
+        # The host stays connected for a while in case the entry is reloaded
+        hass.data[DOMAIN].release(host_key)
         del hass.data[entry.entry_id]
+        await _async_apply_host_options(hass, host_key)
 
     return unload_ok
 
 
+async def _async_apply_host_options(hass: HomeAssistant, host_key: str) -> None:
+    """Apply the options of the entries on a host that set up the whole host."""
+    modbus_host = hass.data[DOMAIN].get(host_key)
+    if modbus_host is None:
+        return
+    options = [
+        entry.options
+        for entry in hass.config_entries.async_entries(DOMAIN)
+        if f"{entry.data[CONF_HOST]}:{entry.data[CONF_PORT]}" == host_key
+        and entry.entry_id in hass.data
+    ]
+
+    # Pipelining is opt-in per gateway, so any entry may deepen the pipeline
+    modbus_host.set_pipeline_depth(
+        max(
+            (
+                entry_options.get(CONF_PIPELINE_DEPTH, DEFAULT_PIPELINE_DEPTH)
+                for entry_options in options
+            ),
+            default=DEFAULT_PIPELINE_DEPTH,
+        )
+    )
+    # A request waits as long as the most patient entry allows, so the
+    # slowest unit of the host is not abandoned early
+    modbus_host.set_request_timeout(
+        max(
+            (
+                entry_options.get(CONF_REQUEST_TIMEOUT, DEFAULT_REQUEST_TIMEOUT)
+                for entry_options in options
+            ),
+            default=DEFAULT_REQUEST_TIMEOUT,
+        )
+    )
+
+    # The host is traced while any of its entries enables tracing, to a file
+    # per host in the configuration directory
+    trace_path = None
+    if any(entry_options.get(CONF_TRACE, False) for entry_options in options):
+        trace_path = hass.config.path(
+            f"{DOMAIN}_{host_key.replace('/', '_').replace(':', '_')}.trace"
+        )
+    await hass.async_add_executor_job(modbus_host.set_trace, trace_path)
+
+
 async def update_listener(hass: HomeAssistant, entry: ConfigEntry) -> None:
     """Handle options update."""
     await hass.config_entries.async_reload(entry.entry_id)
@@ -58,5 +142,12 @@ async def update_listener(hass: HomeAssistant, entry: ConfigEntry) -> None:
 
 async def async_setup(hass: HomeAssistant, config: dict) -> bool:
     """Set up the Fischer Fancoil component."""
-    hass.data[DOMAIN] = {}
+    # A scan in the config flow may have created the registry already
+    registry = hass.data.setdefault(DOMAIN, HostRegistry(hass))
+
+    async def async_close_hosts(event: Event) -> None:
+        await registry.async_close_all()
+
+    hass.bus.async_listen_once(EVENT_HOMEASSISTANT_STOP, async_close_hosts)
+    async_setup_services(hass)
     return True
@@ -4,12 +4,15 @@ import asyncio
 import logging
 
 from homeassistant.components.climate import (
+    ATTR_CURRENT_TEMPERATURE,
+    ATTR_FAN_MODE,
+    ATTR_SWING_MODE,
     ClimateEntity,
     ClimateEntityFeature,
     HVACMode,
 )
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.const import PRECISION_WHOLE, UnitOfTemperature
+from homeassistant.const import ATTR_TEMPERATURE, PRECISION_WHOLE, UnitOfTemperature
 from homeassistant.core import HomeAssistant
 from homeassistant.helpers.entity import DeviceInfo
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
@@ -17,14 +20,19 @@ from homeassistant.helpers.entity_platform import AddEntitiesCallback
 from .const import (
     CONF_NAME,
     CONF_UNIT_ID,
+    DATA_FAN_SPEED,
+    DATA_INDOOR_TEMP,
+    DATA_OPMODE,
+    DATA_POWER,
+    DATA_SET_TEMP,
+    DATA_SWING,
     DOMAIN,
-    REGISTER_FAN_SPEED,
-    REGISTER_INDOOR_TEMP,
-    REGISTER_OPMODE,
     REGISTER_POWER,
-    REGISTER_SET_TEMP,
-    REGISTER_SWING,
+    TABLE_COIL,
 )
+from .entity import FischerFancoilEntity
+from .priority import PRIORITY_COMMAND
+from .register_map import COMPILED_REGISTER_MAP
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -38,7 +46,7 @@ async def async_setup_entry(
     async_add_entities: AddEntitiesCallback,
 ) -> None:
     """Set up Fishcer Fancoil climate entity from a config entry."""
-    modbus_host = hass.data[entry.entry_id]
+    coordinator = hass.data[entry.entry_id]
     unit_id = entry.data[CONF_UNIT_ID]
     name = entry.data[CONF_NAME]
 
@@ -49,19 +57,31 @@ async def async_setup_entry(
         model="Fancoil",
     )
 
-    device = FischerFancoil(name, modbus_host, unit_id, device_info)
-    async_add_entities([device], update_before_add=True)
+    device = FischerFancoil(name, coordinator, unit_id, device_info)
+    async_add_entities([device])
 
     # async_add_entities([ModbusFancoil(name, hub, unit_id, device_info)])
 
 
-class FischerFancoil(ClimateEntity):
+class FischerFancoil(FischerFancoilEntity, ClimateEntity):
     """Representation of a Fischer Fancoil climate entity."""
 
-    def __init__(self, name, modbus_host, unit_id, device_info) -> None:
+    _point_keys = frozenset(
+        {
+            DATA_FAN_SPEED,
+            DATA_INDOOR_TEMP,
+            DATA_OPMODE,
+            DATA_POWER,
+            DATA_SET_TEMP,
+            DATA_SWING,
+        }
+    )
+
+    def __init__(self, name, coordinator, unit_id, device_info) -> None:
         """Initialize the fancoil entity."""
+        super().__init__(coordinator)
         self._name = name
-        self._modbus = modbus_host
+        self._modbus = coordinator.modbus_host
         self._unit_id = unit_id
         self._unique_id = f"{name}:{unit_id}"
 
@@ -71,9 +91,14 @@ class FischerFancoil(ClimateEntity):
         self._current_temperature = None
         self._fan_mode = "low"
         self._swing_mode = False
+        # Number of writes of each point, to tell superseded writes apart
+        self._write_serials = {}
         self._attr_device_info = device_info
         _LOGGER.debug("Creating ModbusFancoil entity: %s, unit ID: %s", name, unit_id)
 
+        if coordinator.data:
+            self._update_from_data(coordinator.data)
+
     @property
     def name(self):
         """Return the name of the fancoil."""
@@ -171,34 +196,42 @@ class FischerFancoil(ClimateEntity):
 
     async def async_set_hvac_mode(self, hvac_mode):
         """Set the HVAC mode."""
-        mode_value = {
-            HVACMode.AUTO: 0,
-            HVACMode.COOL: 1,
-            HVACMode.DRY: 2,
-            HVACMode.HEAT: 3,
-            HVACMode.FAN_ONLY: 4,
-            HVACMode.OFF: 5,
-        }.get(hvac_mode, 0)
-
         _LOGGER.debug("Setting HVAC mode to %s", hvac_mode)
+        if self._power_state is None or not self.coordinator.data:
+            # No poll succeeded yet, the power state is needed to pick the writes
+            self._power_state = await self._modbus.async_read_cached(
+                self._unit_id, TABLE_COIL, REGISTER_POWER, PRIORITY_COMMAND
+            )
+
+        previous_power, previous_mode = self._power_state, self._hvac_mode
+        writes = {}
 
         # Set fancoil power state based on HVAC mode
         if hvac_mode != HVACMode.OFF and not self._power_state:
-            await self.async_turn_on()
-            await asyncio.sleep(0.30)  # Sleep for 300ms
+            writes[DATA_POWER] = self._async_write_point(DATA_POWER, True)
+            self._power_state = True
         elif hvac_mode == HVACMode.OFF and self._power_state:
-            await self.async_turn_off()
-            await asyncio.sleep(0.30)  # Sleep for 300ms
+            writes[DATA_POWER] = self._async_write_point(DATA_POWER, False)
+            self._power_state = False
 
         # If the HVAC mode is changing, update the fancoil
         if self._hvac_mode != hvac_mode:
-            success = await self._modbus.async_write_register(
-                self._unit_id, REGISTER_OPMODE, int(mode_value)
-            )
-            if success:
-                self._hvac_mode = hvac_mode
-            else:
-                _LOGGER.error("Error setting HVAC mode to %s", hvac_mode)
+            writes[DATA_OPMODE] = self._async_write_point(DATA_OPMODE, hvac_mode)
+            self._hvac_mode = hvac_mode
+
+        if not writes:
+            return
+        self.async_write_ha_state()
+        results = dict(zip(writes, await asyncio.gather(*writes.values())))
+        if all(results.values()):
+            return
+        _LOGGER.error("Error setting HVAC mode to %s", hvac_mode)
+        # Only roll back the writes that failed, the others took effect
+        if not results.get(DATA_POWER, True):
+            self._power_state = previous_power
+        if not results.get(DATA_OPMODE, True):
+            self._hvac_mode = previous_mode
+        self.async_write_ha_state()
 
     async def async_set_temperature(self, **kwargs):
         """Set the target temperature."""
@@ -206,149 +239,152 @@ class FischerFancoil(ClimateEntity):
         if temperature is not None:
             temperature = round(temperature)
             _LOGGER.debug("Setting target temperature to %s", temperature)
-            success = await self._modbus.async_write_register(
-                self._unit_id, REGISTER_SET_TEMP, int(temperature)
-            )
-            if success:
-                self._target_temperature = temperature
-            else:
+            previous = self._target_temperature
+            self._target_temperature = temperature
+            self.async_write_ha_state()
+
+            success = await self._async_write_point(DATA_SET_TEMP, temperature)
+            if not success:
                 _LOGGER.error("Error setting target temperature to %s", temperature)
+                self._target_temperature = previous
+                self.async_write_ha_state()
 
     async def async_set_fan_mode(self, fan_mode):
         """Set the fan mode."""
-        fan_value = {"auto": 0, "high": 1, "medium": 2, "low": 3}.get(fan_mode, 0)
-
         _LOGGER.debug("Setting fan mode to %s", fan_mode)
-        success = await self._modbus.async_write_register(
-            self._unit_id, REGISTER_FAN_SPEED, fan_value
-        )
-        if success:
-            self._fan_mode = fan_mode
-        else:
+        previous = self._fan_mode
+        self._fan_mode = fan_mode
+        self.async_write_ha_state()
+
+        success = await self._async_write_point(DATA_FAN_SPEED, fan_mode)
+        if not success:
             _LOGGER.error("Error setting fan mode to %s", fan_mode)
+            self._fan_mode = previous
+            self.async_write_ha_state()
 
     async def async_turn_on(self):
         """Turn on the fancoil."""
-        try:
-            _LOGGER.debug("Turning on fancoil")
-            await self._modbus.async_write_coil(self._unit_id, REGISTER_POWER, True)
-            self._power_state = True
-        except Exception as e:
-            _LOGGER.error("Error turning on fancoil: %s", str(e))
+        _LOGGER.debug("Turning on fancoil")
+        await self._async_set_power(True)
 
     async def async_turn_off(self):
         """Turn off the fancoil."""
-        try:
-            _LOGGER.debug("Turning off fancoil")
-            await self._modbus.async_write_coil(self._unit_id, REGISTER_POWER, False)
-            self._power_state = False
-        except Exception as e:
-            _LOGGER.error("Error turning off fancoil: %s", str(e))
+        _LOGGER.debug("Turning off fancoil")
+        await self._async_set_power(False)
+
+    async def _async_set_power(self, power):
+        """Switch the fancoil on or off."""
+        previous = self._power_state
+        self._power_state = power
+        self.async_write_ha_state()
+
+        success = await self._async_write_point(DATA_POWER, power)
+        if not success:
+            _LOGGER.error("Error turning %s fancoil", "on" if power else "off")
+            self._power_state = previous
+            self.async_write_ha_state()
 
     async def async_set_swing_mode(self, swing_mode):
         """Set the swing mode."""
-        mode_value = {"off": False, "on": True}.get(swing_mode, False)
         _LOGGER.debug("Setting swing mode to %s", swing_mode)
-        success = await self._modbus.async_write_coil(
-            self._unit_id, REGISTER_SWING, mode_value
-        )
-        if success:
-            self._swing_mode = swing_mode
-        else:
-            _LOGGER.error("Error setting swing mode to %s", swing_mode)
+        previous = self._swing_mode
+        self._swing_mode = swing_mode
+        self.async_write_ha_state()
 
-    async def async_update(self):
-        """Update the state of the climate entity."""
+        success = await self._async_write_point(DATA_SWING, swing_mode)
+        if not success:
+            _LOGGER.error("Error setting swing mode to %s", swing_mode)
+            self._swing_mode = previous
+            self.async_write_ha_state()
+
+    async def _async_write_point(self, key, value):
+        """Write a register map point and verify it by reading it back.
+
+        Returns False if the write failed or the fancoil reads back another
+        value, so the caller rolls back its optimistic state. A write that a
+        later write of the same point superseded, like the steps of a slider
+        drag, is left to the later write and returns True.
+        """
+        serial = self._write_serials[key] = self._write_serials.get(key, 0) + 1
+        point = COMPILED_REGISTER_MAP.points[key]
+        # Resync with the next poll even if the written point reads unchanged
+        self._optimistic = True
+        self._written[key] = value
+        self.coordinator.async_note_write()
         try:
-            # Read current temperature (input register 73, BCD)
-            current_temp = await self._modbus.async_read_input_registers(
-                self._unit_id, REGISTER_INDOOR_TEMP, 1
-            )
-            if current_temp is not None and len(current_temp) == 1:
-                self._current_temperature = self._decode_bcd(current_temp[0])
-            else:
-                _LOGGER.warning("Received invalid data for current temperature")
-            await asyncio.sleep(0.30)  # Sleep for 250ms
-
-            # Read target temperature
-            target_temp = await self._modbus.async_read_holding_registers(
-                self._unit_id, REGISTER_SET_TEMP, 1
+            success = await self._modbus.async_queue_write(
+                self._unit_id,
+                point.table,
+                point.address,
+                COMPILED_REGISTER_MAP.encode(key, value),
             )
-            if target_temp is not None and len(target_temp) == 1:
-                self._target_temperature = target_temp[0]
-            else:
-                _LOGGER.warning("Received invalid data for target temperature")
-            await asyncio.sleep(0.30)  # Sleep for 250ms
-
-            # Read HVAC mode
-            mode = await self._modbus.async_read_holding_registers(
-                self._unit_id, REGISTER_OPMODE, 1
-            )
-            await asyncio.sleep(0.25)
-            power = await self._modbus.async_read_coil(self._unit_id, 1)
-            if mode is not None and power is not None and len(mode) == 1:
-                self._hvac_mode = self._value_to_hvac_mode(power, mode[0])
-            else:
-                _LOGGER.error("No response to reading HVAC mode or power state")
-            await asyncio.sleep(0.30)  # Sleep for 250ms
+            if self._write_serials[key] != serial:
+                return True
+            if not success:
+                return False
+
+            verified = await self.coordinator.async_verify_write(key, value)
+            if self._write_serials[key] != serial:
+                return True
+            if verified is False:
+                _LOGGER.warning(
+                    "Fancoil unit %s did not take %s %s", self._unit_id, key, value
+                )
+            return verified is not False
+        finally:
+            if self._write_serials[key] == serial:
+                # The polls show the point again
+                del self._written[key]
+
+    def _restore_state(self, state):
+        """Show the last known state of the fancoil until its first poll."""
+        if state.state in self.hvac_modes:
+            self._power_state = state.state != HVACMode.OFF
+            if self._power_state:
+                self._hvac_mode = HVACMode(state.state)
+        attributes = state.attributes
+        self._current_temperature = attributes.get(ATTR_CURRENT_TEMPERATURE)
+        self._target_temperature = attributes.get(ATTR_TEMPERATURE)
+        self._fan_mode = attributes.get(ATTR_FAN_MODE, self._fan_mode)
+        self._swing_mode = attributes.get(ATTR_SWING_MODE, self._swing_mode)
+
+    def _update_from_data(self, data):
+        """Update the state of the climate entity from the coordinator data."""
+        if DATA_INDOOR_TEMP in data:
+            self._current_temperature = data[DATA_INDOOR_TEMP]
+        else:
+            _LOGGER.warning("Received invalid data for current temperature")
 
-            # Read fan mode
-            fan_speed = await self._modbus.async_read_holding_registers(
-                self._unit_id, REGISTER_FAN_SPEED, 1
-            )
-            if fan_speed is not None and len(fan_speed) == 1:
-                self._fan_mode = self._value_to_fan_mode(fan_speed[0])
-            else:
-                _LOGGER.error("Received invalid data for fan mode")
-            await asyncio.sleep(0.30)  # Sleep for 250ms
+        if DATA_SET_TEMP in data:
+            self._target_temperature = data[DATA_SET_TEMP]
+        else:
+            _LOGGER.warning("Received invalid data for target temperature")
 
-            # Read swing mode
-            swing_mode = await self._modbus.async_read_coil(
-                self._unit_id, REGISTER_SWING
-            )
-            if swing_mode is not None:
-                self._swing_mode = self._value_to_swing_mode(swing_mode)
+        if DATA_OPMODE in data and DATA_POWER in data:
+            self._power_state = data[DATA_POWER]
+            if self._power_state and data[DATA_OPMODE] is not None:
+                self._hvac_mode = HVACMode(data[DATA_OPMODE])
             else:
-                _LOGGER.error("Received invalid data for swing mode")
-
-        except Exception as e:
-            _LOGGER.error("Error updating ModbusFancoil state: %s", str(e))
+                self._hvac_mode = HVACMode.OFF
+        else:
+            _LOGGER.error("No response to reading HVAC mode or power state")
 
-        finally:
-            # Notify Home Assistant of the updated state
-            _LOGGER.debug(
-                "Updating ModbusFancoil state: temp=%s, target=%s, mode=%s, fan=%s, power=%s, swing mode: %s",
-                self._current_temperature,
-                self._target_temperature,
-                self._hvac_mode,
-                self._fan_mode,
-                self._power_state,
-                self._swing_mode,
-            )
+        if DATA_FAN_SPEED in data:
+            self._fan_mode = data[DATA_FAN_SPEED] or "auto"
+        else:
+            _LOGGER.error("Received invalid data for fan mode")
 
-    def _value_to_hvac_mode(self, power, mode):
-        if not power:
-            self._power_state = False
-            return HVACMode.OFF
-        self._power_state = True
-        return {
-            0: HVACMode.AUTO,
-            1: HVACMode.COOL,
-            2: HVACMode.DRY,
-            3: HVACMode.HEAT,
-            4: HVACMode.FAN_ONLY,
-        }.get(mode, HVACMode.OFF)
-
-    def _value_to_fan_mode(self, value):
-        return {0: "auto", 1: "high", 2: "medium", 3: "low"}.get(value, "auto")
-
-    def _value_to_swing_mode(self, value):
-        return {0: "off", 1: "on"}.get(value, "off")
-
-    def _decode_bcd(self, value):
-        return (
-            (value & 0xF)
-            + ((value >> 4) & 0xF) * 10
-            + ((value >> 8) & 0xF) * 100
-            + ((value >> 12) & 0xF) * 1000
+        if DATA_SWING in data:
+            self._swing_mode = data[DATA_SWING]
+        else:
+            _LOGGER.error("Received invalid data for swing mode")
+
+        _LOGGER.debug(
+            "Updating ModbusFancoil state: temp=%s, target=%s, mode=%s, fan=%s, power=%s, swing mode: %s",
+            self._current_temperature,
+            self._target_temperature,
+            self._hvac_mode,
+            self._fan_mode,
+            self._power_state,
+            self._swing_mode,
         )
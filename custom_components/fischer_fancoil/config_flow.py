@@ -9,32 +9,115 @@ from homeassistant.config_entries import ConfigFlowResult
 from homeassistant.core import callback
 
 from .const import (
+    CONF_BAUDRATE,
+    CONF_FIRST_UNIT_ID,
     CONF_HOST,
+    CONF_LAST_UNIT_ID,
+    CONF_MAX_POLL_INTERVAL,
     CONF_NAME,
+    CONF_PARITY,
+    CONF_PIPELINE_DEPTH,
     CONF_POLL_INTERVAL,
+    CONF_POLL_TIMEOUT,
     CONF_PORT,
+    CONF_REQUEST_TIMEOUT,
+    CONF_STOPBITS,
+    CONF_TEMPERATURE_DEADBAND,
+    CONF_TRACE,
+    CONF_TRANSPORT,
     CONF_UNIT_ID,
+    DEFAULT_BAUDRATE,
+    DEFAULT_MAX_POLL_INTERVAL,
+    DEFAULT_PARITY,
+    DEFAULT_PIPELINE_DEPTH,
     DEFAULT_POLL_INTERVAL,
+    DEFAULT_POLL_TIMEOUT,
+    DEFAULT_REQUEST_TIMEOUT,
+    DEFAULT_STOPBITS,
+    DEFAULT_TEMPERATURE_DEADBAND,
     DOMAIN,
+    MAX_PIPELINE_DEPTH,
+    MAX_REQUEST_TIMEOUT,
+    MAX_UNIT_ID,
+    MIN_UNIT_ID,
+    PARITIES,
+    TRANSPORT_TCP,
+    TRANSPORTS,
 )
+from .host_registry import HostRegistry
+from .scanner import async_scan_units
+from .transport import transport_options
+
+# Transport and serial line settings, the baud rate also paces RTU over TCP
+transport_schema = {
+    vol.Optional(CONF_TRANSPORT, default=TRANSPORT_TCP): vol.In(TRANSPORTS),
+    vol.Optional(CONF_BAUDRATE, default=DEFAULT_BAUDRATE): vol.All(
+        int, vol.Range(min=1200)
+    ),
+    vol.Optional(CONF_PARITY, default=DEFAULT_PARITY): vol.In(PARITIES),
+    vol.Optional(CONF_STOPBITS, default=DEFAULT_STOPBITS): vol.In([1, 2]),
+}
+
+# Unit ID 0 addresses every unit on the bus with a broadcast
+unit_id_range = vol.All(int, vol.Range(min=MIN_UNIT_ID, max=MAX_UNIT_ID))
 
 user_schema = vol.Schema(
     {
         vol.Required(CONF_NAME): str,
         vol.Required(CONF_HOST): str,
         vol.Optional(CONF_PORT, default=502): int,
-        vol.Required(CONF_UNIT_ID): int,
+        vol.Required(CONF_UNIT_ID): unit_id_range,
+        **transport_schema,
         # TODO: unique_id, entity_id, etc.
     }
 )
 
+scan_schema = vol.Schema(
+    {
+        vol.Required(CONF_NAME, default="Fancoil"): str,
+        vol.Required(CONF_HOST): str,
+        vol.Optional(CONF_PORT, default=502): int,
+        vol.Required(CONF_FIRST_UNIT_ID, default=MIN_UNIT_ID): unit_id_range,
+        vol.Required(CONF_LAST_UNIT_ID, default=32): unit_id_range,
+        **transport_schema,
+    }
+)
+
 options_schema = vol.Schema(
     {
-        vol.Optional(CONF_POLL_INTERVAL, default=DEFAULT_POLL_INTERVAL): int,
+        # The bus scheduler divides the intervals into a slot per unit
+        vol.Optional(CONF_POLL_INTERVAL, default=DEFAULT_POLL_INTERVAL): vol.All(
+            int, vol.Range(min=1)
+        ),
+        vol.Optional(
+            CONF_MAX_POLL_INTERVAL, default=DEFAULT_MAX_POLL_INTERVAL
+        ): vol.All(int, vol.Range(min=1)),
+        vol.Optional(CONF_PIPELINE_DEPTH, default=DEFAULT_PIPELINE_DEPTH): vol.All(
+            int, vol.Range(min=1, max=MAX_PIPELINE_DEPTH)
+        ),
+        vol.Optional(
+            CONF_TEMPERATURE_DEADBAND, default=DEFAULT_TEMPERATURE_DEADBAND
+        ): vol.All(vol.Coerce(float), vol.Range(min=0)),
+        vol.Optional(CONF_REQUEST_TIMEOUT, default=DEFAULT_REQUEST_TIMEOUT): vol.All(
+            vol.Coerce(float), vol.Range(min=0.1, max=MAX_REQUEST_TIMEOUT)
+        ),
+        vol.Optional(CONF_POLL_TIMEOUT, default=DEFAULT_POLL_TIMEOUT): vol.All(
+            vol.Coerce(float), vol.Range(min=1)
+        ),
+        vol.Optional(CONF_TRACE, default=False): bool,
     }
 )
 
 
+def _transport_data(user_input):
+    """Return the transport settings of a config flow step's input."""
+    return {
+        key: user_input[key]
+        for key in (CONF_TRANSPORT, CONF_BAUDRATE, CONF_PARITY, CONF_STOPBITS)
+        if key in user_input
+    }
+
+
 class FischerFancoilConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
     """Config flow to add Fischer Fancoil integration."""
 
@@ -47,11 +130,13 @@ class FischerFancoilConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
 
     async def async_step_user(self, user_input=None):
         """Handle the initial step."""
+        return self.async_show_menu(step_id="user", menu_options=["manual", "scan"])
+
+    async def async_step_manual(self, user_input=None):
+        """Add a single unit."""
         errors = {}
 
         if user_input is not None:
-            # Validate input here if needed
-            # TODO: check host valid, etc.
             host = user_input[CONF_HOST]
             port = user_input[CONF_PORT]
             unit_id = user_input[CONF_UNIT_ID]
@@ -61,19 +146,114 @@ class FischerFancoilConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
             await self.async_set_unique_id(unique_id)
             self._abort_if_unique_id_configured()
 
-            return self.async_create_entry(
-                title=user_input[CONF_NAME],
-                data={
-                    CONF_NAME: user_input[CONF_NAME],
-                    CONF_HOST: host,
-                    CONF_PORT: port,
-                    CONF_UNIT_ID: unit_id,
-                },
-            )
+            # The unit is recognised by the same probe as a scan
+            transport = _transport_data(user_input)
+            if await self._async_scan(host, port, transport, [unit_id]):
+                return self.async_create_entry(
+                    title=user_input[CONF_NAME],
+                    data={
+                        CONF_NAME: user_input[CONF_NAME],
+                        CONF_HOST: host,
+                        CONF_PORT: port,
+                        CONF_UNIT_ID: unit_id,
+                        **transport,
+                    },
+                )
+            errors["base"] = "cannot_connect"
 
         return self.async_show_form(
-            step_id="user", data_schema=user_schema, errors=errors
+            step_id="manual",
+            data_schema=self.add_suggested_values_to_schema(user_schema, user_input),
+            errors=errors,
+        )
+
+    async def async_step_scan(self, user_input=None):
+        """Scan a range of unit IDs on a host and add every fancoil found."""
+        errors = {}
+
+        if user_input is not None:
+            host = user_input[CONF_HOST]
+            port = user_input[CONF_PORT]
+            first_unit_id = user_input[CONF_FIRST_UNIT_ID]
+            last_unit_id = user_input[CONF_LAST_UNIT_ID]
+
+            configured = self._async_current_ids()
+            unit_ids = [
+                unit_id
+                for unit_id in range(first_unit_id, last_unit_id + 1)
+                if f"{host}:{port}:{unit_id}" not in configured
+            ]
+            if first_unit_id > last_unit_id:
+                errors["base"] = "invalid_range"
+            else:
+                transport = _transport_data(user_input)
+                found = await self._async_scan(host, port, transport, unit_ids)
+                if found:
+                    return await self._async_create_entries(
+                        user_input[CONF_NAME], host, port, transport, found
+                    )
+                errors["base"] = "no_units_found"
+
+        return self.async_show_form(
+            step_id="scan",
+            data_schema=self.add_suggested_values_to_schema(scan_schema, user_input),
+            errors=errors,
+        )
+
+    async def _async_scan(self, host, port, transport, unit_ids):
+        """Return the unit IDs of the fancoils answering on a host."""
+        # The probes go through the host shared with the entries of the units,
+        # at the pipeline depth they opted into, so a gateway that answers one
+        # request at a time does not hold queued probes past their timeout
+        registry = self.hass.data.setdefault(DOMAIN, HostRegistry(self.hass))
+        host_key = f"{host}:{port}"
+        modbus_host = registry.acquire(
+            host_key, host, port, **transport_options(transport)
+        )
+        try:
+            return list(await async_scan_units(modbus_host, unit_ids))
+        finally:
+            registry.release(host_key)
+
+    async def _async_create_entries(self, name, host, port, transport, unit_ids):
+        """Create an entry for each unit, the others through import flows."""
+        for unit_id in unit_ids[1:]:
+            self.hass.async_create_task(
+                self.hass.config_entries.flow.async_init(
+                    DOMAIN,
+                    context={"source": config_entries.SOURCE_IMPORT},
+                    data={
+                        CONF_NAME: f"{name} {unit_id}",
+                        CONF_HOST: host,
+                        CONF_PORT: port,
+                        CONF_UNIT_ID: unit_id,
+                        **transport,
+                    },
+                )
+            )
+
+        unit_id = unit_ids[0]
+        await self.async_set_unique_id(f"{host}:{port}:{unit_id}")
+        self._abort_if_unique_id_configured()
+        return self.async_create_entry(
+            title=f"{name} {unit_id}",
+            data={
+                CONF_NAME: f"{name} {unit_id}",
+                CONF_HOST: host,
+                CONF_PORT: port,
+                CONF_UNIT_ID: unit_id,
+                **transport,
+            },
+        )
+
+    async def async_step_import(self, import_data):
+        """Add a unit found by a scan."""
+        unit_id = import_data[CONF_UNIT_ID]
+        await self.async_set_unique_id(
+            f"{import_data[CONF_HOST]}:{import_data[CONF_PORT]}:{unit_id}"
         )
+        self._abort_if_unique_id_configured()
+        return self.async_create_entry(title=import_data[CONF_NAME], data=import_data)
 
     @staticmethod
     @callback
@@ -12,8 +12,70 @@ CONF_POLL_INTERVAL = "poll_interval"
 CONF_HOST = "host"
 CONF_PORT = "port"
 CONF_UNIQUE_ID = "unique_id"
+CONF_PIPELINE_DEPTH = "pipeline_depth"
+CONF_TEMPERATURE_DEADBAND = "temperature_deadband"
+CONF_MAX_POLL_INTERVAL = "max_poll_interval"
+CONF_FIRST_UNIT_ID = "first_unit_id"
+CONF_TRANSPORT = "transport"
+CONF_BAUDRATE = "baudrate"
+CONF_PARITY = "parity"
+CONF_STOPBITS = "stopbits"
+CONF_TRACE = "trace"
+CONF_REQUEST_TIMEOUT = "request_timeout"
+CONF_POLL_TIMEOUT = "poll_timeout"
+CONF_LAST_UNIT_ID = "last_unit_id"
 
 DEFAULT_POLL_INTERVAL = 10
+DEFAULT_MAX_POLL_INTERVAL = 60
+DEFAULT_PIPELINE_DEPTH = 1
+DEFAULT_TEMPERATURE_DEADBAND = 0
+MAX_PIPELINE_DEPTH = 16
+# Seconds a single request and a whole poll of a unit may take
+DEFAULT_REQUEST_TIMEOUT = 2.0
+DEFAULT_POLL_TIMEOUT = 10
+MAX_REQUEST_TIMEOUT = 30
+
+# Transports, the host of a serial transport is its device path
+TRANSPORT_TCP = "tcp"
+TRANSPORT_RTU_OVER_TCP = "rtu_over_tcp"
+TRANSPORT_SERIAL = "serial"
+TRANSPORTS = [TRANSPORT_TCP, TRANSPORT_RTU_OVER_TCP, TRANSPORT_SERIAL]
+
+DEFAULT_BAUDRATE = 9600
+DEFAULT_BYTESIZE = 8
+DEFAULT_PARITY = "N"
+DEFAULT_STOPBITS = 1
+PARITIES = ["N", "E", "O"]
+
+# Unit IDs a Modbus slave may have
+MIN_UNIT_ID = 1
+MAX_UNIT_ID = 247
+
+# Register tables
+TABLE_COIL = "coil"
+TABLE_HOLDING = "holding"
+TABLE_INPUT = "input"
+
+# Largest gap of unused addresses that is still read to merge two blocks
+DEFAULT_MAX_READ_GAP = 4
+
+# Seconds a read register value is served from the cache
+DEFAULT_CACHE_TTL = 2
+# Measured values change on their own, settings mostly when they are written
+# and the slow points hardly ever
+MEASURED_CACHE_TTL = 1
+SETTING_CACHE_TTL = 5
+SLOW_CACHE_TTL = 30
+
+# Seconds writes to the same unit are collected before they are sent
+DEFAULT_WRITE_COALESCE_WINDOW = 0.3
+
+# Services
+SERVICE_GET_HISTORY = "get_history"
+SERVICE_BULK_SET = "bulk_set"
+ATTR_BROADCAST = "broadcast"
+ATTR_POINTS = "points"
+ATTR_SINCE = "since"
 
 # Registers
 REGISTER_POWER = 1
@@ -27,3 +89,20 @@ REGISTER_OPMODE = 67
 
 REGISTER_INDOOR_TEMP = 73
 REGISTER_COIL_TEMP = 74
+
+# Keys of the decoded register map points
+DATA_POWER = "power"
+DATA_SLEEP = "sleep"
+DATA_SWING = "swing"
+DATA_EHEAT = "eheat"
+DATA_SET_TEMP = "set_temp"
+DATA_FAN_SPEED = "fan_speed"
+DATA_OPMODE = "opmode"
+DATA_INDOOR_TEMP = "indoor_temp"
+DATA_COIL_TEMP = "coil_temp"
+
+# Encodings of register map points
+ENCODING_BOOL = "bool"
+ENCODING_BCD = "bcd"
+ENCODING_ENUM = "enum"
+ENCODING_INT = "int"
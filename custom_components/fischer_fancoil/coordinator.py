@@ -0,0 +1,236 @@
+"""Data update coordinator for Fischer Fancoil."""
+
+import asyncio
+import logging
+import time
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
+
+from .const import DATA_POWER, DEFAULT_POLL_TIMEOUT, DOMAIN
+from .history import RegisterHistory
+from .modbus_host import ModbusHost
+from .priority import PRIORITY_CONFIRM, PRIORITY_POLL
+from .register_map import COMPILED_REGISTER_MAP
+
+_LOGGER = logging.getLogger(__name__)
+
+# Polls at the poll interval, reading every point, after a write to the unit
+FAST_POLLS_AFTER_WRITE = 3
+# Every how many polls the slow points are read too
+FULL_POLL_EVERY = 6
+# Seconds until the next poll within which a write is verified by that poll
+VERIFY_PIGGYBACK_WINDOW = 1.0
+# Factors the poll interval grows by per poll without changes
+STABLE_POLL_STEP = 1.5
+OFF_POLL_STEP = 2.0
+
+
+async def async_fetch_unit(
+    modbus_host: ModbusHost,
+    unit_id: int,
+    plan=None,
+    priority=PRIORITY_POLL,
+    history: RegisterHistory | None = None,
+):
+    """Read the registers of a unit and return the decoded values."""
+    snapshot = await modbus_host.async_read_block(
+        unit_id, plan or COMPILED_REGISTER_MAP.plan, priority
+    )
+    if history is not None and snapshot:
+        history.append(time.time(), snapshot)
+    data = COMPILED_REGISTER_MAP.decode(snapshot)
+
+    _LOGGER.debug("Polled fancoil unit %s: %s", unit_id, data)
+    return data
+
+
+class FischerFancoilCoordinator(DataUpdateCoordinator):
+    """Poll a single fancoil unit once per cycle for all of its entities.
+
+    The coordinator has no update interval of its own, the bus scheduler of
+    the Modbus host triggers its refreshes. The interval adapts to the unit:
+    it is the poll interval after writes and while values change, and grows
+    toward the maximum poll interval while the unit is off or stable. Slow
+    points are only read by every few polls, and points a poll did not read
+    keep their last known value.
+
+    A poll that runs past the poll timeout is cancelled and fails, so a unit
+    that stopped answering does not hold the bus for its retries.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        entry: ConfigEntry,
+        modbus_host: ModbusHost,
+        unit_id: int,
+        poll_interval: int,
+        deadbands: dict[str, float] | None = None,
+        max_poll_interval: int | None = None,
+        poll_timeout: float = DEFAULT_POLL_TIMEOUT,
+    ) -> None:
+        """Initialize the coordinator."""
+        super().__init__(hass, _LOGGER, config_entry=entry, name=f"{DOMAIN}_{unit_id}")
+        self.modbus_host = modbus_host
+        self.unit_id = unit_id
+        self.poll_interval = poll_interval
+        self.max_poll_interval = max(max_poll_interval or 0, poll_interval)
+        self.current_interval = poll_interval
+        self.poll_timeout = poll_timeout
+        self._fast_polls = 0
+        # Polls since the slow points were last read, None before the first
+        self._polls_since_full = None
+        # Smallest change of a point that is propagated to the entities
+        self._deadbands = deadbands or {}
+        # Keys of the points whose values changed in the last refresh
+        self.changed_keys = frozenset()
+        self.history = RegisterHistory(COMPILED_REGISTER_MAP.plan.points)
+        # Futures of write verifications waiting for the next poll
+        self._verify_waiters = []
+
+    @callback
+    def async_schedule(self):
+        """Register the unit with the bus scheduler and return the remove callback."""
+        return self.modbus_host.scheduler.add_unit(
+            self.unit_id,
+            self.poll_interval,
+            COMPILED_REGISTER_MAP.plan,
+            self.async_refresh,
+        )
+
+    @callback
+    def async_note_write(self):
+        """Poll the unit fast after a write to pick up its effects."""
+        self._fast_polls = FAST_POLLS_AFTER_WRITE
+        self._set_interval(self.poll_interval)
+
+    async def async_verify_write(self, key, value):
+        """Read back a written point and return whether it holds the value.
+
+        The next poll verifies the write if it is due within the piggyback
+        window, otherwise the point alone is read. Returns None if the point
+        could not be read.
+        """
+        due = self.modbus_host.scheduler.time_until_due(self.unit_id)
+        data = None
+        if due is not None and due <= VERIFY_PIGGYBACK_WINDOW:
+            future = self.hass.loop.create_future()
+            self._verify_waiters.append(future)
+            try:
+                data = await asyncio.wait_for(future, due + VERIFY_PIGGYBACK_WINDOW)
+            except asyncio.TimeoutError:
+                data = None
+        if data is None or key not in data:
+            snapshot = await self.modbus_host.async_read_block(
+                self.unit_id, COMPILED_REGISTER_MAP.point_plans[key], PRIORITY_CONFIRM
+            )
+            data = COMPILED_REGISTER_MAP.decode(snapshot)
+        if key not in data:
+            return None
+        return data[key] == value
+
+    @callback
+    def async_set_written_data(self, values):
+        """Propagate values written to the unit by a service to the entities."""
+        self.changed_keys = frozenset(values)
+        self.async_set_updated_data({**(self.data or {}), **values})
+
+    def _set_interval(self, interval):
+        """Set the interval of the next polls of the unit."""
+        self.current_interval = interval
+        self.modbus_host.scheduler.set_interval(self.unit_id, interval)
+
+    async def _async_update_data(self):
+        """Fetch the registers of the unit."""
+        self.changed_keys = frozenset()
+        full = (
+            self._polls_since_full is None
+            or self._polls_since_full + 1 >= FULL_POLL_EVERY
+            or self._fast_polls > 0
+        )
+        plan = COMPILED_REGISTER_MAP.plan if full else COMPILED_REGISTER_MAP.fast_plan
+        # The polls after a write confirm its effects
+        priority = PRIORITY_CONFIRM if self._fast_polls > 0 else PRIORITY_POLL
+        # Verifications waiting since before this poll started piggyback on it
+        waiters, self._verify_waiters = self._verify_waiters, []
+        data = None
+        try:
+            async with asyncio.timeout(self.poll_timeout):
+                data = await async_fetch_unit(
+                    self.modbus_host, self.unit_id, plan, priority, self.history
+                )
+        except asyncio.TimeoutError as e:
+            raise UpdateFailed(
+                f"Polling fancoil unit {self.unit_id} timed out after"
+                f" {self.poll_timeout} seconds"
+            ) from e
+        finally:
+            for future in waiters:
+                if not future.done():
+                    future.set_result(data)
+        if not data:
+            raise UpdateFailed(f"No response from fancoil unit {self.unit_id}")
+
+        if full:
+            self._polls_since_full = 0
+        else:
+            self._polls_since_full += 1
+        # Points this poll did not read, the slow points of a fast poll or
+        # those of a block that failed, keep their last known value
+        for key, value in (self.data or {}).items():
+            data.setdefault(key, value)
+        data = self._diff(data)
+        self._adapt_interval(data)
+        return data
+
+    def history_as_dict(self, keys=None, since=None):
+        """Return the polled raw values of register map points since a time."""
+        points = [
+            COMPILED_REGISTER_MAP.points[key]
+            for key in (keys or COMPILED_REGISTER_MAP.points)
+        ]
+        timestamps, values = self.history.query(
+            [(point.table, point.address) for point in points], since
+        )
+        return {
+            "timestamps": timestamps,
+            "values": {
+                point.key: values[(point.table, point.address)] for point in points
+            },
+        }
+
+    def _adapt_interval(self, data):
+        """Poll fast while the unit is active and back off while it is idle."""
+        if self._fast_polls > 0:
+            self._fast_polls -= 1
+            interval = self.poll_interval
+        elif self.changed_keys:
+            interval = self.poll_interval
+        elif not data.get(DATA_POWER):
+            interval = self.current_interval * OFF_POLL_STEP
+        else:
+            interval = self.current_interval * STABLE_POLL_STEP
+        self._set_interval(min(interval, self.max_poll_interval))
+
+    def _diff(self, data):
+        """Record the changed points, keeping values within their deadband."""
+        previous = self.data or {}
+        changed = set()
+        for key, value in data.items():
+            if key not in previous:
+                changed.add(key)
+                continue
+            old = previous[key]
+            deadband = self._deadbands.get(key)
+            if deadband and value is not None and old is not None:
+                if abs(value - old) <= deadband:
+                    # Keep the propagated value so small drifts do not add up
+                    data[key] = old
+                    continue
+                changed.add(key)
+            elif value != old:
+                changed.add(key)
+        self.changed_keys = frozenset(changed)
+        return data
@@ -0,0 +1,29 @@
+"""Diagnostics support for Fischer Fancoil."""
+
+from typing import Any
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+
+from .coordinator import FischerFancoilCoordinator
+
+
+async def async_get_config_entry_diagnostics(
+    hass: HomeAssistant, entry: ConfigEntry
+) -> dict[str, Any]:
+    """Return diagnostics for a config entry."""
+    coordinator: FischerFancoilCoordinator = hass.data[entry.entry_id]
+    modbus_host = coordinator.modbus_host
+    unit_id = coordinator.unit_id
+
+    return {
+        "entry": {"data": dict(entry.data), "options": dict(entry.options)},
+        "data": coordinator.data,
+        "history": coordinator.history_as_dict(),
+        "metrics": modbus_host.metrics.as_dict(),
+        "cache": modbus_host.cache.stats,
+        "frame_gap": modbus_host.pacer.get_gap(unit_id),
+        "poll_interval": coordinator.current_interval,
+        "poll_backoff": modbus_host.scheduler.backoff,
+        "circuit_open": modbus_host.circuit_breaker.is_open(unit_id),
+    }
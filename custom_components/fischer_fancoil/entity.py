@@ -0,0 +1,69 @@
+"""Base entity for Fischer Fancoil."""
+
+from abc import abstractmethod
+
+from homeassistant.core import State, callback
+from homeassistant.helpers.restore_state import RestoreEntity
+from homeassistant.helpers.update_coordinator import CoordinatorEntity
+
+from .coordinator import FischerFancoilCoordinator
+
+
+class FischerFancoilEntity(CoordinatorEntity[FischerFancoilCoordinator], RestoreEntity):
+    """Entity fed by the coordinator that only writes state on changes.
+
+    Subclasses list the register map points they show in _point_keys and
+    update themselves from the coordinator data in _update_from_data. Until
+    the first poll of the unit they show the state restored in
+    _restore_state.
+
+    Values written to points are kept in _written until the write is
+    verified, and shown in place of the polled values meanwhile, so a poll
+    that started before the write does not revert them.
+    """
+
+    _point_keys: frozenset[str] = frozenset()
+
+    def __init__(self, coordinator: FischerFancoilCoordinator) -> None:
+        """Initialize the entity."""
+        super().__init__(coordinator)
+        self._last_available = None
+        # Set while the entity shows a written value not yet confirmed by a poll
+        self._optimistic = False
+        # Point key -> value written and not verified yet
+        self._written = {}
+
+    async def async_added_to_hass(self) -> None:
+        """Restore the last known state if the unit was not polled yet."""
+        await super().async_added_to_hass()
+        if not self.coordinator.data:
+            await self._async_restore_state()
+
+    async def _async_restore_state(self) -> None:
+        """Restore the state the entity had before Home Assistant stopped."""
+        if (state := await self.async_get_last_state()) is not None:
+            self._restore_state(state)
+
+    def _restore_state(self, state: State) -> None:
+        """Update the entity from its last known state."""
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Write the state if the data of the entity's points changed."""
+        available = self.available
+        if (
+            available == self._last_available
+            and not self._optimistic
+            and not self._point_keys & self.coordinator.changed_keys
+        ):
+            return
+        self._last_available = available
+        # Resync once the writes in flight are verified
+        self._optimistic = bool(self._written)
+        if self.coordinator.data:
+            self._update_from_data({**self.coordinator.data, **self._written})
+        super()._handle_coordinator_update()
+
+    @abstractmethod
+    def _update_from_data(self, data) -> None:
+        """Update the entity from the coordinator data."""
@@ -0,0 +1,65 @@
+"""Ring buffer of polled register values for Fischer Fancoil."""
+
+from array import array
+
+# Samples kept per unit, four hours at the default poll interval
+DEFAULT_HISTORY_SIZE = 1440
+# Raw value stored for registers a poll did not read
+MISSING = -1
+
+
+class RegisterHistory:
+    """Keep the raw values of a unit's polls in a fixed size ring buffer.
+
+    Timestamps and values are stored in flat typed arrays, one row per poll
+    with a column per register, so a sample costs a few bytes per register
+    instead of a dictionary.
+    """
+
+    def __init__(self, registers, size=DEFAULT_HISTORY_SIZE) -> None:
+        """Initialize the history for (table, address) registers."""
+        self.registers = tuple(registers)
+        self.size = size
+        self._timestamps = array("d", bytes(8 * size))
+        self._values = array("i", [MISSING]) * (size * len(self.registers))
+        self._next = 0
+        self._count = 0
+
+    def __len__(self) -> int:
+        """Return the number of samples in the history."""
+        return self._count
+
+    def append(self, timestamp, snapshot):
+        """Store the raw values of a (table, address) snapshot."""
+        row = self._next
+        self._timestamps[row] = timestamp
+        offset = row * len(self.registers)
+        for column, register in enumerate(self.registers):
+            self._values[offset + column] = int(snapshot.get(register, MISSING))
+        self._next = (row + 1) % self.size
+        self._count = min(self._count + 1, self.size)
+
+    def _rows(self):
+        """Return the rows of the samples, oldest first."""
+        start = (self._next - self._count) % self.size
+        return [(start + index) % self.size for index in range(self._count)]
+
+    def query(self, registers=None, since=None):
+        """Return the timestamps and the raw values of registers since a time.
+
+        Values are listed per register, with None for polls that did not read
+        the register.
+        """
+        registers = self.registers if registers is None else tuple(registers)
+        columns = [self.registers.index(register) for register in registers]
+        rows = [
+            row
+            for row in self._rows()
+            if since is None or self._timestamps[row] >= since
+        ]
+        width = len(self.registers)
+        values = {}
+        for register, column in zip(registers, columns):
+            raw = [self._values[row * width + column] for row in rows]
+            values[register] = [None if value == MISSING else value for value in raw]
+        return [self._timestamps[row] for row in rows], values
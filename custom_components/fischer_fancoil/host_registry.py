@@ -0,0 +1,123 @@
+"""Registry of shared Modbus hosts for Fischer Fancoil."""
+
+import asyncio
+import logging
+
+from .modbus_host import ModbusHost
+
+_LOGGER = logging.getLogger(__name__)
+
+# Seconds an unused host keeps its connection, so reloads reuse it
+DEFAULT_IDLE_TIMEOUT = 300
+# Seconds between checks that reconnect a dropped connection
+RECONNECT_INTERVAL = 30
+
+
+class _RegisteredHost:
+    """A Modbus host with its reference count and background tasks."""
+
+    def __init__(self, modbus_host) -> None:
+        """Initialize the registered host."""
+        self.modbus_host = modbus_host
+        self.references = 0
+        self.idle_handle = None
+        self.keepalive_task = None
+
+
+class HostRegistry:
+    """Own the Modbus host connections shared by the config entries.
+
+    Hosts are reference counted by the entries using them. A host that is no
+    longer used stays connected for the idle timeout, so a reloaded entry finds
+    it warm, and a dropped connection is restored before the next request needs
+    it.
+    """
+
+    def __init__(self, hass, idle_timeout=DEFAULT_IDLE_TIMEOUT) -> None:
+        """Initialize the registry."""
+        self._hass = hass
+        self._idle_timeout = idle_timeout
+        self._hosts = {}
+
+    def _create_task(self, target, *, name):
+        """Start a background task, which does not hold up startup or shutdown."""
+        return self._hass.async_create_background_task(target, name)
+
+    def get(self, host_key):
+        """Return the registered host for a key, or None."""
+        registered = self._hosts.get(host_key)
+        return registered.modbus_host if registered is not None else None
+
+    def acquire(self, host_key, host, port, **kwargs) -> ModbusHost:
+        """Return the host for a key, creating it if needed, and reference it."""
+        registered = self._hosts.get(host_key)
+        if registered is None:
+            registered = _RegisteredHost(
+                ModbusHost(host, port, create_task=self._create_task, **kwargs)
+            )
+            registered.keepalive_task = self._create_task(
+                self._async_keepalive(host_key, registered.modbus_host),
+                name=f"fischer_fancoil keepalive {host_key}",
+            )
+            self._hosts[host_key] = registered
+            _LOGGER.debug("Created ModbusHost instance for %s", host_key)
+        else:
+            _LOGGER.debug("Using existing ModbusHost instance for %s", host_key)
+
+        if registered.idle_handle is not None:
+            registered.idle_handle.cancel()
+            registered.idle_handle = None
+        registered.references += 1
+        return registered.modbus_host
+
+    def release(self, host_key):
+        """Drop a reference to a host, closing it once idle for the timeout."""
+        registered = self._hosts[host_key]
+        registered.references -= 1
+        if registered.references > 0:
+            return
+
+        registered.idle_handle = asyncio.get_running_loop().call_later(
+            self._idle_timeout,
+            lambda: self._create_task(
+                self._async_expire(host_key), name=f"fischer_fancoil expire {host_key}"
+            ),
+        )
+
+    async def _async_expire(self, host_key):
+        """Close a host that stayed unused for the idle timeout."""
+        registered = self._hosts.get(host_key)
+        if registered is None or registered.references > 0:
+            return
+        _LOGGER.debug("Closing idle ModbusHost instance for %s", host_key)
+        await self._async_close(host_key)
+
+    async def _async_close(self, host_key):
+        """Stop the background tasks of a host and disconnect it."""
+        registered = self._hosts.pop(host_key)
+        if registered.idle_handle is not None:
+            registered.idle_handle.cancel()
+        registered.keepalive_task.cancel()
+        await registered.modbus_host.write_queue.async_close()
+        # The scheduler would reconnect the host for the next poll
+        await registered.modbus_host.scheduler.async_stop()
+        await registered.modbus_host.async_disconnect()
+        # Closing the trace file blocks
+        await self._hass.async_add_executor_job(registered.modbus_host.set_trace, None)
+
+    async def async_close_all(self):
+        """Close every host."""
+        for host_key in list(self._hosts):
+            await self._async_close(host_key)
+
+    async def _async_keepalive(self, host_key, modbus_host):
+        """Connect ahead of the first request and restore dropped connections."""
+        while True:
+            if not modbus_host.connected:
+                try:
+                    await modbus_host.async_connect()
+                except Exception as e:
+                    _LOGGER.debug("Could not connect to %s: %s", host_key, e)
+                else:
+                    _LOGGER.debug("Connected to %s", host_key)
+            await asyncio.sleep(RECONNECT_INTERVAL)
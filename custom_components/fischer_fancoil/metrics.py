@@ -0,0 +1,119 @@
+"""Modbus transaction metrics for Fischer Fancoil."""
+
+import asyncio
+import bisect
+
+from pymodbus.exceptions import ModbusIOException
+
+# Upper bounds of the latency histogram buckets in seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+def is_timeout(exception):
+    """Return whether an exception means the request timed out."""
+    return isinstance(exception, (asyncio.TimeoutError, ModbusIOException))
+
+
+class LatencyHistogram:
+    """Histogram of durations over fixed buckets."""
+
+    def __init__(self) -> None:
+        """Initialize the histogram."""
+        # The last bucket counts durations above the largest bound
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, duration):
+        """Add a duration in seconds."""
+        self.buckets[bisect.bisect_left(LATENCY_BUCKETS, duration)] += 1
+        self.count += 1
+        self.total += duration
+        self.max = max(self.max, duration)
+
+    @property
+    def mean(self):
+        """Return the mean duration in seconds, or None without samples."""
+        return self.total / self.count if self.count else None
+
+    def as_dict(self):
+        """Return the histogram as a dictionary."""
+        bounds = [str(bound) for bound in LATENCY_BUCKETS] + ["+Inf"]
+        return {
+            "count": self.count,
+            "mean": self.mean,
+            "max": self.max,
+            "buckets": dict(zip(bounds, self.buckets)),
+        }
+
+
+class TransactionStats:
+    """Counters and latency histograms of Modbus transactions."""
+
+    def __init__(self) -> None:
+        """Initialize the stats."""
+        self.requests = 0
+        self.retries = 0
+        self.failures = 0
+        self.timeouts = 0
+        self.wire_time = LatencyHistogram()
+        self.lock_wait = LatencyHistogram()
+
+    def as_dict(self):
+        """Return the stats as a dictionary."""
+        return {
+            "requests": self.requests,
+            "retries": self.retries,
+            "failures": self.failures,
+            "timeouts": self.timeouts,
+            "wire_time": self.wire_time.as_dict(),
+            "lock_wait": self.lock_wait.as_dict(),
+        }
+
+
+class ModbusMetrics:
+    """Transaction metrics of a Modbus host and each of its units."""
+
+    def __init__(self) -> None:
+        """Initialize the metrics."""
+        self.host = TransactionStats()
+        self.units = {}
+
+    def unit(self, unit_id):
+        """Return the stats of a unit."""
+        if unit_id not in self.units:
+            self.units[unit_id] = TransactionStats()
+        return self.units[unit_id]
+
+    def _both(self, unit_id):
+        return self.host, self.unit(unit_id)
+
+    def record_request(self, unit_id, wire_time, success, timeout=False):
+        """Record a request sent on the bus."""
+        for stats in self._both(unit_id):
+            stats.requests += 1
+            stats.wire_time.observe(wire_time)
+            if not success:
+                stats.failures += 1
+            if timeout:
+                stats.timeouts += 1
+
+    def record_retry(self, unit_id):
+        """Record a retried request."""
+        for stats in self._both(unit_id):
+            stats.retries += 1
+
+    def record_lock_wait(self, unit_id, wait):
+        """Record the time a request waited for the bus lock."""
+        for stats in self._both(unit_id):
+            stats.lock_wait.observe(wait)
+
+    def as_dict(self):
+        """Return the metrics as a dictionary."""
+        return {
+            "host": self.host.as_dict(),
+            "units": {
+                unit_id: stats.as_dict() for unit_id, stats in self.units.items()
+            },
+        }
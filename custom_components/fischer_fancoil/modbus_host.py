@@ -1,198 +1,536 @@
 """Modbus host for Fischer Fancoil."""
 
 import asyncio
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from functools import partial
 import logging
+import time
 
-from pymodbus.client import AsyncModbusTcpClient
-from pymodbus.exceptions import ModbusException, ModbusIOException
+from pymodbus.exceptions import ModbusException
+
+from .const import (
+    DEFAULT_BAUDRATE,
+    DEFAULT_BYTESIZE,
+    DEFAULT_PARITY,
+    DEFAULT_REQUEST_TIMEOUT,
+    DEFAULT_STOPBITS,
+    TABLE_COIL,
+    TABLE_HOLDING,
+    TABLE_INPUT,
+    TRANSPORT_TCP,
+)
+from .metrics import ModbusMetrics
+from .pacing import AdaptivePacer
+from .pipeline import (
+    BROADCAST_UNIT_ID,
+    BusSlotMiddleware,
+    CacheMiddleware,
+    MetricsMiddleware,
+    ModbusRequest,
+    PacingMiddleware,
+    RequestPipeline,
+    RetryMiddleware,
+    TraceMiddleware,
+)
+from .priority import PRIORITY_COMMAND, PRIORITY_POLL, BusQueue
+from .read_plan import ReadPlan
+from .register_cache import RegisterCache
+from .register_map import COMPILED_REGISTER_MAP
+from .retry import CircuitBreaker, RetryPolicy
+from .scheduler import BusScheduler
+from .trace import DEFAULT_TRACE_RECORDS, TraceRecorder
+from .transport import create_client, rtu_frame_gap
+from .write_queue import WriteQueue
 
 _LOGGER = logging.getLogger(__name__)
 
+# Seconds the bus is left to the units to process a broadcast
+BROADCAST_TURNAROUND_DELAY = 0.2
+
+# The queued poll of the current task, marked once it reaches the bus
+_queued_poll = ContextVar("queued_poll", default=None)
+
+
+class _QueuedPoll:
+    """A poll of a unit that a newer poll of the same unit may supersede."""
+
+    def __init__(self) -> None:
+        """Initialize the queued poll."""
+        self.task = None
+        self.started = False
+        self.superseded_by = None
+
 
 class ModbusHost:
-    """Modbus host for Fischer Fancoil."""
+    """Modbus host for Fischer Fancoil.
+
+    The host is a Modbus TCP gateway, an RTU over TCP gateway or a serial RTU
+    bus, in which case the host is the path of the serial device. RTU frames
+    are kept apart by at least 3.5 character times at the baud rate.
+
+    Behind a Modbus TCP gateway with a pipeline depth above one, each request
+    in flight has a connection of its own, since a pymodbus client waits for
+    the response before sending the next request.
+
+    Every request has a deadline. A request abandoned on the wire, timed out
+    or cancelled, resyncs its connection so its late response is not taken
+    for the answer to the next request.
+    """
+
+    def __init__(
+        self,
+        host,
+        port,
+        max_retries=3,
+        retry_delay=0.5,
+        pipeline_depth=1,
+        transport=TRANSPORT_TCP,
+        baudrate=DEFAULT_BAUDRATE,
+        bytesize=DEFAULT_BYTESIZE,
+        parity=DEFAULT_PARITY,
+        stopbits=DEFAULT_STOPBITS,
+        request_timeout=DEFAULT_REQUEST_TIMEOUT,
+        create_task=asyncio.create_task,
+    ) -> None:
+        """Initialize the modbus host.
 
-    def __init__(self, host, port, max_retries=3, retry_delay=0.5) -> None:
-        """Initialize the modbus host."""
+        Background tasks of the host are started with create_task, which is
+        called with the coroutine and a name keyword, like asyncio.create_task.
+        """
         self._host = host
         self._port = port
-        self._client = AsyncModbusTcpClient(host=host, port=port)
-        self._lock = asyncio.Lock()
-        self._subscriber_count = 0
-        self._max_retry_count = max_retries
-        self._retry_delay = retry_delay
+        self._transport = transport
+        self._client_options = (
+            transport,
+            host,
+            port,
+            baudrate,
+            bytesize,
+            parity,
+            stopbits,
+        )
+        self.request_timeout = request_timeout
+        # One client per request in flight, the first is the main connection
+        self._client = self._create_client()
+        self._clients = [self._client]
+        self._idle_clients = [self._client]
+        if transport != TRANSPORT_TCP:
+            # A serial bus carries a single request at a time
+            pipeline_depth = 1
+        self._bus_queue = BusQueue(pipeline_depth)
+        # (unit_id, blocks) -> the latest poll of the blocks
+        self._polls = {}
+        self._connect_lock = asyncio.Lock()
+        self._pipeline_depth = pipeline_depth
+        self.retry_policy = RetryPolicy(max_retries, retry_delay)
+        self.circuit_breaker = CircuitBreaker()
+        self._pending_writes = 0
+        self._writes_idle = asyncio.Event()
+        self._writes_idle.set()
+        self.scheduler = BusScheduler(self, create_task)
+        if transport == TRANSPORT_TCP:
+            self.pacer = AdaptivePacer()
+        else:
+            # A gateway may forward the frames to the serial bus at our baud rate
+            self.pacer = AdaptivePacer(
+                min_gap=rtu_frame_gap(baudrate, bytesize, parity, stopbits)
+            )
+        self.pacer.shared_bus = pipeline_depth == 1
+        self.write_queue = WriteQueue(self, create_task=create_task)
+        self.cache = RegisterCache(ttls=COMPILED_REGISTER_MAP.ttls)
+        self.metrics = ModbusMetrics()
+        self.trace = None
+        # Every request goes through the same chain, probes skip the cache
+        # and the retries
+        self._pipeline = RequestPipeline(
+            [
+                CacheMiddleware(self),
+                RetryMiddleware(self),
+                BusSlotMiddleware(self),
+                PacingMiddleware(self),
+                MetricsMiddleware(self),
+                TraceMiddleware(self),
+            ],
+            self._async_send,
+        )
+        # A probe timing out means the unit is absent, not that the connection
+        # is out of step, unless a late RTU frame could be mistaken for the
+        # next response
+        self._probe_pipeline = RequestPipeline(
+            [
+                BusSlotMiddleware(self),
+                PacingMiddleware(self),
+                MetricsMiddleware(self),
+                TraceMiddleware(self),
+            ],
+            partial(self._async_send, resync=transport != TRANSPORT_TCP),
+        )
 
-    async def async_connect(self):
-        """Connect to the modbus host."""
-        if not self._client.connected:
-            await self._client.connect()
+    def _create_client(self):
+        """Return a new pymodbus client of the host."""
+        return create_client(*self._client_options, timeout=self.request_timeout)
 
-    async def async_disconnect(self):
-        """Disconnect from the modbus host."""
-        if self._client.connected:
-            await self._client.close()
-
-    def add_subscriber(self):
-        """Add a subscriber."""
-        self._subscriber_count += 1
-
-    def get_subscriber_count(self):
-        """Get the subscriber count."""
-        return self._subscriber_count
-
-    def remove_subscriber(self):
-        """Remove a subscriber."""
-        self._subscriber_count -= 1
-        if self._subscriber_count == 0:
-            task = asyncio.create_task(self.async_disconnect())
-            # TODO: destroy host instance if no subscribers
-
-    # NOTE: This method  will try to read the registers 'self._max_retries' times
-    async def async_read_holding_registers(self, unit_id, address, count):
-        """Read holding registers."""
-        async with self._lock:
-            for attempt in range(self._max_retry_count):
-                await self.async_connect()
-                result = await self._client.read_holding_registers(
-                    address, count, unit_id
-                )
-                if not result.isError() and len(result.registers) == count:
-                    return result.registers
-
-                if attempt < self._max_retry_count - 1:
-                    _LOGGER.warning(
-                        "Modbus error reading holding registers at address %s, retrying",
-                        address,
-                    )
-                    await asyncio.sleep(self._retry_delay)
-
-            _LOGGER.error(
-                "Modbus error reading holding registers at address %s, retries exhausted",
-                address,
-            )
+    @property
+    def connected(self):
+        """Return whether the main connection is connected."""
+        return self._client.connected
+
+    async def async_connect(self, client=None):
+        """Connect a client to the modbus host, the main one by default."""
+        client = client or self._client
+        if client.connected:
+            return
+        async with self._connect_lock:
+            if not client.connected:
+                await client.connect()
+
+    def set_request_timeout(self, request_timeout):
+        """Set the seconds a request may take before it is abandoned."""
+        self.request_timeout = request_timeout
+        for client in self._clients:
+            # Backs up the deadline while connecting
+            client.comm_params.timeout_connect = request_timeout
+
+    def _acquire_client(self):
+        """Take an idle client for a request holding a bus slot.
+
+        A client is opened for each slot in use, up to the pipeline depth.
+        """
+        if self._idle_clients:
+            return self._idle_clients.pop()
+        client = self._create_client()
+        self._clients.append(client)
+        return client
+
+    def _release_client(self, client):
+        """Return a client to the idle clients once its request is done."""
+        self._idle_clients.append(client)
+        self._trim_clients()
+
+    def _trim_clients(self):
+        """Close idle clients beyond the pipeline depth, keeping the main one."""
+        for client in list(self._idle_clients):
+            if len(self._clients) <= self._pipeline_depth:
+                return
+            if client is not self._client:
+                self._idle_clients.remove(client)
+                self._clients.remove(client)
+                self._close_client(client)
+
+    @staticmethod
+    def _close_client(client):
+        """Close a client, returning the future of a close still in progress."""
+        if not client.connected:
             return None
+        # close() is a coroutine in early pymodbus 3 releases only
+        result = client.close()
+        if asyncio.iscoroutine(result):
+            return asyncio.ensure_future(result)
+        return None
 
-    async def async_read_input_registers(self, unit_id, address, count):
-        """Read input registers."""
-        async with self._lock:
-            for attempt in range(self._max_retry_count):
-                await self.async_connect()
-                result = await self._client.read_input_registers(
-                    address, count, unit_id
+    def _resync(self, client):
+        """Drop a connection after a request was abandoned on it.
+
+        RTU frames carry no transaction ID, so a late response would be taken
+        for the answer to the next request on the connection. Each request in
+        flight has a connection of its own, so the other requests are not
+        affected.
+        """
+        if not client.connected:
+            return
+        _LOGGER.debug(
+            "Resyncing connection to %s:%s after an abandoned request",
+            self._host,
+            self._port,
+        )
+        self._close_client(client)
+
+    async def async_disconnect(self):
+        """Disconnect every client from the modbus host."""
+        closing = [self._close_client(client) for client in self._clients]
+        await asyncio.gather(*(future for future in closing if future is not None))
+
+    def set_trace(self, path, records=DEFAULT_TRACE_RECORDS):
+        """Record every transaction to a trace file, or stop with no path.
+
+        Opens the file, so it is called from an executor.
+        """
+        if self.trace is not None:
+            if self.trace.path == path:
+                return
+            self.trace.close()
+            self.trace = None
+        if path is not None:
+            self.trace = TraceRecorder(path, records)
+
+    async def async_wait_for_writes(self):
+        """Wait until no writes are queued or waiting for the bus."""
+        await self.write_queue.async_wait_idle()
+        await self._writes_idle.wait()
+
+    @property
+    def transport(self):
+        """Return the transport of the host."""
+        return self._transport
+
+    @property
+    def pipeline_depth(self):
+        """Return the number of requests that may be in flight at once."""
+        return self._pipeline_depth
+
+    def set_pipeline_depth(self, pipeline_depth):
+        """Set the number of requests that may be in flight at once.
+
+        With a depth above one, requests to different units behind a Modbus
+        TCP gateway overlap, each on a connection of its own. Each unit still
+        has a single request in flight at a time. RTU transports always have a
+        depth of one.
+        """
+        if self._transport != TRANSPORT_TCP:
+            pipeline_depth = 1
+        if pipeline_depth == self._pipeline_depth:
+            return
+        _LOGGER.debug(
+            "Setting pipeline depth of %s:%s to %s",
+            self._host,
+            self._port,
+            pipeline_depth,
+        )
+        self._bus_queue.set_slots(pipeline_depth)
+        self._pipeline_depth = pipeline_depth
+        self._trim_clients()
+        self.pacer.shared_bus = pipeline_depth == 1
+
+    @asynccontextmanager
+    async def _async_bus_lock(self, unit_id, priority=PRIORITY_POLL):
+        """Acquire a bus slot for a unit, recording the time spent waiting.
+
+        The slots are granted by priority, so commands overtake the polls
+        queued before them.
+        """
+        start = time.monotonic()
+        async with self._bus_queue.async_slot(unit_id, priority):
+            self.metrics.record_lock_wait(unit_id, time.monotonic() - start)
+            poll = _queued_poll.get()
+            if poll is not None:
+                poll.started = True
+            yield
+
+    @asynccontextmanager
+    async def _async_write_lock(self, unit_id):
+        """Acquire the bus lock for a write, holding back new reads meanwhile."""
+        self._pending_writes += 1
+        self._writes_idle.clear()
+        try:
+            async with self._async_bus_lock(unit_id, PRIORITY_COMMAND):
+                yield
+        finally:
+            self._pending_writes -= 1
+            if self._pending_writes == 0:
+                self._writes_idle.set()
+
+    def async_bus_slot(self, request):
+        """Return the context manager holding the bus for a request."""
+        if request.is_write:
+            return self._async_write_lock(request.unit_id)
+        return self._async_bus_lock(request.unit_id, request.priority)
+
+    async def _async_send(self, request, resync=True):
+        """Send a request on the wire within its deadline and return its values.
+
+        This is the transport at the end of the request pipelines. The
+        connection is resynced after an abandoned request unless told not to.
+        """
+        client = self._acquire_client()
+        abandoned = False
+        start = time.monotonic()
+        try:
+            await self.async_connect(client)
+            if request.broadcast:
+                # The client only sends requests to unit 0 unanswered while set
+                client.broadcast_enable = True
+            start = time.monotonic()
+            async with asyncio.timeout(request.timeout or self.request_timeout):
+                request.response = await getattr(client, request.method)(
+                    *request.arguments
                 )
-                if not result.isError() and len(result.registers) == count:
-                    return result.registers
-
-                if attempt < self._max_retry_count - 1:
-                    _LOGGER.warning(
-                        "Modbus error reading input registers at address %s, retrying",
-                        address,
-                    )
-                    await asyncio.sleep(self._retry_delay)
-            _LOGGER.error(
-                "Modbus error reading input registers at address %s, retries exhausted",
-                address,
-            )
+        except (asyncio.CancelledError, asyncio.TimeoutError):
+            abandoned = True
+            raise
+        finally:
+            request.latency = time.monotonic() - start
+            client.broadcast_enable = False
+            if abandoned and resync:
+                self._resync(client)
+            self._release_client(client)
+        if request.broadcast:
+            await asyncio.sleep(BROADCAST_TURNAROUND_DELAY)
+        return request.decode(request.response)
 
-            return None
+    async def async_execute(self, request):
+        """Send a request through the pipeline and return its values.
 
-    async def async_read_coil(self, unit_id, address):
-        """Read coils."""
-        async with self._lock:
-            await self.async_connect()
-            result = await self._client.read_coils(address, 1, unit_id)
-            if not result.isError():
-                return result.bits[0]
-            return None
+        Returns the read values of a read and the written values of a write,
+        or None if the request failed.
+        """
+        return await self._pipeline.async_execute(request)
+
+    async def async_read_holding_registers(
+        self, unit_id, address, count, priority=PRIORITY_POLL
+    ):
+        """Read holding registers."""
+        return await self.async_execute(
+            ModbusRequest.read(unit_id, TABLE_HOLDING, address, count, priority)
+        )
+
+    async def async_read_input_registers(
+        self, unit_id, address, count, priority=PRIORITY_POLL
+    ):
+        """Read input registers."""
+        return await self.async_execute(
+            ModbusRequest.read(unit_id, TABLE_INPUT, address, count, priority)
+        )
 
-    async def async_read_coils(self, unit_id, address, count):
+    async def async_read_coils(self, unit_id, address, count, priority=PRIORITY_POLL):
         """Read coils."""
-        async with self._lock:
-            for attempts in range(self._max_retry_count):
-                await self.async_connect()
-                result = await self._client.read_coils(address, count, unit_id)
-                if not result.isError() and len(result.bits) == count:
-                    return result.bits
-
-                if attempts < self._max_retry_count - 1:
-                    _LOGGER.warning(
-                        "Modbus error reading coils at address %s, retrying", address
-                    )
-                    await asyncio.sleep(self._retry_delay)
-
-            _LOGGER.error(
-                "Modbus error reading coils at address %s, retries exhausted", address
-            )
+        return await self.async_execute(
+            ModbusRequest.read(unit_id, TABLE_COIL, address, count, priority)
+        )
+
+    async def async_read_coil(self, unit_id, address, priority=PRIORITY_POLL):
+        """Read a single coil."""
+        bits = await self.async_read_coils(unit_id, address, 1, priority)
+        if bits is None:
             return None
+        return bits[0]
 
     async def async_write_register(self, unit_id, address, value) -> bool:
         """Write a single register."""
-        async with self._lock:
-            try:
-                await self.async_connect()
-                result = await self._client.write_register(address, value, unit_id)
-                if not result.isError():
-                    return True
-
-                _LOGGER.error(
-                    "Modbus error writing register at address %s, retries exhausted",
-                    address,
-                )
-            except ModbusIOException as e:
-                _LOGGER.error(
-                    "Modbus I/O error writing register at address %s: %s",
-                    address,
-                    str(e),
-                )
-                return False
-            except ModbusException as e:
-                _LOGGER.error(
-                    "Modbus error writing register at address %s: %s",
-                    address,
-                    str(e),
-                )
-                return False
-            except Exception as e:
-                _LOGGER.error(
-                    "Unknown error writing register at address %s: %s",
-                    address,
-                    str(e),
-                )
-                return False
+        return await self.async_write(unit_id, TABLE_HOLDING, address, [value])
 
-    async def async_write_coil(self, unit_id, address, value):
+    async def async_write_coil(self, unit_id, address, value) -> bool:
         """Write a single coil."""
-        async with self._lock:
+        return await self.async_write(unit_id, TABLE_COIL, address, [value])
+
+    async def async_write_registers(self, unit_id, address, values) -> bool:
+        """Write contiguous registers with a single request."""
+        return await self.async_write(unit_id, TABLE_HOLDING, address, values)
+
+    async def async_write_coils(self, unit_id, address, values) -> bool:
+        """Write contiguous coils with a single request."""
+        return await self.async_write(unit_id, TABLE_COIL, address, values)
+
+    async def async_write(self, unit_id, table, address, values) -> bool:
+        """Write contiguous registers or coils and return whether it succeeded."""
+        request = ModbusRequest.write(unit_id, table, address, values)
+        return await self.async_execute(request) is not None
+
+    async def async_broadcast(self, table, address, values) -> bool:
+        """Write contiguous registers or coils of every unit with a broadcast.
+
+        Broadcasts are not answered, so success only means the request was
+        sent. The bus is kept idle for the turnaround delay afterwards.
+        """
+        request = ModbusRequest.write(
+            BROADCAST_UNIT_ID, table, address, values, broadcast=True
+        )
+        return await self.async_execute(request) is not None
+
+    async def async_probe(self, unit_id, plan, timeout):
+        """Read every block of a read plan once, giving up on the first failure.
+
+        Used to discover units, so there are no retries and neither the circuit
+        breaker nor the cache are involved. Returns the snapshot of the values,
+        or None if the unit did not answer every block within the timeout.
+        """
+        snapshot = {}
+        for block in plan.blocks:
+            request = ModbusRequest.read(
+                unit_id, block.table, block.address, block.count, timeout=timeout
+            )
             try:
-                await self.async_connect()
-                result = await self._client.write_coil(address, value, unit_id)
+                values = await self._probe_pipeline.async_execute(request)
+            except (asyncio.TimeoutError, ModbusException) as e:
+                _LOGGER.debug("No answer from unit %s while probing: %s", unit_id, e)
+                return None
+            if values is None:
+                return None
+            for offset, value in enumerate(values):
+                snapshot[(block.table, block.address + offset)] = value
+        return snapshot
 
-                if not result.isError():
-                    return True
+    async def async_read_block(self, unit_id, plan, priority=PRIORITY_POLL):
+        """Read all blocks of a read plan and return a snapshot of the values.
 
-                _LOGGER.error(
-                    "Modbus error writing coil at address %s",
-                    address,
-                )
+        The snapshot maps (table, address) to the raw value of every address
+        covered by a successfully read block. Blocks whose values are all still
+        cached are served without bus traffic.
 
-            except ModbusIOException as e:
-                _LOGGER.error(
-                    "Modbus I/O error writing coil at address %s: %s",
-                    address,
-                    str(e),
-                )
-                return False
-            except ModbusException as e:
-                _LOGGER.error(
-                    "Modbus error writing coil at address %s: %s",
-                    address,
-                    str(e),
-                )
-                return False
-            except Exception as e:
-                _LOGGER.error(
-                    "Unknown error writing coil at address %s: %s",
-                    address,
-                    str(e),
+        A poll that has not reached the bus yet is superseded by a newer poll
+        of the same blocks, and returns the result of the newer poll.
+        """
+        if priority != PRIORITY_POLL:
+            return await self._async_read_block(unit_id, plan, priority)
+
+        key = (unit_id, plan.blocks)
+        poll = _QueuedPoll()
+        poll.task = asyncio.create_task(self._async_read_poll(unit_id, plan, poll))
+        stale = self._polls.get(key)
+        self._polls[key] = poll
+        if stale is not None and not stale.started:
+            stale.superseded_by = poll
+            stale.task.cancel()
+
+        try:
+            while True:
+                try:
+                    return await asyncio.shield(poll.task)
+                except asyncio.CancelledError:
+                    if asyncio.current_task().cancelling():
+                        poll.task.cancel()
+                        raise
+                    if poll.superseded_by is None:
+                        # The newer poll was cancelled along with its caller
+                        return await self._async_read_block(
+                            unit_id, plan, PRIORITY_POLL
+                        )
+                    poll = poll.superseded_by
+        finally:
+            if self._polls.get(key) is poll:
+                del self._polls[key]
+
+    async def _async_read_poll(self, unit_id, plan, poll):
+        """Read the blocks of a poll, marking the poll once it reaches the bus."""
+        _queued_poll.set(poll)
+        return await self._async_read_block(unit_id, plan, PRIORITY_POLL)
+
+    async def _async_read_block(self, unit_id, plan, priority):
+        """Read all blocks of a read plan with a priority."""
+        snapshot = {}
+        for block in plan.blocks:
+            values = await self.async_execute(
+                ModbusRequest.read(
+                    unit_id, block.table, block.address, block.count, priority
                 )
-                return False
+            )
+            if values is None:
+                continue
+            for offset, value in enumerate(values):
+                snapshot[(block.table, block.address + offset)] = value
+        return snapshot
+
+    async def async_read_cached(self, unit_id, table, address, priority=PRIORITY_POLL):
+        """Read a single register or coil, served from the cache when fresh."""
+        plan = ReadPlan([(table, address)])
+        snapshot = await self.async_read_block(unit_id, plan, priority)
+        return snapshot.get((table, address))
+
+    async def async_queue_write(self, unit_id, table, address, value) -> bool:
+        """Queue a coalesced write of a register or coil.
+
+        Writes to the same register within the coalescing window are merged so
+        only the last value goes out, and adjacent registers are written with
+        a single request.
+        """
+        return await self.write_queue.async_write(unit_id, table, address, value)
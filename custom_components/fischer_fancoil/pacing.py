@@ -0,0 +1,85 @@
+"""Adaptive inter-frame pacing for Fischer Fancoil."""
+
+import asyncio
+import time
+
+DEFAULT_MIN_FRAME_GAP = 0.0
+DEFAULT_MAX_FRAME_GAP = 1.0
+# Gap used for a unit before any of its responses were measured
+INITIAL_FRAME_GAP = 0.05
+# Gap a unit falls back to at least after a failed request
+FAILURE_FRAME_GAP = 0.1
+SPEEDUP_FACTOR = 0.8
+SLOWDOWN_FACTOR = 2.0
+# Share of the average response time a unit waits between frames
+LATENCY_GAP_RATIO = 0.25
+# Weight of the latest response time in the average
+LATENCY_SMOOTHING = 0.2
+
+
+class _UnitPacing:
+    """Pacing state of a single unit."""
+
+    def __init__(self, gap) -> None:
+        """Initialize the pacing state."""
+        self.gap = gap
+        self.latency = None
+        self.last_frame_end = 0.0
+
+
+class AdaptivePacer:
+    """Keep a minimum gap between frames, adapted per unit.
+
+    Before a request to a unit the bus is kept idle for the unit's gap after the
+    end of the previous frame on the host. The gap shrinks while the unit
+    answers and grows after failures, so fast gateways run without pauses while
+    slow devices get the time they need.
+    """
+
+    def __init__(
+        self, min_gap=DEFAULT_MIN_FRAME_GAP, max_gap=DEFAULT_MAX_FRAME_GAP
+    ) -> None:
+        """Initialize the pacer."""
+        self._min_gap = min_gap
+        self._max_gap = max_gap
+        self._units = {}
+        self._last_frame_end = 0.0
+        # Whether the gap is kept after any frame on the host, or only after
+        # frames of the same unit when requests of different units overlap
+        self.shared_bus = True
+
+    def _unit(self, unit_id):
+        """Return the pacing state of a unit."""
+        if unit_id not in self._units:
+            self._units[unit_id] = _UnitPacing(
+                min(max(INITIAL_FRAME_GAP, self._min_gap), self._max_gap)
+            )
+        return self._units[unit_id]
+
+    def get_gap(self, unit_id):
+        """Return the current inter-frame gap of a unit in seconds."""
+        return self._unit(unit_id).gap
+
+    async def async_wait(self, unit_id):
+        """Wait until the bus was idle for the gap of the unit."""
+        unit = self._unit(unit_id)
+        last_frame_end = (
+            self._last_frame_end if self.shared_bus else unit.last_frame_end
+        )
+        delay = last_frame_end + unit.gap - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def record(self, unit_id, latency, success):
+        """Adapt the gap of a unit to the outcome of a request."""
+        unit = self._unit(unit_id)
+        self._last_frame_end = unit.last_frame_end = time.monotonic()
+        if success:
+            if unit.latency is None:
+                unit.latency = latency
+            else:
+                unit.latency += LATENCY_SMOOTHING * (latency - unit.latency)
+            gap = max(unit.gap * SPEEDUP_FACTOR, unit.latency * LATENCY_GAP_RATIO)
+        else:
+            gap = max(unit.gap * SLOWDOWN_FACTOR, FAILURE_FRAME_GAP)
+        unit.gap = min(max(gap, self._min_gap), self._max_gap)
@@ -0,0 +1,359 @@
+"""Request pipeline for Fischer Fancoil."""
+
+import asyncio
+import logging
+import time
+
+from pymodbus.exceptions import ModbusException, ModbusIOException
+
+from .const import TABLE_COIL, TABLE_HOLDING, TABLE_INPUT
+from .metrics import is_timeout
+from .priority import PRIORITY_COMMAND, PRIORITY_POLL
+from .trace import ERROR_EXCEPTION, ERROR_NONE, ERROR_RESPONSE
+
+_LOGGER = logging.getLogger(__name__)
+
+# Unit ID addressing every unit on the bus, which do not answer
+BROADCAST_UNIT_ID = 0
+
+# pymodbus client method, table and description of each function code
+FUNCTIONS = {
+    1: ("read_coils", TABLE_COIL, "reading coils"),
+    3: ("read_holding_registers", TABLE_HOLDING, "reading holding registers"),
+    4: ("read_input_registers", TABLE_INPUT, "reading input registers"),
+    5: ("write_coil", TABLE_COIL, "writing coil"),
+    6: ("write_register", TABLE_HOLDING, "writing register"),
+    15: ("write_coils", TABLE_COIL, "writing coils"),
+    16: ("write_registers", TABLE_HOLDING, "writing registers"),
+}
+READ_FUNCTIONS = {TABLE_COIL: 1, TABLE_HOLDING: 3, TABLE_INPUT: 4}
+# Function codes writing a single value and several values of a table
+WRITE_FUNCTIONS = {TABLE_COIL: (5, 15), TABLE_HOLDING: (6, 16)}
+
+
+class ModbusRequest:
+    """A request to a unit on its way through the pipeline."""
+
+    def __init__(
+        self,
+        unit_id,
+        function_code,
+        address,
+        count=1,
+        values=None,
+        priority=PRIORITY_POLL,
+        timeout=None,
+        broadcast=False,
+    ) -> None:
+        """Initialize the request."""
+        self.unit_id = unit_id
+        self.function_code = function_code
+        self.address = address
+        self.count = count
+        # Values written by a write request
+        self.values = values
+        self.priority = priority
+        # Seconds the request may take on the wire, None for the host default
+        self.timeout = timeout
+        # Sent to every unit of the bus, which do not answer
+        self.broadcast = broadcast
+        # Outcome of the last attempt, set by the transport
+        self.response = None
+        self.latency = 0.0
+
+    @classmethod
+    def read(cls, unit_id, table, address, count, priority=PRIORITY_POLL, **kwargs):
+        """Return a request reading contiguous values of a table."""
+        return cls(
+            unit_id, READ_FUNCTIONS[table], address, count, None, priority, **kwargs
+        )
+
+    @classmethod
+    def write(cls, unit_id, table, address, values, broadcast=False):
+        """Return a request writing contiguous values of a table."""
+        if table not in WRITE_FUNCTIONS:
+            raise ValueError(f"Register table is not writable: {table}")
+        single, multiple = WRITE_FUNCTIONS[table]
+        function_code = single if len(values) == 1 else multiple
+        return cls(
+            unit_id,
+            function_code,
+            address,
+            len(values),
+            list(values),
+            PRIORITY_COMMAND,
+            broadcast=broadcast,
+        )
+
+    @property
+    def table(self):
+        """Return the table the request addresses."""
+        return FUNCTIONS[self.function_code][1]
+
+    @property
+    def is_write(self):
+        """Return whether the request writes values."""
+        return self.values is not None
+
+    @property
+    def method(self):
+        """Return the name of the pymodbus client method sending the request."""
+        return FUNCTIONS[self.function_code][0]
+
+    @property
+    def arguments(self):
+        """Return the arguments of the pymodbus client method."""
+        if not self.is_write:
+            return (self.address, self.count, self.unit_id)
+        if self.function_code in (5, 6):
+            return (self.address, self.values[0], self.unit_id)
+        return (self.address, self.values, self.unit_id)
+
+    def decode(self, response):
+        """Return the values of a response, or None if the request failed."""
+        if self.broadcast:
+            # Broadcasts are not answered
+            return self.values
+        if response.isError():
+            return None
+        if self.function_code == 1:
+            # Coil responses are padded to a whole number of bytes
+            return (
+                response.bits[: self.count]
+                if len(response.bits) >= self.count
+                else None
+            )
+        if self.function_code in (3, 4):
+            return response.registers if len(response.registers) == self.count else None
+        return self.values
+
+    def __str__(self) -> str:
+        """Return a description of the request for log messages."""
+        return (
+            f"{FUNCTIONS[self.function_code][2]} at address {self.address}"
+            f" of unit {self.unit_id}"
+        )
+
+
+class RequestPipeline:
+    """Pass requests through a chain of middlewares to the transport.
+
+    A middleware is called with the request and the next step of the chain,
+    and returns the values of the request or None if it failed. The transport
+    at the end of the chain sends the request.
+    """
+
+    def __init__(self, middlewares, transport) -> None:
+        """Initialize the pipeline."""
+        self._middlewares = tuple(middlewares)
+        self._transport = transport
+
+    async def async_execute(self, request):
+        """Send a request through the chain and return its values."""
+        return await self._async_call(0, request)
+
+    async def _async_call(self, index, request):
+        """Call the middleware at an index of the chain."""
+        if index == len(self._middlewares):
+            return await self._transport(request)
+        return await self._middlewares[index](
+            request, lambda request: self._async_call(index + 1, request)
+        )
+
+
+class CacheMiddleware:
+    """Serve reads from the register cache and invalidate written values.
+
+    Reads that miss the cache wait for pending writes first, so they do not
+    return values about to be overwritten, and the write queue drops the
+    values it queues from the cache. Written values are invalidated before
+    and again after the write, so a read that overlapped the write cannot
+    leave the old values in the cache.
+    """
+
+    def __init__(self, modbus_host) -> None:
+        """Initialize the middleware."""
+        self._modbus_host = modbus_host
+
+    async def __call__(self, request, call_next):
+        """Serve or forward a request."""
+        cache = self._modbus_host.cache
+        if request.is_write:
+            self._invalidate(cache, request)
+            try:
+                return await call_next(request)
+            finally:
+                self._invalidate(cache, request)
+
+        values = cache.get_block(
+            request.unit_id, request.table, request.address, request.count
+        )
+        if values is not None:
+            return values
+        await self._modbus_host.async_wait_for_writes()
+        version = cache.version
+        values = await call_next(request)
+        if values is not None:
+            cache.put_block(
+                request.unit_id, request.table, request.address, values, version
+            )
+        return values
+
+    @staticmethod
+    def _invalidate(cache, request):
+        """Drop the cached values a write request overwrites."""
+        if request.broadcast:
+            cache.invalidate_all_units(request.table, request.address, request.count)
+        else:
+            cache.invalidate(
+                request.unit_id, request.table, request.address, request.count
+            )
+
+
+class RetryMiddleware:
+    """Retry failed requests with backoff, skipping units that stopped answering.
+
+    A request is tried 'retry_policy.max_attempts' times, releasing the bus
+    while it backs off between the attempts. Timeouts and Modbus exceptions
+    count as failed attempts. The outcome is recorded in the circuit breaker.
+
+    Only polls are skipped while the circuit of their unit is open. Commands
+    and their confirmations are sent, and close the circuit if the unit
+    answers them.
+    """
+
+    def __init__(self, modbus_host) -> None:
+        """Initialize the middleware."""
+        self._modbus_host = modbus_host
+
+    async def __call__(self, request, call_next):
+        """Send a request until it succeeds or the attempts are exhausted."""
+        circuit_breaker = self._modbus_host.circuit_breaker
+        gated = request.priority == PRIORITY_POLL
+        if gated and not circuit_breaker.allow(request.unit_id):
+            return None
+        try:
+            return await self._async_attempts(request, call_next)
+        except BaseException:
+            # Cancelled or failed unexpectedly, the request proved nothing
+            if gated:
+                circuit_breaker.record_abandoned(request.unit_id)
+            raise
+
+    async def _async_attempts(self, request, call_next):
+        """Try a request the attempts of the retry policy."""
+        retry_policy = self._modbus_host.retry_policy
+        circuit_breaker = self._modbus_host.circuit_breaker
+        for attempt in range(retry_policy.max_attempts):
+            try:
+                values = await call_next(request)
+            except (asyncio.TimeoutError, ModbusException) as e:
+                _LOGGER.debug("Modbus exception %s: %s", request, e)
+                values = None
+            if values is not None:
+                circuit_breaker.record_success(request.unit_id)
+                return values
+
+            if attempt < retry_policy.max_attempts - 1:
+                _LOGGER.warning("Modbus error %s, retrying", request)
+                self._modbus_host.metrics.record_retry(request.unit_id)
+                await asyncio.sleep(retry_policy.get_delay(attempt))
+
+        _LOGGER.error("Modbus error %s, retries exhausted", request)
+        circuit_breaker.record_failure(request.unit_id)
+        return None
+
+
+class BusSlotMiddleware:
+    """Hold a bus slot of the host while a request is sent."""
+
+    def __init__(self, modbus_host) -> None:
+        """Initialize the middleware."""
+        self._modbus_host = modbus_host
+
+    async def __call__(self, request, call_next):
+        """Send a request once the bus was granted to it."""
+        async with self._modbus_host.async_bus_slot(request):
+            return await call_next(request)
+
+
+class PacingMiddleware:
+    """Keep the inter-frame gap of the unit before a request and adapt it."""
+
+    def __init__(self, modbus_host) -> None:
+        """Initialize the middleware."""
+        self._modbus_host = modbus_host
+
+    async def __call__(self, request, call_next):
+        """Send a request once the bus was idle for the gap of the unit."""
+        pacer = self._modbus_host.pacer
+        await pacer.async_wait(request.unit_id)
+        try:
+            values = await call_next(request)
+        except Exception:
+            pacer.record(request.unit_id, request.latency, False)
+            raise
+        pacer.record(request.unit_id, request.latency, values is not None)
+        return values
+
+
+class MetricsMiddleware:
+    """Record the wire time and outcome of every request."""
+
+    def __init__(self, modbus_host) -> None:
+        """Initialize the middleware."""
+        self._modbus_host = modbus_host
+
+    async def __call__(self, request, call_next):
+        """Send a request and record it in the metrics."""
+        metrics = self._modbus_host.metrics
+        try:
+            values = await call_next(request)
+        except Exception as e:
+            metrics.record_request(
+                request.unit_id, request.latency, False, is_timeout(e)
+            )
+            raise
+        metrics.record_request(
+            request.unit_id,
+            request.latency,
+            values is not None,
+            isinstance(request.response, ModbusIOException),
+        )
+        return values
+
+
+class TraceMiddleware:
+    """Append every request to the trace of the host while tracing."""
+
+    def __init__(self, modbus_host) -> None:
+        """Initialize the middleware."""
+        self._modbus_host = modbus_host
+
+    async def __call__(self, request, call_next):
+        """Send a request and record it in the trace."""
+        if self._modbus_host.trace is None:
+            return await call_next(request)
+        try:
+            values = await call_next(request)
+        except Exception:
+            self._record(request, ERROR_EXCEPTION, request.values or ())
+            raise
+        if values is None:
+            self._record(request, ERROR_RESPONSE, request.values or ())
+        else:
+            self._record(request, ERROR_NONE, values)
+        return values
+
+    def _record(self, request, error, values):
+        """Append a request to the trace."""
+        self._modbus_host.trace.record(
+            time.time(),
+            request.unit_id,
+            request.function_code,
+            request.address,
+            request.count,
+            error,
+            request.latency,
+            values,
+        )
@@ -0,0 +1,78 @@
+"""Request priorities for Fischer Fancoil."""
+
+import asyncio
+from contextlib import asynccontextmanager
+import heapq
+import itertools
+
+# Priorities of the requests on a Modbus host, lower values go first
+PRIORITY_COMMAND = 0
+PRIORITY_CONFIRM = 1
+PRIORITY_POLL = 2
+
+
+class BusQueue:
+    """Grant the bus slots of a host to the waiting requests by priority.
+
+    A unit has a single request in flight at a time. Of the requests whose
+    unit is idle, the one of the highest priority gets the next free slot,
+    and requests of the same priority are served in the order they arrived.
+    """
+
+    def __init__(self, slots=1) -> None:
+        """Initialize the queue."""
+        self._slots = slots
+        self._in_flight = 0
+        self._busy_units = set()
+        self._waiters = []
+        self._counter = itertools.count()
+
+    def set_slots(self, slots):
+        """Set the number of requests that may be in flight at once."""
+        self._slots = slots
+        self._grant()
+
+    async def acquire(self, unit_id, priority=PRIORITY_POLL):
+        """Wait for a slot for a request to a unit."""
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._counter), unit_id, future))
+        self._grant()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # The slot was granted just before the cancellation
+                self.release(unit_id)
+            raise
+
+    def release(self, unit_id):
+        """Free the slot of a unit's request."""
+        self._in_flight -= 1
+        self._busy_units.discard(unit_id)
+        self._grant()
+
+    def _grant(self):
+        """Hand the free slots to the first waiters of idle units."""
+        skipped = []
+        while self._waiters and self._in_flight < self._slots:
+            waiter = heapq.heappop(self._waiters)
+            _, _, unit_id, future = waiter
+            if future.done():
+                continue
+            if unit_id in self._busy_units:
+                skipped.append(waiter)
+                continue
+            self._in_flight += 1
+            self._busy_units.add(unit_id)
+            future.set_result(None)
+        for waiter in skipped:
+            heapq.heappush(self._waiters, waiter)
+
+    @asynccontextmanager
+    async def async_slot(self, unit_id, priority=PRIORITY_POLL):
+        """Hold a slot for a request to a unit for the duration of the context."""
+        await self.acquire(unit_id, priority)
+        try:
+            yield
+        finally:
+            self.release(unit_id)
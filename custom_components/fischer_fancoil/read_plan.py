@@ -0,0 +1,55 @@
+"""Block read planning for Fischer Fancoil."""
+
+from typing import NamedTuple
+
+from .const import DEFAULT_MAX_READ_GAP, TABLE_COIL, TABLE_HOLDING, TABLE_INPUT
+
+# Modbus limits on the number of values returned by a single read request
+MAX_BLOCK_SIZE = {
+    TABLE_COIL: 2000,
+    TABLE_HOLDING: 125,
+    TABLE_INPUT: 125,
+}
+
+
+class ReadBlock(NamedTuple):
+    """A contiguous range of addresses read with a single request."""
+
+    table: str
+    address: int
+    count: int
+
+
+class ReadPlan:
+    """Merge the addresses of a register map into as few reads as possible."""
+
+    def __init__(self, points, max_gap=DEFAULT_MAX_READ_GAP) -> None:
+        """Initialize the plan from (table, address) points."""
+        self.points = tuple(sorted(set(points)))
+        self.max_gap = max_gap
+        self.blocks = tuple(self._merge(self.points, max_gap))
+
+    @staticmethod
+    def _merge(points, max_gap):
+        """Build the blocks covering the sorted points."""
+        block = None
+        for table, address in points:
+            if table not in MAX_BLOCK_SIZE:
+                raise ValueError(f"Unknown register table: {table}")
+            if (
+                block is not None
+                and block.table == table
+                and address - (block.address + block.count) <= max_gap
+                and address - block.address < MAX_BLOCK_SIZE[table]
+            ):
+                block = block._replace(count=address - block.address + 1)
+                continue
+            if block is not None:
+                yield block
+            block = ReadBlock(table, address, 1)
+        if block is not None:
+            yield block
+
+    def __repr__(self) -> str:
+        """Return the blocks of the plan."""
+        return f"ReadPlan({list(self.blocks)})"
@@ -0,0 +1,81 @@
+"""Register snapshot cache for Fischer Fancoil."""
+
+import time
+
+from .const import DEFAULT_CACHE_TTL
+
+
+class RegisterCache:
+    """Cache read register values per (unit_id, table, address).
+
+    Values expire after the TTL of their register, which defaults to
+    DEFAULT_CACHE_TTL and can be overridden per register, like the register
+    map does for its points. Every invalidation
+    bumps the version of the cache, so a read that was in flight meanwhile
+    does not store values that predate a write.
+    """
+
+    def __init__(self, default_ttl=DEFAULT_CACHE_TTL, ttls=None) -> None:
+        """Initialize the cache with the TTLs of (table, address) registers."""
+        self._default_ttl = default_ttl
+        self._ttls = {}
+        for (table, address), ttl in (ttls or {}).items():
+            self.set_ttl(table, address, ttl)
+        # (unit_id, table, address) -> (value, expiry time)
+        self._entries = {}
+        self.version = 0
+        self.hits = 0
+        self.misses = 0
+
+    def set_ttl(self, table, address, ttl):
+        """Set the time to live of a register in seconds."""
+        self._ttls[(table, address)] = ttl
+
+    def get_ttl(self, table, address):
+        """Return the time to live of a register in seconds."""
+        return self._ttls.get((table, address), self._default_ttl)
+
+    def get_block(self, unit_id, table, address, count):
+        """Return the cached values of a block, or None unless all are fresh."""
+        now = time.monotonic()
+        values = []
+        for offset in range(count):
+            entry = self._entries.get((unit_id, table, address + offset))
+            if entry is None or entry[1] < now:
+                self.misses += 1
+                return None
+            values.append(entry[0])
+        self.hits += 1
+        return values
+
+    def put_block(self, unit_id, table, address, values, version=None):
+        """Store the values of a block read from the bus.
+
+        Values of a read that started at another version are dropped.
+        """
+        if version is not None and version != self.version:
+            return
+        now = time.monotonic()
+        for offset, value in enumerate(values):
+            ttl = self.get_ttl(table, address + offset)
+            self._entries[(unit_id, table, address + offset)] = (value, now + ttl)
+
+    def invalidate(self, unit_id, table, address, count=1):
+        """Drop the cached values of a block."""
+        self.version += 1
+        for offset in range(count):
+            self._entries.pop((unit_id, table, address + offset), None)
+
+    def invalidate_all_units(self, table, address, count=1):
+        """Drop the cached values of a block for every unit."""
+        self.version += 1
+        addresses = range(address, address + count)
+        for key in [
+            key for key in self._entries if key[1] == table and key[2] in addresses
+        ]:
+            del self._entries[key]
+
+    @property
+    def stats(self):
+        """Return the hit and miss counters of the cache."""
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._entries)}
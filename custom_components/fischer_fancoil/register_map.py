@@ -0,0 +1,260 @@
+"""Declarative register map for Fischer Fancoil."""
+
+from typing import Any, NamedTuple
+
+from homeassistant.const import UnitOfTemperature
+
+from .const import (
+    DATA_COIL_TEMP,
+    DATA_EHEAT,
+    DATA_FAN_SPEED,
+    DATA_INDOOR_TEMP,
+    DATA_OPMODE,
+    DATA_POWER,
+    DATA_SET_TEMP,
+    DATA_SLEEP,
+    DATA_SWING,
+    DEFAULT_CACHE_TTL,
+    DEFAULT_MAX_READ_GAP,
+    ENCODING_BCD,
+    ENCODING_BOOL,
+    ENCODING_ENUM,
+    ENCODING_INT,
+    MEASURED_CACHE_TTL,
+    REGISTER_COIL_TEMP,
+    REGISTER_EHEAT,
+    REGISTER_FAN_SPEED,
+    REGISTER_INDOOR_TEMP,
+    REGISTER_OPMODE,
+    REGISTER_POWER,
+    REGISTER_SET_TEMP,
+    REGISTER_SLEEP,
+    REGISTER_SWING,
+    SETTING_CACHE_TTL,
+    SLOW_CACHE_TTL,
+    TABLE_COIL,
+    TABLE_HOLDING,
+    TABLE_INPUT,
+)
+from .read_plan import ReadPlan
+
+
+class RegisterPoint(NamedTuple):
+    """A value of the fancoil stored in one or more registers or coils."""
+
+    key: str
+    table: str
+    address: int
+    encoding: str = ENCODING_INT
+    # Number of registers, the first one holds the most significant word
+    width: int = 1
+    # Raw value to decoded value of enum points
+    options: dict[int, Any] | None = None
+    scale: float = 1
+    # Integers stored in two's complement over the registers of the point
+    signed: bool = False
+    unit: str | None = None
+    # Settings that rarely change are only read by every full poll
+    slow: bool = False
+    # Seconds a read value is served from the register cache
+    ttl: float = DEFAULT_CACHE_TTL
+
+
+REGISTER_MAP = (
+    RegisterPoint(
+        DATA_POWER, TABLE_COIL, REGISTER_POWER, ENCODING_BOOL, ttl=SETTING_CACHE_TTL
+    ),
+    RegisterPoint(
+        DATA_SLEEP,
+        TABLE_COIL,
+        REGISTER_SLEEP,
+        ENCODING_BOOL,
+        slow=True,
+        ttl=SLOW_CACHE_TTL,
+    ),
+    RegisterPoint(
+        DATA_SWING,
+        TABLE_COIL,
+        REGISTER_SWING,
+        ENCODING_ENUM,
+        options={False: "off", True: "on"},
+        slow=True,
+        ttl=SLOW_CACHE_TTL,
+    ),
+    RegisterPoint(
+        DATA_EHEAT,
+        TABLE_COIL,
+        REGISTER_EHEAT,
+        ENCODING_BOOL,
+        slow=True,
+        ttl=SLOW_CACHE_TTL,
+    ),
+    RegisterPoint(
+        DATA_SET_TEMP,
+        TABLE_HOLDING,
+        REGISTER_SET_TEMP,
+        unit=UnitOfTemperature.CELSIUS,
+        ttl=SETTING_CACHE_TTL,
+    ),
+    RegisterPoint(
+        DATA_FAN_SPEED,
+        TABLE_HOLDING,
+        REGISTER_FAN_SPEED,
+        ENCODING_ENUM,
+        options={0: "auto", 1: "high", 2: "medium", 3: "low"},
+        ttl=SETTING_CACHE_TTL,
+    ),
+    RegisterPoint(
+        DATA_OPMODE,
+        TABLE_HOLDING,
+        REGISTER_OPMODE,
+        ENCODING_ENUM,
+        options={0: "auto", 1: "cool", 2: "dry", 3: "heat", 4: "fan_only", 5: "off"},
+        ttl=SETTING_CACHE_TTL,
+    ),
+    RegisterPoint(
+        DATA_INDOOR_TEMP,
+        TABLE_INPUT,
+        REGISTER_INDOOR_TEMP,
+        ENCODING_BCD,
+        unit=UnitOfTemperature.CELSIUS,
+        ttl=MEASURED_CACHE_TTL,
+    ),
+    RegisterPoint(
+        DATA_COIL_TEMP,
+        TABLE_INPUT,
+        REGISTER_COIL_TEMP,
+        ENCODING_BCD,
+        unit=UnitOfTemperature.CELSIUS,
+        ttl=MEASURED_CACHE_TTL,
+    ),
+)
+
+# Decimal value of every BCD encoded byte
+_BCD_BYTE = tuple((byte >> 4) * 10 + (byte & 0xF) for byte in range(256))
+
+
+def _decode_bcd(value):
+    """Decode a BCD encoded register value."""
+    return _BCD_BYTE[value >> 8] * 100 + _BCD_BYTE[value & 0xFF]
+
+
+def _build_decoder(point):
+    """Return the function decoding the raw value of a point."""
+    if point.encoding == ENCODING_BOOL:
+        return bool
+    if point.encoding == ENCODING_BCD:
+        return _decode_bcd
+    if point.encoding == ENCODING_ENUM:
+        return point.options.get
+    scale = point.scale
+    if point.signed:
+        sign_bit = 1 << (16 * point.width - 1)
+        if scale == 1:
+            return lambda value: (value ^ sign_bit) - sign_bit
+        return lambda value: ((value ^ sign_bit) - sign_bit) * scale
+    if scale == 1:
+        return int
+    return lambda value: value * scale
+
+
+def _build_encoder(point):
+    """Return the function encoding a value of a point to its raw value."""
+    if point.encoding == ENCODING_BOOL:
+        return bool
+    if point.encoding == ENCODING_BCD:
+        return lambda value: int(str(int(value)), 16)
+    if point.encoding == ENCODING_ENUM:
+        raw_values = {value: raw for raw, value in point.options.items()}
+        return raw_values.__getitem__
+    scale = point.scale
+    if point.signed:
+        mask = (1 << (16 * point.width)) - 1
+        return lambda value: int(round(value / scale)) & mask
+    return lambda value: int(round(value / scale))
+
+
+class CompiledRegisterMap:
+    """A register map compiled into a block read plan and decoders.
+
+    The decoders are resolved once, so decoding a snapshot is a single pass
+    over a flat list of precomputed (point, address, decoder) entries.
+    """
+
+    def __init__(self, points, max_gap=DEFAULT_MAX_READ_GAP) -> None:
+        """Compile the register map."""
+        self.points = {point.key: point for point in points}
+        self.plan = self._build_plan(points, max_gap)
+        # Plan of the points read by every poll, without the slow points
+        self.fast_plan = self._build_plan(
+            [point for point in points if not point.slow], max_gap
+        )
+        self.slow_keys = frozenset(point.key for point in points if point.slow)
+        # Cache TTL of every (table, address) register of the points
+        self.ttls = {
+            (point.table, point.address + offset): point.ttl
+            for point in points
+            for offset in range(point.width)
+        }
+        # Plans reading back a single point after it was written
+        self.point_plans = {
+            point.key: self._build_plan([point], max_gap) for point in points
+        }
+        self._decoders = tuple(
+            (point.key, (point.table, point.address), _build_decoder(point))
+            for point in points
+            if point.width == 1
+        )
+        self._wide_decoders = tuple(
+            (
+                point.key,
+                tuple(
+                    (point.table, point.address + offset)
+                    for offset in range(point.width)
+                ),
+                _build_decoder(point),
+            )
+            for point in points
+            if point.width > 1
+        )
+        self._encoders = {point.key: _build_encoder(point) for point in points}
+
+    @staticmethod
+    def _build_plan(points, max_gap):
+        """Return the read plan covering every register of the points."""
+        return ReadPlan(
+            (
+                (point.table, point.address + offset)
+                for point in points
+                for offset in range(point.width)
+            ),
+            max_gap,
+        )
+
+    def decode(self, snapshot):
+        """Decode a raw (table, address) snapshot into a dictionary by key."""
+        data = {}
+        for key, register, decoder in self._decoders:
+            if register in snapshot:
+                data[key] = decoder(snapshot[register])
+        for key, registers, decoder in self._wide_decoders:
+            if all(register in snapshot for register in registers):
+                value = 0
+                for register in registers:
+                    value = (value << 16) | snapshot[register]
+                data[key] = decoder(value)
+        return data
+
+    def encode(self, key, value):
+        """Encode a value of a point to the raw value to write."""
+        return self._encoders[key](value)
+
+
+COMPILED_REGISTER_MAP = CompiledRegisterMap(REGISTER_MAP)
+
+# Measured temperatures, which may be given a deadband
+MEASURED_TEMPERATURE_KEYS = tuple(
+    point.key
+    for point in REGISTER_MAP
+    if point.table == TABLE_INPUT and point.unit == UnitOfTemperature.CELSIUS
+)
@@ -0,0 +1,112 @@
+"""Retry policy and circuit breaker for Fischer Fancoil."""
+
+import logging
+import random
+import time
+
+_LOGGER = logging.getLogger(__name__)
+
+# Consecutive failed requests after which a unit is no longer polled
+DEFAULT_FAILURE_THRESHOLD = 3
+# Seconds an open circuit waits before it lets a probe request through
+DEFAULT_RESET_TIMEOUT = 60
+
+
+class RetryPolicy:
+    """Exponential backoff with jitter between the attempts of a request."""
+
+    def __init__(
+        self, max_attempts=3, base_delay=0.5, max_delay=5.0, jitter=0.5
+    ) -> None:
+        """Initialize the retry policy."""
+        self.max_attempts = max_attempts
+        self._base_delay = base_delay
+        self._max_delay = max_delay
+        self._jitter = jitter
+
+    def get_delay(self, attempt):
+        """Return the seconds to wait after the given failed attempt."""
+        delay = min(self._base_delay * 2**attempt, self._max_delay)
+        return delay * (1 - self._jitter * random.random())
+
+
+class _Circuit:
+    """Circuit state of a single unit."""
+
+    def __init__(self) -> None:
+        """Initialize the circuit."""
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+
+
+class CircuitBreaker:
+    """Stop polling units that stopped responding, probing them occasionally.
+
+    After DEFAULT_FAILURE_THRESHOLD consecutive failures the circuit of a unit
+    opens and its polls are skipped. Once the reset timeout passed a single
+    probe is let through, which closes the circuit again if it succeeds, as
+    does any other request the unit answers.
+    """
+
+    def __init__(
+        self,
+        failure_threshold=DEFAULT_FAILURE_THRESHOLD,
+        reset_timeout=DEFAULT_RESET_TIMEOUT,
+    ) -> None:
+        """Initialize the circuit breaker."""
+        self._failure_threshold = failure_threshold
+        self._reset_timeout = reset_timeout
+        self._circuits = {}
+
+    def _circuit(self, unit_id):
+        """Return the circuit of a unit."""
+        if unit_id not in self._circuits:
+            self._circuits[unit_id] = _Circuit()
+        return self._circuits[unit_id]
+
+    def is_open(self, unit_id):
+        """Return whether requests to a unit are currently skipped."""
+        return self._circuit(unit_id).opened_at is not None
+
+    def allow(self, unit_id):
+        """Return whether a request to a unit may be sent."""
+        circuit = self._circuit(unit_id)
+        if circuit.opened_at is None:
+            return True
+        if circuit.probing:
+            return False
+        if time.monotonic() - circuit.opened_at < self._reset_timeout:
+            return False
+        _LOGGER.debug("Probing unreachable fancoil unit %s", unit_id)
+        circuit.probing = True
+        return True
+
+    def record_success(self, unit_id):
+        """Close the circuit of a unit that answered."""
+        circuit = self._circuit(unit_id)
+        if circuit.opened_at is not None:
+            _LOGGER.info("Fancoil unit %s is reachable again", unit_id)
+        circuit.failures = 0
+        circuit.opened_at = None
+        circuit.probing = False
+
+    def record_abandoned(self, unit_id):
+        """Let another probe through after a request ended without an outcome."""
+        self._circuit(unit_id).probing = False
+
+    def record_failure(self, unit_id):
+        """Count a failed request and open the circuit at the threshold."""
+        circuit = self._circuit(unit_id)
+        circuit.failures += 1
+        if circuit.probing or (
+            circuit.opened_at is None and circuit.failures >= self._failure_threshold
+        ):
+            if circuit.opened_at is None:
+                _LOGGER.warning(
+                    "Fancoil unit %s is not responding, polling it every %s seconds",
+                    unit_id,
+                    self._reset_timeout,
+                )
+            circuit.opened_at = time.monotonic()
+            circuit.probing = False
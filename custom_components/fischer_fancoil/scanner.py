@@ -0,0 +1,62 @@
+"""Discovery of the fancoil units behind a Modbus host."""
+
+import asyncio
+import logging
+
+from .const import DATA_FAN_SPEED, DATA_OPMODE, DATA_SET_TEMP
+from .modbus_host import ModbusHost
+from .register_map import COMPILED_REGISTER_MAP
+
+_LOGGER = logging.getLogger(__name__)
+
+# Units probed at once, the bus concurrency is further limited by the host
+DEFAULT_SCAN_PARALLELISM = 8
+# Seconds a probed unit has to answer each request
+DEFAULT_SCAN_TIMEOUT = 0.5
+# Range of target temperatures a fancoil reports
+SET_TEMP_RANGE = range(5, 41)
+
+
+def is_fancoil(data) -> bool:
+    """Return whether decoded register values look like a fancoil."""
+    if data.keys() != COMPILED_REGISTER_MAP.points.keys():
+        return False
+    # Enum points decode raw values outside of their options to None
+    if data[DATA_OPMODE] is None or data[DATA_FAN_SPEED] is None:
+        return False
+    return data[DATA_SET_TEMP] in SET_TEMP_RANGE
+
+
+async def async_scan_units(
+    modbus_host: ModbusHost,
+    unit_ids,
+    parallelism=DEFAULT_SCAN_PARALLELISM,
+    timeout=DEFAULT_SCAN_TIMEOUT,
+):
+    """Probe unit IDs concurrently and return the data of every fancoil found.
+
+    Every unit is read once with the full read plan of the register map, and
+    recognised by the values it returns.
+    """
+    semaphore = asyncio.Semaphore(parallelism)
+
+    async def async_probe(unit_id):
+        async with semaphore:
+            snapshot = await modbus_host.async_probe(
+                unit_id, COMPILED_REGISTER_MAP.plan, timeout
+            )
+        if snapshot is None:
+            return None
+        data = COMPILED_REGISTER_MAP.decode(snapshot)
+        if not is_fancoil(data):
+            _LOGGER.debug("Unit %s answered but is not a fancoil: %s", unit_id, data)
+            return None
+        return data
+
+    unit_ids = list(unit_ids)
+    results = await asyncio.gather(*(async_probe(unit_id) for unit_id in unit_ids))
+    found = {
+        unit_id: data for unit_id, data in zip(unit_ids, results) if data is not None
+    }
+    _LOGGER.debug("Found fancoil units %s", list(found))
+    return found
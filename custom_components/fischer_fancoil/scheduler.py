@@ -0,0 +1,213 @@
+"""Bus scheduler for Fischer Fancoil."""
+
+import asyncio
+import logging
+import time
+
+_LOGGER = logging.getLogger(__name__)
+
+# Utilisation of a unit's slot above which the bus counts as saturated
+SATURATED_UTILISATION = 1.0
+# Utilisation below which the scheduler recovers from a backoff
+IDLE_UTILISATION = 0.5
+BACKOFF_STEP = 1.25
+MAX_BACKOFF = 4.0
+# Weight of the latest refresh in the utilisation average
+UTILISATION_SMOOTHING = 0.2
+
+
+class _ScheduledUnit:
+    """A unit polled by the scheduler."""
+
+    def __init__(self, unit_id, interval, plan, refresh) -> None:
+        """Initialize the scheduled unit."""
+        self.unit_id = unit_id
+        self.interval = interval
+        self.refresh = refresh
+        # Every block of the plan is one request on the bus
+        self.weight = max(len(plan.blocks), 1)
+        # Units are due right away until their first poll
+        self.next_due = 0.0
+        self.polled = False
+        self.refreshing = False
+
+
+class BusScheduler:
+    """Spread the polls of every unit behind a Modbus host over the poll interval.
+
+    Each unit gets a slot proportional to the number of requests of its read
+    plan, so the bus sees a steady stream of reads instead of a burst at every
+    poll tick. Reads wait for pending writes, and the cycle is stretched while
+    refreshes overrun their slots.
+
+    Newly added units are polled right away, back to back with the other new
+    units of the host, so the first polls after startup take one burst
+    however many units are set up. Once every unit was polled the units are
+    spread over their intervals.
+    """
+
+    def __init__(self, modbus_host, create_task=asyncio.create_task) -> None:
+        """Initialize the scheduler.
+
+        The polling task is started with create_task, which is called with
+        the coroutine and a name keyword, like asyncio.create_task.
+        """
+        self._modbus_host = modbus_host
+        self._create_task = create_task
+        self._units = {}
+        self._task = None
+        self._changed = asyncio.Event()
+        self._backoff = 1.0
+        self._utilisation = 0.0
+
+    @property
+    def backoff(self):
+        """Return the factor the poll intervals are currently stretched by."""
+        return self._backoff
+
+    def add_unit(self, unit_id, interval, plan, refresh):
+        """Schedule the refresh of a unit and return a callback to remove it."""
+        self._units[unit_id] = _ScheduledUnit(unit_id, interval, plan, refresh)
+        self._rebalance()
+        if self._task is None or self._task.done():
+            self._task = self._create_task(
+                self._async_run(), name="fischer_fancoil bus scheduler"
+            )
+
+        def remove_unit():
+            if self._units.pop(unit_id, None) is None:
+                return
+            self._rebalance()
+            if not self._units and self._task is not None:
+                self._task.cancel()
+                self._task = None
+
+        return remove_unit
+
+    async def async_stop(self):
+        """Stop polling every unit, for good unless units are added again."""
+        self._units.clear()
+        task, self._task = self._task, None
+        if task is None or task.done():
+            return
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+    def time_until_due(self, unit_id):
+        """Return the seconds until the next poll of a unit starts, if known."""
+        unit = self._units.get(unit_id)
+        if unit is None or unit.refreshing:
+            return None
+        return max(unit.next_due - time.monotonic(), 0.0)
+
+    def set_interval(self, unit_id, interval):
+        """Change the poll interval of a unit, pulling its next poll closer."""
+        unit = self._units.get(unit_id)
+        if unit is None or unit.interval == interval:
+            return
+        unit.interval = interval
+        if unit.refreshing:
+            # The next poll is scheduled when the refresh finishes
+            return
+        due = time.monotonic() + interval * self._backoff
+        if unit.next_due > due:
+            unit.next_due = due
+            self._changed.set()
+
+    def _rebalance(self):
+        """Spread the next polls of the polled units evenly over their intervals."""
+        polled = [unit for unit in self._units.values() if unit.polled]
+        total_weight = sum(unit.weight for unit in polled)
+        now = time.monotonic()
+        offset = 0
+        for unit in sorted(polled, key=lambda unit: unit.next_due):
+            offset += unit.weight
+            unit.next_due = now + unit.interval * self._backoff * offset / total_weight
+        self._changed.set()
+
+    def _slot(self, unit):
+        """Return the share of the cycle reserved for a unit."""
+        total_weight = sum(other.weight for other in self._units.values())
+        return unit.interval * self._backoff * unit.weight / total_weight
+
+    async def _async_run(self):
+        """Poll the units in order of their due time."""
+        running = set()
+        try:
+            while self._units:
+                idle = [unit for unit in self._units.values() if not unit.refreshing]
+                if not idle or len(running) >= self._modbus_host.pipeline_depth:
+                    await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                    continue
+
+                unit = min(idle, key=lambda unit: unit.next_due)
+                delay = unit.next_due - time.monotonic()
+                if delay > 0:
+                    self._changed.clear()
+                    changed = asyncio.ensure_future(self._changed.wait())
+                    try:
+                        done, _ = await asyncio.wait(
+                            {changed, *running},
+                            timeout=delay,
+                            return_when=asyncio.FIRST_COMPLETED,
+                        )
+                    finally:
+                        # Also when the scheduler is stopped meanwhile
+                        changed.cancel()
+                    if done:
+                        # The set of units or the running refreshes changed
+                        continue
+
+                await self._modbus_host.async_wait_for_writes()
+                unit.refreshing = True
+                task = asyncio.create_task(self._async_refresh(unit))
+                running.add(task)
+                task.add_done_callback(running.discard)
+        finally:
+            for task in running:
+                task.cancel()
+
+    async def _async_refresh(self, unit):
+        """Refresh a unit and schedule its next poll."""
+        start = time.monotonic()
+        try:
+            await unit.refresh()
+        except Exception as e:
+            _LOGGER.error("Error polling fancoil unit %s: %s", unit.unit_id, e)
+        finally:
+            unit.refreshing = False
+        duration = time.monotonic() - start
+        first_poll = not unit.polled
+        unit.polled = True
+
+        if self._units.get(unit.unit_id) is not unit:
+            return
+        if first_poll:
+            unit.next_due = time.monotonic() + unit.interval * self._backoff
+            if all(other.polled for other in self._units.values()):
+                # The burst of first polls is over
+                self._rebalance()
+        else:
+            # Refreshes of several units overlap when requests are pipelined
+            slot = self._slot(unit) * self._modbus_host.pipeline_depth
+            self._update_backoff(duration / slot)
+            unit.next_due = max(
+                unit.next_due + unit.interval * self._backoff,
+                time.monotonic() + self._slot(unit),
+            )
+
+    def _update_backoff(self, utilisation):
+        """Stretch the cycle while the bus is saturated and recover when idle."""
+        self._utilisation += UTILISATION_SMOOTHING * (utilisation - self._utilisation)
+        if self._utilisation > SATURATED_UTILISATION and self._backoff < MAX_BACKOFF:
+            self._backoff = min(self._backoff * BACKOFF_STEP, MAX_BACKOFF)
+            _LOGGER.warning(
+                "Modbus bus saturated, stretching poll interval by %.2f",
+                self._backoff,
+            )
+        elif self._utilisation < IDLE_UTILISATION and self._backoff > 1.0:
+            self._backoff = max(self._backoff / BACKOFF_STEP, 1.0)
+            _LOGGER.debug("Modbus bus recovered, poll backoff %.2f", self._backoff)
@@ -3,29 +3,104 @@
 import logging
 
 from homeassistant.components.sensor import (
+    RestoreSensor,
     SensorDeviceClass,
     SensorEntity,
     SensorStateClass,
 )
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.const import UnitOfTemperature
-from homeassistant.core import HomeAssistant
+from homeassistant.const import EntityCategory, UnitOfTemperature, UnitOfTime
+from homeassistant.core import HomeAssistant, callback
 from homeassistant.helpers.entity import DeviceInfo
 from homeassistant.helpers.typing import StateType
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
+from homeassistant.helpers.update_coordinator import CoordinatorEntity
 
-from .const import CONF_NAME, CONF_UNIT_ID, DOMAIN, REGISTER_COIL_TEMP
+from .const import (
+    CONF_HOST,
+    CONF_NAME,
+    CONF_PORT,
+    CONF_UNIT_ID,
+    DATA_COIL_TEMP,
+    DATA_EHEAT,
+    DATA_FAN_SPEED,
+    DATA_INDOOR_TEMP,
+    DATA_OPMODE,
+    DATA_POWER,
+    DATA_SET_TEMP,
+    DATA_SLEEP,
+    DATA_SWING,
+    DOMAIN,
+    ENCODING_BOOL,
+    ENCODING_ENUM,
+)
+from .coordinator import FischerFancoilCoordinator
+from .entity import FischerFancoilEntity
+from .register_map import COMPILED_REGISTER_MAP
 
 _LOGGER = logging.getLogger(__name__)
 
 
+def _mean_ms(histogram):
+    """Return the mean of a latency histogram in milliseconds."""
+    if histogram.mean is None:
+        return None
+    return round(histogram.mean * 1000, 1)
+
+
+# Data key, name and icon of the sensors of the register map points, all
+# fed by the block reads of the unit's coordinator
+POINT_SENSORS = (
+    (DATA_INDOOR_TEMP, "Indoor temperature", "mdi:home-thermometer"),
+    (DATA_COIL_TEMP, "Coil temperature", "mdi:temperature-celsius"),
+    (DATA_SET_TEMP, "Target temperature", "mdi:thermometer"),
+    (DATA_OPMODE, "Mode", "mdi:hvac"),
+    (DATA_FAN_SPEED, "Fan speed", "mdi:fan"),
+    (DATA_POWER, "Power", "mdi:power"),
+    (DATA_SLEEP, "Sleep", "mdi:sleep"),
+    (DATA_SWING, "Swing", "mdi:arrow-oscillating"),
+    (DATA_EHEAT, "Electric heating", "mdi:radiator"),
+)
+# States of the sensors of boolean points
+BOOL_OPTIONS = ["off", "on"]
+# Sensors keeping the unique ID they had before there were several sensors
+LEGACY_UNIQUE_ID_KEYS = {DATA_COIL_TEMP}
+
+
+def _point_sensor_class(point):
+    """Return the device class and options of the sensor of a point."""
+    if point.unit == UnitOfTemperature.CELSIUS:
+        return SensorDeviceClass.TEMPERATURE, None
+    if point.encoding == ENCODING_BOOL:
+        return SensorDeviceClass.ENUM, BOOL_OPTIONS
+    if point.encoding == ENCODING_ENUM:
+        return SensorDeviceClass.ENUM, list(point.options.values())
+    return None, None
+
+
+# Name and key of the diagnostic sensors of the unit's Modbus metrics
+METRIC_SENSORS = (
+    ("Modbus requests", "requests"),
+    ("Modbus retries", "retries"),
+    ("Modbus failures", "failures"),
+    ("Modbus timeouts", "timeouts"),
+    ("Modbus latency", "wire_time"),
+    ("Modbus lock wait", "lock_wait"),
+)
+METRIC_LATENCY_KEYS = {"wire_time", "lock_wait"}
+
+
 async def async_setup_entry(
     hass: HomeAssistant, entry: ConfigEntry, async_add_entities: AddEntitiesCallback
 ) -> None:
     """Set up the Fischer Fancoil sensors."""
-    modbus_host = hass.data[entry.entry_id]
+    coordinator = hass.data[entry.entry_id]
     unit_id = entry.data[CONF_UNIT_ID]
     name = entry.data[CONF_NAME]
+    # Units of different hosts may share a unit ID
+    unique_id_prefix = (
+        f"{DOMAIN}_{entry.data[CONF_HOST]}:{entry.data[CONF_PORT]}_{unit_id}"
+    )
 
     device_info = DeviceInfo(
         identifiers={(DOMAIN, unit_id)},
@@ -34,47 +109,80 @@ async def async_setup_entry(
         model="Fancoil",
     )
 
-    sensors = [
-        FischerFancoilSensor(
-            modbus_host,
-            "Coil temperature",
+    sensors = []
+    for data_key, sensor_name, icon in POINT_SENSORS:
+        point = COMPILED_REGISTER_MAP.points[data_key]
+        device_class, options = _point_sensor_class(point)
+        if data_key in LEGACY_UNIQUE_ID_KEYS:
+            unique_id = f"{DOMAIN}_{unit_id}_{point.address}"
+        else:
+            unique_id = f"{unique_id_prefix}_{data_key}"
+        sensors.append(
+            FischerFancoilSensor(
+                coordinator,
+                sensor_name,
+                unit_id,
+                point.address,
+                data_key,
+                icon,
+                point.unit,
+                device_class,
+                device_info,
+                unique_id,
+                options,
+            )
+        )
+    sensors.extend(
+        FischerFancoilMetricSensor(
+            coordinator,
+            name,
             unit_id,
-            REGISTER_COIL_TEMP,
-            "mdi:temperature-celsius",
-            UnitOfTemperature.CELSIUS,
-            SensorDeviceClass.TEMPERATURE,
+            key,
             device_info,
-        ),
-    ]
-    async_add_entities(sensors, update_before_add=True)
+            f"{unique_id_prefix}_metric_{key}",
+        )
+        for name, key in METRIC_SENSORS
+    )
+    async_add_entities(sensors)
 
 
-class FischerFancoilSensor(SensorEntity):
+class FischerFancoilSensor(FischerFancoilEntity, RestoreSensor):
     """Representation of a Fischer Fancoil sensor."""
 
     def __init__(
         self,
-        modbus_host,
+        coordinator: FischerFancoilCoordinator,
         name: str,
         unit_id: int,
         register: int,
+        data_key: str,
         icon: str,
         unit_of_measurement: str,
-        device_class: SensorDeviceClass,
+        device_class: SensorDeviceClass | None,
         device_info: DeviceInfo,
+        unique_id: str,
+        options: list[str] | None = None,
     ) -> None:
         """Initialize the sensor."""
-        self._modbus_host = modbus_host
+        super().__init__(coordinator)
         self._name = name
         self._unit_id = unit_id
         self._register = register
+        self._data_key = data_key
         self._attr_icon = icon
         self._attr_native_unit_of_measurement = unit_of_measurement
         self._attr_device_class = device_class
+        self._attr_options = options
+        if device_class == SensorDeviceClass.TEMPERATURE:
+            self._attr_state_class = SensorStateClass.MEASUREMENT
         self._attr_device_info = device_info
-        self._attr_unique_id = f"{DOMAIN}_{unit_id}_{register}"
+        self._attr_unique_id = unique_id
+        self._point_keys = frozenset({data_key})
         self._state: StateType = None
 
+        if coordinator.data:
+            self._update_from_data(coordinator.data)
+
     @property
     def name(self) -> str:
         """Return the name of the sensor."""
@@ -90,38 +198,85 @@ class FischerFancoilSensor(SensorEntity):
         """Return the state of the sensor."""
         return self._state
 
-    async def async_update(self) -> None:
-        """Fetch new state data for the sensor."""
-        try:
-            result = await self._modbus_host.async_read_input_registers(
-                self._unit_id, self._register, 1
+    async def _async_restore_state(self) -> None:
+        """Restore the value the sensor had before Home Assistant stopped."""
+        if (data := await self.async_get_last_sensor_data()) is not None:
+            self._state = data.native_value
+
+    def _update_from_data(self, data) -> None:
+        """Update the state of the sensor from the coordinator data."""
+        value = data.get(self._data_key)
+        if isinstance(value, bool):
+            value = BOOL_OPTIONS[value]
+        self._state = value
+        if self._state is None:
+            _LOGGER.warning(
+                "Failed to read %s from register %s", self._data_key, self._register
             )
-            if result is not None and len(result) > 0:
-                self._state = self._decode_bcd(result[0])
-                _LOGGER.debug(
-                    "Read coil temperature %s from register %s",
-                    self._state,
-                    self._register,
-                )
-            else:
-                self._state = None
-                _LOGGER.warning(
-                    "Failed to read coil temperature from register %s", self._register
-                )
-        except Exception as e:
-            self._state = None
-            self._attr_available = False
-            _LOGGER.error(
-                "Error reading coil temperature from register %s: %s",
+        else:
+            _LOGGER.debug(
+                "Read %s %s from register %s",
+                self._data_key,
+                self._state,
                 self._register,
-                str(e),
             )
-            # Consider logging the error here
-
-    def _decode_bcd(self, value):
-        return (
-            (value & 0xF)
-            + ((value >> 4) & 0xF) * 10
-            + ((value >> 8) & 0xF) * 100
-            + ((value >> 12) & 0xF) * 1000
-        )
+
+
+class FischerFancoilMetricSensor(
+    CoordinatorEntity[FischerFancoilCoordinator], SensorEntity
+):
+    """Diagnostic sensor of the Modbus metrics of a fancoil unit.
+
+    Disabled by default, and only writes its state when the metric changed,
+    so the metrics of many units do not outweigh the change-only writes of
+    the other entities.
+    """
+
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_entity_registry_enabled_default = False
+
+    def __init__(
+        self,
+        coordinator: FischerFancoilCoordinator,
+        name: str,
+        unit_id: int,
+        key: str,
+        device_info: DeviceInfo,
+        unique_id: str,
+    ) -> None:
+        """Initialize the sensor."""
+        super().__init__(coordinator)
+        self._attr_name = name
+        self._unit_id = unit_id
+        self._key = key
+        self._attr_device_info = device_info
+        self._attr_unique_id = unique_id
+        if key in METRIC_LATENCY_KEYS:
+            self._attr_native_unit_of_measurement = UnitOfTime.MILLISECONDS
+            self._attr_device_class = SensorDeviceClass.DURATION
+            self._attr_state_class = SensorStateClass.MEASUREMENT
+        else:
+            self._attr_state_class = SensorStateClass.TOTAL_INCREASING
+        self._written_value = None
+
+    @property
+    def available(self) -> bool:
+        """Return True, the metrics are known even when polling fails."""
+        return True
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Write the state if the metric changed since it was last written."""
+        value = self.native_value
+        if value == self._written_value:
+            return
+        self._written_value = value
+        super()._handle_coordinator_update()
+
+    @property
+    def native_value(self) -> StateType:
+        """Return the metric of the unit."""
+        stats = self.coordinator.modbus_host.metrics.unit(self._unit_id)
+        if self._key in METRIC_LATENCY_KEYS:
+            return _mean_ms(getattr(stats, self._key))
+        return getattr(stats, self._key)
@@ -0,0 +1,225 @@
+"""Services of the Fischer Fancoil integration."""
+
+import asyncio
+import logging
+
+import voluptuous as vol
+
+from homeassistant.core import (
+    HomeAssistant,
+    ServiceCall,
+    ServiceResponse,
+    SupportsResponse,
+)
+from homeassistant.helpers import config_validation as cv, entity_registry as er
+from homeassistant.helpers.service import async_extract_entity_ids
+
+from .const import (
+    ATTR_BROADCAST,
+    ATTR_POINTS,
+    ATTR_SINCE,
+    DATA_SET_TEMP,
+    DOMAIN,
+    ENCODING_BOOL,
+    ENCODING_ENUM,
+    SERVICE_BULK_SET,
+    SERVICE_GET_HISTORY,
+    TABLE_COIL,
+    TABLE_HOLDING,
+)
+from .priority import PRIORITY_CONFIRM
+from .register_map import COMPILED_REGISTER_MAP, REGISTER_MAP
+
+_LOGGER = logging.getLogger(__name__)
+
+GET_HISTORY_SCHEMA = cv.make_entity_service_schema(
+    {
+        vol.Optional(ATTR_POINTS): vol.All(
+            cv.ensure_list, [vol.In(list(COMPILED_REGISTER_MAP.points))]
+        ),
+        vol.Optional(ATTR_SINCE): cv.datetime,
+    }
+)
+
+
+def _point_validator(point):
+    """Return the validator of a value written to a point."""
+    if point.encoding == ENCODING_BOOL:
+        return cv.boolean
+    if point.encoding == ENCODING_ENUM:
+        return vol.In(list(point.options.values()))
+    if point.key == DATA_SET_TEMP:
+        return vol.All(vol.Coerce(int), vol.Range(min=16, max=30))
+    return vol.Coerce(int)
+
+
+# The points of the register map that can be written
+WRITABLE_POINTS = [
+    point for point in REGISTER_MAP if point.table in (TABLE_COIL, TABLE_HOLDING)
+]
+
+BULK_SET_SCHEMA = cv.make_entity_service_schema(
+    {
+        **{
+            vol.Optional(point.key): _point_validator(point)
+            for point in WRITABLE_POINTS
+        },
+        vol.Optional(ATTR_BROADCAST, default=False): cv.boolean,
+    }
+)
+
+
+async def _async_target_coordinators(hass: HomeAssistant, call: ServiceCall):
+    """Return the target entities with the coordinators of their units."""
+    registry = er.async_get(hass)
+    targets = []
+    for entity_id in await async_extract_entity_ids(hass, call):
+        entry = registry.async_get(entity_id)
+        if entry is None or entry.platform != DOMAIN:
+            continue
+        coordinator = hass.data.get(entry.config_entry_id)
+        if coordinator is not None:
+            targets.append((entity_id, coordinator))
+    return targets
+
+
+def _runs(raw_values):
+    """Group raw (table, address) values into runs of adjacent addresses."""
+    runs = []
+    for table, address in sorted(raw_values):
+        value = raw_values[(table, address)]
+        if runs and runs[-1][0] == table and runs[-1][1] + len(runs[-1][2]) == address:
+            runs[-1][2].append(value)
+        else:
+            runs.append((table, address, [value]))
+    return runs
+
+
+async def _async_set_units(modbus_host, coordinators, values, broadcast):
+    """Write the values to the units of a host and return the keys they failed.
+
+    Without broadcast the writes of every unit go through the write queue of
+    the host, which sends adjacent registers of a unit with a single request.
+    A broadcast is not answered, so the units read the points back instead.
+    """
+    raw_values = {}
+    for key, value in values.items():
+        point = COMPILED_REGISTER_MAP.points[key]
+        raw_values[(point.table, point.address)] = COMPILED_REGISTER_MAP.encode(
+            key, value
+        )
+    for coordinator in coordinators:
+        coordinator.async_note_write()
+
+    if broadcast:
+        for table, address, run in _runs(raw_values):
+            await modbus_host.async_broadcast(table, address, run)
+        snapshots = await asyncio.gather(
+            *(
+                modbus_host.async_read_block(
+                    coordinator.unit_id, COMPILED_REGISTER_MAP.plan, PRIORITY_CONFIRM
+                )
+                for coordinator in coordinators
+            )
+        )
+        failed = {}
+        for coordinator, snapshot in zip(coordinators, snapshots):
+            data = COMPILED_REGISTER_MAP.decode(snapshot)
+            failed[coordinator] = [
+                key for key, value in values.items() if data.get(key) != value
+            ]
+        return failed
+
+    writes = {}
+    for coordinator in coordinators:
+        for key in values:
+            point = COMPILED_REGISTER_MAP.points[key]
+            writes[(coordinator, key)] = modbus_host.async_queue_write(
+                coordinator.unit_id,
+                point.table,
+                point.address,
+                raw_values[(point.table, point.address)],
+            )
+    results = dict(zip(writes, await asyncio.gather(*writes.values())))
+    return {
+        coordinator: [key for key in values if not results[(coordinator, key)]]
+        for coordinator in coordinators
+    }
+
+
+def async_setup_services(hass: HomeAssistant) -> None:
+    """Register the services of the integration."""
+
+    async def async_get_history(call: ServiceCall) -> ServiceResponse:
+        """Return the polled raw values of the units of the target entities."""
+        since = call.data.get(ATTR_SINCE)
+        response = {}
+        for entity_id, coordinator in await _async_target_coordinators(hass, call):
+            response[entity_id] = coordinator.history_as_dict(
+                call.data.get(ATTR_POINTS),
+                since.timestamp() if since is not None else None,
+            )
+        return response
+
+    async def async_bulk_set(call: ServiceCall) -> ServiceResponse:
+        """Write the same values to the units of the target entities.
+
+        The units are grouped by their Modbus host and the hosts are written
+        in parallel. Returns the outcome per target entity.
+        """
+        values = {
+            point.key: call.data[point.key]
+            for point in WRITABLE_POINTS
+            if point.key in call.data
+        }
+        targets = await _async_target_coordinators(hass, call)
+        hosts = {}
+        for _, coordinator in targets:
+            units = hosts.setdefault(coordinator.modbus_host, [])
+            if coordinator not in units:
+                units.append(coordinator)
+
+        failed = {}
+        if values:
+            for result in await asyncio.gather(
+                *(
+                    _async_set_units(
+                        modbus_host, coordinators, values, call.data[ATTR_BROADCAST]
+                    )
+                    for modbus_host, coordinators in hosts.items()
+                )
+            ):
+                failed.update(result)
+
+        response = {}
+        for entity_id, coordinator in targets:
+            failed_keys = failed.get(coordinator, [])
+            response[entity_id] = {
+                "unit_id": coordinator.unit_id,
+                "success": not failed_keys,
+                "failed": failed_keys,
+            }
+        for coordinator, failed_keys in failed.items():
+            coordinator.async_set_written_data(
+                {key: value for key, value in values.items() if key not in failed_keys}
+            )
+            if failed_keys:
+                _LOGGER.warning(
+                    "Fancoil unit %s failed to set %s", coordinator.unit_id, failed_keys
+                )
+        return response
+
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_BULK_SET,
+        async_bulk_set,
+        schema=BULK_SET_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_GET_HISTORY,
+        async_get_history,
+        schema=GET_HISTORY_SCHEMA,
+        supports_response=SupportsResponse.ONLY,
+    )
@@ -0,0 +1,147 @@
+"""Modbus transaction trace for Fischer Fancoil."""
+
+import mmap
+import os
+import struct
+from typing import NamedTuple
+
+# Records kept in a trace file before the oldest are overwritten, 4 MiB
+DEFAULT_TRACE_RECORDS = 65536
+# Values of a request or response kept per record, the rest is truncated
+MAX_TRACE_VALUES = 16
+
+TRACE_MAGIC = b"FFTR"
+TRACE_VERSION = 1
+# Magic, version, record size, capacity, next record, record count
+_HEADER = struct.Struct("<4sHHIII12x")
+# Timestamp, unit ID, function code, address, count, error, number of values,
+# latency and the values
+_RECORD = struct.Struct(f"<dBBHHBBf{MAX_TRACE_VALUES}H12x")
+
+# Outcomes of a traced request
+ERROR_NONE = 0
+ERROR_RESPONSE = 1
+ERROR_EXCEPTION = 2
+
+# Function codes of the read requests
+READ_FUNCTION_CODES = {1, 3, 4}
+
+
+class TraceRecord(NamedTuple):
+    """A traced Modbus transaction."""
+
+    timestamp: float
+    unit_id: int
+    function_code: int
+    address: int
+    count: int
+    error: int
+    latency: float
+    # Written values of a write, read values of a successful read
+    values: tuple[int, ...]
+
+
+class TraceRecorder:
+    """Append Modbus transactions to a fixed size ring file through mmap.
+
+    Every record has the same size, so appending is a single pack into the
+    mapped file and the file never grows. Once full, the oldest records are
+    overwritten.
+    """
+
+    def __init__(self, path, records=DEFAULT_TRACE_RECORDS) -> None:
+        """Open the trace file, continuing an existing trace of the same size."""
+        self.path = path
+        self._records = records
+        size = _HEADER.size + records * _RECORD.size
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            resume = os.fstat(fd).st_size == size
+            if not resume:
+                os.ftruncate(fd, size)
+            self._map = mmap.mmap(fd, size)
+        finally:
+            os.close(fd)
+
+        header = _HEADER.unpack_from(self._map, 0)
+        if resume and header[:4] == (
+            TRACE_MAGIC,
+            TRACE_VERSION,
+            _RECORD.size,
+            records,
+        ):
+            self._next, self._count = header[4:]
+        else:
+            self._next = self._count = 0
+            self._write_header()
+
+    def _write_header(self):
+        """Store the position of the ring in the header."""
+        _HEADER.pack_into(
+            self._map,
+            0,
+            TRACE_MAGIC,
+            TRACE_VERSION,
+            _RECORD.size,
+            self._records,
+            self._next,
+            self._count,
+        )
+
+    def record(
+        self, timestamp, unit_id, function_code, address, count, error, latency, values
+    ):
+        """Append a transaction to the trace."""
+        values = [int(value) for value in values[:MAX_TRACE_VALUES]]
+        padded = values + [0] * (MAX_TRACE_VALUES - len(values))
+        _RECORD.pack_into(
+            self._map,
+            _HEADER.size + self._next * _RECORD.size,
+            timestamp,
+            unit_id,
+            function_code,
+            address,
+            count,
+            error,
+            len(values),
+            latency,
+            *padded,
+        )
+        self._next = (self._next + 1) % self._records
+        self._count = min(self._count + 1, self._records)
+        self._write_header()
+
+    def close(self):
+        """Flush and close the trace file."""
+        self._map.flush()
+        self._map.close()
+
+
+def read_trace(path):
+    """Return the records of a trace file, oldest first."""
+    with open(path, "rb") as file:
+        data = file.read()
+    magic, version, record_size, records, next_record, count = _HEADER.unpack_from(
+        data, 0
+    )
+    if magic != TRACE_MAGIC or version != TRACE_VERSION or record_size != _RECORD.size:
+        raise ValueError(f"Not a Fischer Fancoil trace file: {path}")
+
+    trace = []
+    for index in range(count):
+        row = (next_record - count + index) % records
+        fields = _RECORD.unpack_from(data, _HEADER.size + row * _RECORD.size)
+        length = fields[6]
+        trace.append(
+            TraceRecord(
+                timestamp=fields[0],
+                unit_id=fields[1],
+                function_code=fields[2],
+                address=fields[3],
+                count=fields[4],
+                error=fields[5],
+                latency=fields[7],
+                values=tuple(fields[8 : 8 + length]),
+            )
+        )
+    return trace
@@ -0,0 +1,82 @@
+"""Modbus transports for Fischer Fancoil."""
+
+from pymodbus import Framer
+from pymodbus.client import AsyncModbusSerialClient, AsyncModbusTcpClient
+
+from .const import (
+    CONF_BAUDRATE,
+    CONF_PARITY,
+    CONF_STOPBITS,
+    CONF_TRANSPORT,
+    DEFAULT_BAUDRATE,
+    DEFAULT_BYTESIZE,
+    DEFAULT_PARITY,
+    DEFAULT_REQUEST_TIMEOUT,
+    DEFAULT_STOPBITS,
+    TRANSPORT_RTU_OVER_TCP,
+    TRANSPORT_SERIAL,
+    TRANSPORT_TCP,
+)
+
+# Silent interval between RTU frames, in character times
+RTU_FRAME_GAP_CHARACTERS = 3.5
+# The RTU specification fixes the gap above this baud rate
+RTU_FIXED_GAP_BAUDRATE = 19200
+RTU_FIXED_FRAME_GAP = 0.00175
+
+
+def rtu_frame_gap(
+    baudrate=DEFAULT_BAUDRATE,
+    bytesize=DEFAULT_BYTESIZE,
+    parity=DEFAULT_PARITY,
+    stopbits=DEFAULT_STOPBITS,
+):
+    """Return the silent interval between RTU frames in seconds."""
+    if baudrate > RTU_FIXED_GAP_BAUDRATE:
+        return RTU_FIXED_FRAME_GAP
+    # A start bit, the data bits, an optional parity bit and the stop bits
+    character_bits = 1 + bytesize + (parity != "N") + stopbits
+    return RTU_FRAME_GAP_CHARACTERS * character_bits / baudrate
+
+
+def create_client(
+    transport,
+    host,
+    port,
+    baudrate=DEFAULT_BAUDRATE,
+    bytesize=DEFAULT_BYTESIZE,
+    parity=DEFAULT_PARITY,
+    stopbits=DEFAULT_STOPBITS,
+    timeout=DEFAULT_REQUEST_TIMEOUT,
+):
+    """Return the pymodbus client of a transport.
+
+    The client does not retry on its own, the Modbus host retries failed
+    requests with its retry policy.
+    """
+    options = {"timeout": timeout, "retries": 0}
+    if transport == TRANSPORT_TCP:
+        return AsyncModbusTcpClient(host=host, port=port, **options)
+    if transport == TRANSPORT_RTU_OVER_TCP:
+        return AsyncModbusTcpClient(host=host, port=port, framer=Framer.RTU, **options)
+    if transport == TRANSPORT_SERIAL:
+        return AsyncModbusSerialClient(
+            port=host,
+            framer=Framer.RTU,
+            baudrate=baudrate,
+            bytesize=bytesize,
+            parity=parity,
+            stopbits=stopbits,
+            **options,
+        )
+    raise ValueError(f"Unknown Modbus transport: {transport}")
+
+
+def transport_options(data):
+    """Return the transport arguments of a Modbus host from config entry data."""
+    return {
+        "transport": data.get(CONF_TRANSPORT, TRANSPORT_TCP),
+        "baudrate": data.get(CONF_BAUDRATE, DEFAULT_BAUDRATE),
+        "parity": data.get(CONF_PARITY, DEFAULT_PARITY),
+        "stopbits": data.get(CONF_STOPBITS, DEFAULT_STOPBITS),
+    }
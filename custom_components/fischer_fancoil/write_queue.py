@@ -0,0 +1,149 @@
+"""Write coalescing for Fischer Fancoil."""
+
+import asyncio
+from functools import partial
+import logging
+
+from .const import DEFAULT_WRITE_COALESCE_WINDOW, TABLE_COIL, TABLE_HOLDING
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class WriteQueue:
+    """Collect writes for a short window and send them coalesced.
+
+    Only the last value written to a register or coil within the window is
+    sent. Runs of adjacent holding registers or coils of a unit are written
+    with a single write_registers or write_coils request.
+
+    A queued value is dropped from the register cache right away, so reads
+    within the window miss the cache and wait for the write instead of
+    returning the value about to be overwritten.
+
+    Writes that a closed queue or a cancelled flush did not send fail, so
+    their callers do not wait forever.
+    """
+
+    def __init__(
+        self,
+        modbus_host,
+        window=DEFAULT_WRITE_COALESCE_WINDOW,
+        create_task=asyncio.create_task,
+    ) -> None:
+        """Initialize the write queue.
+
+        The flushes are started with create_task, which is called with the
+        coroutine and a name keyword, like asyncio.create_task.
+        """
+        self._modbus_host = modbus_host
+        self._window = window
+        self._create_task = create_task
+        # (unit_id, table, address) -> (value, futures waiting for the write)
+        self._pending = {}
+        self._flush_handle = None
+        self._flush_tasks = set()
+        self._flushing = 0
+        self._idle = asyncio.Event()
+        self._idle.set()
+
+    async def async_wait_idle(self):
+        """Wait until no writes are queued or being sent."""
+        await self._idle.wait()
+
+    async def async_write(self, unit_id, table, address, value) -> bool:
+        """Queue a write and wait until it was sent."""
+        if table not in (TABLE_COIL, TABLE_HOLDING):
+            raise ValueError(f"Register table is not writable: {table}")
+
+        self._modbus_host.cache.invalidate(unit_id, table, address)
+        future = asyncio.get_running_loop().create_future()
+        key = (unit_id, table, address)
+        _, futures = self._pending.get(key, (None, []))
+        futures.append(future)
+        self._pending[key] = (value, futures)
+        self._idle.clear()
+
+        if self._flush_handle is None:
+            self._flush_handle = asyncio.get_running_loop().call_later(
+                self._window, self._schedule_flush
+            )
+        return await future
+
+    async def async_close(self):
+        """Stop sending writes, failing the queued ones and those being sent."""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        pending, self._pending = self._pending, {}
+        self._fail(pending)
+        tasks = list(self._flush_tasks)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if not self._flushing:
+            self._idle.set()
+
+    def _schedule_flush(self):
+        """Send the pending writes from a task."""
+        self._flush_handle = None
+        pending, self._pending = self._pending, {}
+        self._flushing += 1
+        task = self._create_task(
+            self._async_send(pending), name="fischer_fancoil write flush"
+        )
+        self._flush_tasks.add(task)
+        task.add_done_callback(partial(self._flush_done, pending))
+
+    def _flush_done(self, pending, task):
+        """Fail the writes a cancelled or failed flush did not send."""
+        self._flush_tasks.discard(task)
+        self._fail(pending)
+        self._flushing -= 1
+        if not self._flushing and not self._pending:
+            self._idle.set()
+
+    @staticmethod
+    def _fail(pending):
+        """Report the writes not sent yet as failed to their callers."""
+        for _, futures in pending.values():
+            for future in futures:
+                if not future.done():
+                    future.set_result(False)
+
+    async def _async_send(self, pending):
+        """Send the pending writes grouped into runs of adjacent addresses."""
+        for unit_id, table, address, values, futures in self._runs(pending):
+            try:
+                success = await self._modbus_host.async_write(
+                    unit_id, table, address, values
+                )
+            except Exception as e:
+                _LOGGER.error(
+                    "Error writing %s %s of unit %s: %s", table, address, unit_id, e
+                )
+                success = False
+
+            for future in futures:
+                if not future.done():
+                    future.set_result(bool(success))
+
+    @staticmethod
+    def _runs(pending):
+        """Group pending writes into runs of adjacent addresses."""
+        run = None
+        for key in sorted(pending):
+            unit_id, table, address = key
+            value, futures = pending[key]
+            if (
+                run is not None
+                and run[:2] == (unit_id, table)
+                and run[2] + len(run[3]) == address
+            ):
+                run[3].append(value)
+                run[4].extend(futures)
+                continue
+            if run is not None:
+                yield run
+            run = (unit_id, table, address, [value], list(futures))
+        if run is not None:
+            yield run
@@ -0,0 +1 @@
+"""Tests for the Fischer Fancoil integration."""
@@ -0,0 +1,302 @@
+"""Fixtures for the Fischer Fancoil tests."""
+
+import asyncio
+import inspect
+import os
+from types import MappingProxyType, SimpleNamespace
+
+import pytest
+from homeassistant.config_entries import SOURCE_USER, ConfigEntry
+
+from custom_components.fischer_fancoil import modbus_host as modbus_host_module
+from custom_components.fischer_fancoil.const import (
+    CONF_HOST,
+    CONF_NAME,
+    CONF_PORT,
+    CONF_UNIT_ID,
+    DOMAIN,
+    TABLE_COIL,
+    TABLE_HOLDING,
+    TABLE_INPUT,
+)
+from custom_components.fischer_fancoil.modbus_host import ModbusHost
+
+
+class FakeResponse:
+    """Response of the fake client, shaped like a pymodbus response."""
+
+    def __init__(self, registers=(), bits=(), error=False) -> None:
+        """Initialize the response."""
+        self.registers = list(registers)
+        self.bits = list(bits)
+        self._error = error
+
+    def isError(self):
+        """Return whether the unit answered with an exception."""
+        return self._error
+
+
+class FakeBus:
+    """Units behind a fake gateway, shared by the fake clients of a host.
+
+    Each unit answers from its own register store as of the arrival of a
+    request, after the latency and once the gate is open. Units listed in
+    absent never answer, and a unit's failures make its next requests answer
+    with an exception.
+    """
+
+    def __init__(self, unit_ids=(1, 2, 3), latency=0.01) -> None:
+        """Initialize the bus."""
+        self.unit_ids = set(unit_ids)
+        self.latency = latency
+        self.absent = set()
+        # unit_id -> number of requests still answered with an exception
+        self.failures = {}
+        # (unit_id, table, address) -> value, unset addresses read as 0
+        self.values = {}
+        # (unit_id, table, address) of the values the units ignore writes to
+        self.read_only = set()
+        # (unit_id, method, address, values or count, broadcast_enable)
+        self.requests = []
+        self.clients = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        # Set to hold every request on the wire until it is set again
+        self.gate = asyncio.Event()
+        self.gate.set()
+
+    def create_client(self, *args, **kwargs):
+        """Return a new fake client, standing in for transport.create_client."""
+        client = FakeClient(self)
+        self.clients.append(client)
+        return client
+
+    async def async_handle(self, client, method, table, unit_id, address, payload):
+        """Answer a request sent by a client."""
+        self.requests.append(
+            (unit_id, method, address, payload, client.broadcast_enable)
+        )
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            if client.broadcast_enable and unit_id == 0:
+                # Every unit takes a broadcast, none answers
+                for other in self.unit_ids:
+                    self._store(other, table, address, payload)
+                return None
+            if unit_id in self.absent or unit_id not in self.unit_ids:
+                await asyncio.Event().wait()
+            response = self._answer(method, table, unit_id, address, payload)
+            await self.gate.wait()
+            await asyncio.sleep(self.latency)
+            return response
+        finally:
+            self.in_flight -= 1
+
+    def _answer(self, method, table, unit_id, address, payload):
+        """Return the response of a unit as of the arrival of a request."""
+        if self.failures.get(unit_id):
+            self.failures[unit_id] -= 1
+            return FakeResponse(error=True)
+        if method.startswith("read"):
+            values = [
+                self.values.get((unit_id, table, address + offset), 0)
+                for offset in range(payload)
+            ]
+            if table == TABLE_COIL:
+                return FakeResponse(bits=[bool(value) for value in values])
+            return FakeResponse(registers=values)
+        self._store(unit_id, table, address, payload)
+        return FakeResponse()
+
+    def _store(self, unit_id, table, address, values):
+        """Store written values in the register store of a unit."""
+        if not isinstance(values, list):
+            values = [values]
+        for offset, value in enumerate(values):
+            key = (unit_id, table, address + offset)
+            if key not in self.read_only:
+                self.values[key] = value
+
+    def writes(self, unit_id=None):
+        """Return the write requests sent, optionally to a single unit."""
+        return [
+            request
+            for request in self.requests
+            if request[1].startswith("write")
+            and (unit_id is None or request[0] == unit_id)
+        ]
+
+
+class FakeClient:
+    """Stand-in for a pymodbus client, sending its requests to a fake bus."""
+
+    def __init__(self, bus) -> None:
+        """Initialize the client."""
+        self._bus = bus
+        self.connected = False
+        self.broadcast_enable = False
+        self.comm_params = SimpleNamespace(timeout_connect=None)
+        self.connects = 0
+        self.closes = 0
+
+    async def connect(self):
+        """Connect the client."""
+        self.connected = True
+        self.connects += 1
+        return True
+
+    def close(self):
+        """Close the client."""
+        self.connected = False
+        self.closes += 1
+
+    def _send(self, method, table, address, payload, slave):
+        """Send a request to the fake bus."""
+        return self._bus.async_handle(self, method, table, slave, address, payload)
+
+    async def read_coils(self, address, count, slave):
+        """Read coils."""
+        return await self._send("read_coils", TABLE_COIL, address, count, slave)
+
+    async def read_holding_registers(self, address, count, slave):
+        """Read holding registers."""
+        return await self._send(
+            "read_holding_registers", TABLE_HOLDING, address, count, slave
+        )
+
+    async def read_input_registers(self, address, count, slave):
+        """Read input registers."""
+        return await self._send(
+            "read_input_registers", TABLE_INPUT, address, count, slave
+        )
+
+    async def write_coil(self, address, value, slave):
+        """Write a coil."""
+        return await self._send("write_coil", TABLE_COIL, address, value, slave)
+
+    async def write_register(self, address, value, slave):
+        """Write a holding register."""
+        return await self._send("write_register", TABLE_HOLDING, address, value, slave)
+
+    async def write_coils(self, address, values, slave):
+        """Write coils."""
+        return await self._send("write_coils", TABLE_COIL, address, values, slave)
+
+    async def write_registers(self, address, values, slave):
+        """Write holding registers."""
+        return await self._send(
+            "write_registers", TABLE_HOLDING, address, values, slave
+        )
+
+
+@pytest.hookimpl(tryfirst=True)
+def pytest_pyfunc_call(pyfuncitem):
+    """Run coroutine tests in an event loop of their own."""
+    if not inspect.iscoroutinefunction(pyfuncitem.obj):
+        return None
+    arguments = {
+        name: pyfuncitem.funcargs[name] for name in pyfuncitem._fixtureinfo.argnames
+    }
+    asyncio.run(pyfuncitem.obj(**arguments))
+    return True
+
+
+@pytest.fixture
+def bus(monkeypatch):
+    """Return the fake bus every Modbus host of a test connects to."""
+    fake_bus = FakeBus()
+    monkeypatch.setattr(modbus_host_module, "create_client", fake_bus.create_client)
+    return fake_bus
+
+
+@pytest.fixture
+def make_host(bus):
+    """Return a factory of Modbus hosts on the fake bus, retrying right away."""
+
+    def make(**kwargs):
+        kwargs.setdefault("retry_delay", 0)
+        kwargs.setdefault("request_timeout", 0.5)
+        return ModbusHost("127.0.0.1", 502, **kwargs)
+
+    return make
+
+
+@pytest.fixture
+def modbus_host(make_host):
+    """Return a Modbus host on the fake bus with the default settings."""
+    return make_host()
+
+
+@pytest.fixture
+def make_config_entry():
+    """Return a factory of config entries of units on the fake bus."""
+
+    def make(unit_id=1, **options):
+        return ConfigEntry(
+            data={
+                CONF_HOST: "127.0.0.1",
+                CONF_NAME: f"Fancoil {unit_id}",
+                CONF_PORT: 502,
+                CONF_UNIT_ID: unit_id,
+            },
+            discovery_keys=MappingProxyType({}),
+            domain=DOMAIN,
+            minor_version=1,
+            options=options,
+            source=SOURCE_USER,
+            subentries_data=None,
+            title=f"Fancoil {unit_id}",
+            unique_id=f"127.0.0.1:502:{unit_id}",
+            version=1,
+        )
+
+    return make
+
+
+@pytest.fixture
+def config_entry(make_config_entry):
+    """Return the config entry of unit 1 on the fake bus."""
+    return make_config_entry()
+
+
+class FakeHass:
+    """The parts of Home Assistant the integration uses outside of entities."""
+
+    def __init__(self, config_dir) -> None:
+        """Initialize the fake."""
+        self.data = {}
+        self.entries = []
+        self.background_tasks = []
+        self.executor_jobs = []
+        self.forwarded = []
+        self.config = SimpleNamespace(
+            path=lambda *parts: os.path.join(config_dir, *parts)
+        )
+        self.config_entries = SimpleNamespace(
+            async_entries=lambda domain: [
+                entry for entry in self.entries if entry.domain == domain
+            ],
+            async_forward_entry_setups=self._async_forward_entry_setups,
+        )
+
+    async def _async_forward_entry_setups(self, entry, platforms):
+        """Record the platforms an entry is set up for."""
+        self.forwarded.append((entry.entry_id, tuple(platforms)))
+
+    def async_create_background_task(self, target, name):
+        """Start a background task."""
+        task = asyncio.create_task(target, name=name)
+        self.background_tasks.append(task)
+        return task
+
+    async def async_add_executor_job(self, target, *args):
+        """Run a blocking function in the executor."""
+        self.executor_jobs.append(target)
+        return await asyncio.get_running_loop().run_in_executor(None, target, *args)
+
+
+@pytest.fixture
+def hass(tmp_path):
+    """Return a fake Home Assistant with the configuration in a temporary directory."""
+    return FakeHass(str(tmp_path))
@@ -0,0 +1,173 @@
+"""Tests for the climate entity."""
+
+import asyncio
+
+from homeassistant.components.climate import (
+    ATTR_CURRENT_TEMPERATURE,
+    ATTR_FAN_MODE,
+    HVACMode,
+)
+from homeassistant.const import ATTR_TEMPERATURE
+from homeassistant.core import State
+
+from custom_components.fischer_fancoil.climate import FischerFancoil
+from custom_components.fischer_fancoil.const import (
+    DATA_FAN_SPEED,
+    DATA_INDOOR_TEMP,
+    DATA_OPMODE,
+    DATA_POWER,
+    DATA_SET_TEMP,
+    DATA_SWING,
+)
+from custom_components.fischer_fancoil.priority import PRIORITY_CONFIRM
+from custom_components.fischer_fancoil.register_map import COMPILED_REGISTER_MAP
+
+
+class FakeCoordinator:
+    """Coordinator of a unit, verifying writes by reading the point back."""
+
+    def __init__(self, modbus_host, unit_id) -> None:
+        """Initialize the coordinator."""
+        self.modbus_host = modbus_host
+        self.unit_id = unit_id
+        self.data = None
+        self.changed_keys = frozenset()
+        self.last_update_success = True
+        self.verified = []
+        self.listeners = []
+
+    def async_add_listener(self, update_callback, context=None):
+        """Call back on updates and return the remove callback."""
+        self.listeners.append(update_callback)
+        return lambda: self.listeners.remove(update_callback)
+
+    def async_note_write(self):
+        """Ignore the fast polls after a write."""
+
+    async def async_verify_write(self, key, value):
+        """Read back a written point and return whether it holds the value."""
+        self.verified.append(value)
+        snapshot = await self.modbus_host.async_read_block(
+            self.unit_id, COMPILED_REGISTER_MAP.point_plans[key], PRIORITY_CONFIRM
+        )
+        data = COMPILED_REGISTER_MAP.decode(snapshot)
+        if key not in data:
+            return None
+        return data[key] == value
+
+
+def _fancoil(modbus_host):
+    """Return a climate entity of unit 1 that does not write its state."""
+    coordinator = FakeCoordinator(modbus_host, 1)
+    fancoil = FischerFancoil("Fancoil", coordinator, 1, None)
+    fancoil.async_write_ha_state = lambda: None
+    return fancoil, coordinator
+
+
+POLLED_DATA = {
+    DATA_POWER: True,
+    DATA_OPMODE: "cool",
+    DATA_SET_TEMP: 20,
+    DATA_INDOOR_TEMP: 22,
+    DATA_FAN_SPEED: "low",
+    DATA_SWING: False,
+}
+LAST_STATE = State(
+    "climate.fancoil",
+    HVACMode.HEAT,
+    {ATTR_CURRENT_TEMPERATURE: 19, ATTR_TEMPERATURE: 23, ATTR_FAN_MODE: "high"},
+)
+
+
+async def _add_to_hass(fancoil, last_state):
+    """Add the entity to Home Assistant with its last known state."""
+
+    async def async_get_last_state():
+        return last_state
+
+    fancoil.async_get_last_state = async_get_last_state
+    await fancoil.async_added_to_hass()
+
+
+async def test_last_state_is_shown_until_the_first_poll(modbus_host):
+    """The entity starts from its restored state and the poll replaces it."""
+    fancoil, coordinator = _fancoil(modbus_host)
+    await _add_to_hass(fancoil, LAST_STATE)
+    assert fancoil.hvac_mode == HVACMode.HEAT
+    assert (fancoil.current_temperature, fancoil.target_temperature) == (19, 23)
+    assert fancoil.fan_mode == "high"
+
+    coordinator.data = POLLED_DATA
+    coordinator.changed_keys = frozenset(POLLED_DATA)
+    for update_callback in coordinator.listeners:
+        update_callback()
+    assert fancoil.hvac_mode == HVACMode.COOL
+    assert (fancoil.current_temperature, fancoil.target_temperature) == (22, 20)
+    assert fancoil.fan_mode == "low"
+
+
+async def test_last_state_is_not_restored_over_polled_data(modbus_host):
+    """An entity added after the first poll keeps the polled state."""
+    fancoil, coordinator = _fancoil(modbus_host)
+    coordinator.data = POLLED_DATA
+    fancoil._update_from_data(POLLED_DATA)
+    await _add_to_hass(fancoil, LAST_STATE)
+
+    assert fancoil.hvac_mode == HVACMode.COOL
+    assert fancoil.target_temperature == 20
+
+
+async def test_superseded_write_is_not_rolled_back(bus, modbus_host):
+    """The steps of a slider drag leave the last target temperature."""
+    fancoil, coordinator = _fancoil(modbus_host)
+    await asyncio.gather(
+        fancoil.async_set_temperature(temperature=20),
+        fancoil.async_set_temperature(temperature=21),
+    )
+
+    assert (fancoil.target_temperature, coordinator.verified) == (21, [21])
+    assert len(bus.writes()) == 1
+
+
+async def test_write_the_unit_did_not_take_is_rolled_back(bus, modbus_host):
+    """The target temperature returns to its previous value."""
+    point = COMPILED_REGISTER_MAP.points[DATA_SET_TEMP]
+    bus.read_only.add((1, point.table, point.address))
+    fancoil, _ = _fancoil(modbus_host)
+    await fancoil.async_set_temperature(temperature=21)
+
+    assert fancoil.target_temperature is None
+
+
+async def test_only_the_failed_write_of_a_mode_change_is_rolled_back(bus, modbus_host):
+    """The mode the unit took is kept when it did not take the power state."""
+    fancoil, _ = _fancoil(modbus_host)
+    await fancoil.async_set_hvac_mode(HVACMode.COOL)
+    assert fancoil.hvac_mode == HVACMode.COOL
+
+    power = COMPILED_REGISTER_MAP.points[DATA_POWER]
+    bus.read_only.add((1, power.table, power.address))
+    await fancoil.async_set_hvac_mode(HVACMode.OFF)
+
+    # The unit stays on with its mode register set to off
+    assert fancoil.hvac_mode == HVACMode.OFF
+    assert bus.values[(1, power.table, power.address)]
+
+
+async def test_poll_during_a_write_keeps_the_written_value(bus, modbus_host):
+    """A poll that read the point before the write does not revert it."""
+    fancoil, coordinator = _fancoil(modbus_host)
+    bus.gate.clear()
+    write = asyncio.create_task(fancoil.async_set_temperature(temperature=21))
+    while not bus.in_flight:
+        await asyncio.sleep(0.001)
+
+    coordinator.data = POLLED_DATA
+    coordinator.changed_keys = frozenset(coordinator.data)
+    fancoil._handle_coordinator_update()
+    assert fancoil.target_temperature == 21
+    assert fancoil.current_temperature == 22
+
+    bus.gate.set()
+    await write
+    assert fancoil.target_temperature == 21
@@ -0,0 +1,43 @@
+"""Tests for the config flow."""
+
+import pytest
+import voluptuous as vol
+
+from custom_components.fischer_fancoil.config_flow import (
+    FischerFancoilConfigFlow,
+    options_schema,
+)
+from custom_components.fischer_fancoil.const import (
+    CONF_MAX_POLL_INTERVAL,
+    CONF_POLL_INTERVAL,
+    DATA_SET_TEMP,
+    DOMAIN,
+)
+from custom_components.fischer_fancoil.host_registry import HostRegistry
+from custom_components.fischer_fancoil.register_map import COMPILED_REGISTER_MAP
+
+
+@pytest.mark.parametrize("key", [CONF_POLL_INTERVAL, CONF_MAX_POLL_INTERVAL])
+def test_poll_intervals_are_at_least_a_second(key):
+    """A poll interval of 0 would leave the scheduler no time between polls."""
+    with pytest.raises(vol.Invalid):
+        options_schema({key: 0})
+    assert options_schema({key: 1})[key] == 1
+
+
+@pytest.mark.parametrize("pipeline_depth", [1, 3])
+async def test_scan_keeps_to_the_pipeline_depth_of_the_host(bus, hass, pipeline_depth):
+    """A gateway is not sent more requests at once than its entries opted into."""
+    set_temp = COMPILED_REGISTER_MAP.points[DATA_SET_TEMP]
+    for unit_id in bus.unit_ids:
+        bus.values[(unit_id, set_temp.table, set_temp.address)] = 22
+    flow = FischerFancoilConfigFlow()
+    flow.hass = hass
+    registry = hass.data[DOMAIN] = HostRegistry(hass)
+    registry.acquire("127.0.0.1:502", "127.0.0.1", 502).set_pipeline_depth(
+        pipeline_depth
+    )
+
+    assert await flow._async_scan("127.0.0.1", 502, {}, [1, 2, 3]) == [1, 2, 3]
+    assert bus.max_in_flight == pipeline_depth
+    await registry.async_close_all()
@@ -0,0 +1,131 @@
+"""Tests for the coordinator of a fancoil unit."""
+
+from unittest.mock import MagicMock
+
+import pytest
+
+from custom_components.fischer_fancoil.const import (
+    DATA_INDOOR_TEMP,
+    DATA_POWER,
+    DATA_SET_TEMP,
+    DATA_SLEEP,
+    REGISTER_INDOOR_TEMP,
+    REGISTER_POWER,
+    REGISTER_SET_TEMP,
+    REGISTER_SLEEP,
+    TABLE_COIL,
+    TABLE_HOLDING,
+    TABLE_INPUT,
+)
+from custom_components.fischer_fancoil.coordinator import FischerFancoilCoordinator
+from custom_components.fischer_fancoil.register_cache import RegisterCache
+from custom_components.fischer_fancoil.register_map import COMPILED_REGISTER_MAP
+
+
+@pytest.fixture
+def coordinator(bus, make_host, config_entry):
+    """Return the coordinator of unit 1, powered on, polling every register."""
+    modbus_host = make_host(max_retries=1)
+    modbus_host.cache = RegisterCache(default_ttl=0)
+    bus.values[(1, TABLE_COIL, REGISTER_POWER)] = True
+    return FischerFancoilCoordinator(
+        MagicMock(), config_entry, modbus_host, 1, 10, {DATA_INDOOR_TEMP: 1}, 60
+    )
+
+
+async def _poll(coordinator):
+    """Poll the unit and store the data like a refresh does."""
+    coordinator.data = await coordinator._async_update_data()
+    return coordinator.data
+
+
+async def test_first_poll_changes_every_point(coordinator):
+    """The entities write their state after the first poll."""
+    data = await _poll(coordinator)
+
+    assert data.keys() == COMPILED_REGISTER_MAP.points.keys()
+    assert coordinator.changed_keys == data.keys()
+
+
+async def test_only_changed_points_are_reported(bus, coordinator):
+    """A poll reading the same values changes nothing."""
+    await _poll(coordinator)
+    await _poll(coordinator)
+    assert coordinator.changed_keys == set()
+
+    bus.values[(1, TABLE_HOLDING, REGISTER_SET_TEMP)] = 24
+    data = await _poll(coordinator)
+    assert coordinator.changed_keys == {DATA_SET_TEMP}
+    assert data[DATA_SET_TEMP] == 24
+
+
+async def test_changes_within_the_deadband_are_held_back(bus, coordinator):
+    """Small drifts keep the propagated value so they do not add up."""
+    register = (1, TABLE_INPUT, REGISTER_INDOOR_TEMP)
+    bus.values[register] = 0x22
+    await _poll(coordinator)
+
+    bus.values[register] = 0x23
+    assert (await _poll(coordinator))[DATA_INDOOR_TEMP] == 22
+    assert coordinator.changed_keys == set()
+
+    bus.values[register] = 0x24
+    assert (await _poll(coordinator))[DATA_INDOOR_TEMP] == 24
+    assert coordinator.changed_keys == {DATA_INDOOR_TEMP}
+
+
+async def test_points_not_read_keep_their_value(bus, coordinator):
+    """The slow points and the points of a failed block are carried forward."""
+    bus.values[(1, TABLE_COIL, REGISTER_SLEEP)] = True
+    await _poll(coordinator)
+
+    # The coil block is read first and fails
+    bus.failures[1] = 1
+    bus.values[(1, TABLE_COIL, REGISTER_POWER)] = False
+    bus.values[(1, TABLE_HOLDING, REGISTER_SET_TEMP)] = 24
+    data = await _poll(coordinator)
+
+    assert data.keys() == COMPILED_REGISTER_MAP.points.keys()
+    assert data[DATA_POWER] is True
+    assert data[DATA_SLEEP] is True
+    assert coordinator.changed_keys == {DATA_SET_TEMP}
+
+
+async def _intervals(coordinator, polls):
+    """Poll the unit and return the interval after each poll."""
+    intervals = []
+    for _ in range(polls):
+        await _poll(coordinator)
+        intervals.append(coordinator.current_interval)
+    return intervals
+
+
+async def test_stable_unit_backs_off_to_the_maximum(coordinator):
+    """Each poll without changes stretches the interval."""
+    assert await _intervals(coordinator, 7) == pytest.approx(
+        [10, 15, 22.5, 33.75, 50.625, 60, 60]
+    )
+
+
+async def test_unit_that_is_off_backs_off_faster(bus, coordinator):
+    """A unit that is off is not expected to change on its own."""
+    bus.values[(1, TABLE_COIL, REGISTER_POWER)] = False
+
+    assert await _intervals(coordinator, 4) == [10, 20, 40, 60]
+
+
+async def test_change_resets_the_interval(bus, coordinator):
+    """A unit whose values change is polled at the poll interval again."""
+    await _intervals(coordinator, 4)
+    bus.values[(1, TABLE_HOLDING, REGISTER_SET_TEMP)] = 24
+
+    assert await _intervals(coordinator, 2) == [10, 15]
+
+
+async def test_polls_after_a_write_stay_fast(coordinator):
+    """A write is followed by full polls at the poll interval."""
+    await _intervals(coordinator, 4)
+    coordinator.async_note_write()
+    assert coordinator.current_interval == 10
+
+    assert await _intervals(coordinator, 4) == [10, 10, 10, 15]
@@ -0,0 +1,38 @@
+"""Tests for the register history."""
+
+from custom_components.fischer_fancoil.const import TABLE_COIL, TABLE_HOLDING
+from custom_components.fischer_fancoil.history import RegisterHistory
+
+POWER = (TABLE_COIL, 1)
+SET_TEMP = (TABLE_HOLDING, 65)
+
+
+def test_oldest_samples_are_overwritten():
+    """A full history keeps the latest samples, oldest first."""
+    history = RegisterHistory([POWER, SET_TEMP], size=3)
+    for sample in range(5):
+        history.append(100 + sample, {POWER: True, SET_TEMP: 20 + sample})
+
+    timestamps, values = history.query()
+    assert len(history) == 3
+    assert timestamps == [102, 103, 104]
+    assert values == {POWER: [1, 1, 1], SET_TEMP: [22, 23, 24]}
+
+
+def test_registers_a_poll_did_not_read_are_none():
+    """A failed block leaves a gap in the history of its registers."""
+    history = RegisterHistory([POWER, SET_TEMP], size=3)
+    history.append(100, {POWER: False, SET_TEMP: 21})
+    history.append(101, {SET_TEMP: 22})
+
+    assert history.query([POWER]) == ([100, 101], {POWER: [0, None]})
+
+
+def test_query_since_a_time():
+    """Only the samples taken since the time are returned."""
+    history = RegisterHistory([SET_TEMP], size=4)
+    for sample in range(6):
+        history.append(100 + sample, {SET_TEMP: sample})
+
+    assert history.query(since=104) == ([104, 105], {SET_TEMP: [4, 5]})
+    assert history.query(since=200) == ([], {SET_TEMP: []})
@@ -0,0 +1,48 @@
+"""Tests for the host registry."""
+
+import asyncio
+
+from custom_components.fischer_fancoil.host_registry import HostRegistry
+from custom_components.fischer_fancoil.register_map import COMPILED_REGISTER_MAP
+
+
+async def test_close_all_stops_polling(bus, hass):
+    """The host is not reconnected by its scheduler after shutdown."""
+    registry = HostRegistry(hass)
+    modbus_host = registry.acquire("127.0.0.1:502", "127.0.0.1", 502)
+    polls = 0
+
+    async def refresh():
+        nonlocal polls
+        polls += 1
+        await modbus_host.async_read_block(1, COMPILED_REGISTER_MAP.plan)
+
+    modbus_host.scheduler.add_unit(1, 0.05, COMPILED_REGISTER_MAP.plan, refresh)
+    await asyncio.sleep(0.2)
+    await registry.async_close_all()
+    closed_polls = polls
+    await asyncio.sleep(0.2)
+
+    assert polls == closed_polls
+    assert not modbus_host.connected
+    assert all(task.done() for task in hass.background_tasks)
+    assert len(hass.background_tasks) == 2
+    assert modbus_host.set_trace in hass.executor_jobs
+
+
+async def test_entries_share_a_host_until_it_idled_out(bus, hass):
+    """A released host is reused within the idle timeout and closed after."""
+    registry = HostRegistry(hass, idle_timeout=0.05)
+    modbus_host = registry.acquire("127.0.0.1:502", "127.0.0.1", 502)
+    assert registry.acquire("127.0.0.1:502", "127.0.0.1", 502) is modbus_host
+
+    registry.release("127.0.0.1:502")
+    registry.release("127.0.0.1:502")
+    assert registry.acquire("127.0.0.1:502", "127.0.0.1", 502) is modbus_host
+    await asyncio.sleep(0.1)
+    assert registry.get("127.0.0.1:502") is modbus_host
+
+    registry.release("127.0.0.1:502")
+    await asyncio.sleep(0.1)
+    assert registry.get("127.0.0.1:502") is None
+    assert not modbus_host.connected
@@ -0,0 +1,84 @@
+"""Tests for the setup of the config entries."""
+
+import asyncio
+
+from custom_components.fischer_fancoil import (
+    PLATFORMS,
+    _async_apply_host_options,
+    async_setup_entry,
+)
+from custom_components.fischer_fancoil.const import DOMAIN
+from custom_components.fischer_fancoil.host_registry import HostRegistry
+
+HOST_KEY = "127.0.0.1:502"
+
+
+def _set_up(hass, *entries):
+    """Add entries to Home Assistant as if they were set up."""
+    for entry in entries:
+        hass.entries.append(entry)
+        hass.data[entry.entry_id] = None
+
+
+async def test_host_is_traced_while_any_entry_enables_it(bus, hass, make_config_entry):
+    """Setting up another entry of the host does not stop the trace."""
+    registry = hass.data[DOMAIN] = HostRegistry(hass)
+    modbus_host = registry.acquire(HOST_KEY, "127.0.0.1", 502)
+    traced = make_config_entry(1, trace=True)
+    _set_up(hass, traced, make_config_entry(2))
+    await _async_apply_host_options(hass, HOST_KEY)
+    assert modbus_host.trace is not None
+
+    del hass.data[traced.entry_id]
+    await _async_apply_host_options(hass, HOST_KEY)
+    assert modbus_host.trace is None
+    await registry.async_close_all()
+
+
+async def test_host_takes_the_deepest_pipeline_of_its_entries(
+    bus, hass, make_config_entry
+):
+    """The entry set up last does not lower the depth another entry chose."""
+    registry = hass.data[DOMAIN] = HostRegistry(hass)
+    modbus_host = registry.acquire(HOST_KEY, "127.0.0.1", 502)
+    _set_up(hass, make_config_entry(1, pipeline_depth=4))
+    await _async_apply_host_options(hass, HOST_KEY)
+    _set_up(hass, make_config_entry(2, pipeline_depth=2))
+    await _async_apply_host_options(hass, HOST_KEY)
+
+    assert modbus_host.pipeline_depth == 4
+    await registry.async_close_all()
+
+
+async def test_host_takes_the_longest_request_timeout_of_its_entries(
+    bus, hass, make_config_entry
+):
+    """The timeout of an unloaded entry no longer applies."""
+    registry = hass.data[DOMAIN] = HostRegistry(hass)
+    modbus_host = registry.acquire(HOST_KEY, "127.0.0.1", 502)
+    patient = make_config_entry(1, request_timeout=5.0)
+    _set_up(hass, patient, make_config_entry(2, request_timeout=1.0))
+    await _async_apply_host_options(hass, HOST_KEY)
+    assert modbus_host.request_timeout == 5.0
+
+    del hass.data[patient.entry_id]
+    await _async_apply_host_options(hass, HOST_KEY)
+    assert modbus_host.request_timeout == 1.0
+    await registry.async_close_all()
+
+
+async def test_setup_does_not_wait_for_the_first_poll(bus, hass, config_entry):
+    """The platforms are set up while the first poll is still on the bus."""
+    registry = hass.data[DOMAIN] = HostRegistry(hass)
+    hass.entries.append(config_entry)
+    bus.gate.clear()
+
+    assert await async_setup_entry(hass, config_entry)
+    assert hass.forwarded == [(config_entry.entry_id, tuple(PLATFORMS))]
+    coordinator = hass.data[config_entry.entry_id]
+    assert coordinator.data is None
+
+    bus.gate.set()
+    while coordinator.data is None:
+        await asyncio.sleep(0.001)
+    await registry.async_close_all()
@@ -0,0 +1,56 @@
+"""Tests for the Modbus transaction metrics."""
+
+import asyncio
+
+from pymodbus.exceptions import ModbusException, ModbusIOException
+import pytest
+
+from custom_components.fischer_fancoil.metrics import (
+    LatencyHistogram,
+    ModbusMetrics,
+    is_timeout,
+)
+
+
+def test_requests_are_counted_for_the_host_and_the_unit():
+    """Every request counts toward its unit and the host."""
+    metrics = ModbusMetrics()
+    metrics.record_request(1, 0.01, True)
+    metrics.record_request(1, 0.5, False, timeout=True)
+    metrics.record_retry(1)
+    metrics.record_request(2, 0.02, False)
+
+    assert (metrics.unit(1).requests, metrics.unit(1).retries) == (2, 1)
+    assert (metrics.unit(1).failures, metrics.unit(1).timeouts) == (1, 1)
+    assert (metrics.unit(2).failures, metrics.unit(2).timeouts) == (1, 0)
+    assert (metrics.host.requests, metrics.host.failures) == (3, 2)
+    assert list(metrics.as_dict()["units"]) == [1, 2]
+
+
+def test_timeouts_are_told_apart_from_exception_responses():
+    """A unit that did not answer timed out, one that answered an error did not."""
+    assert is_timeout(asyncio.TimeoutError())
+    assert is_timeout(ModbusIOException("no response"))
+    assert not is_timeout(ModbusException("illegal address"))
+    assert not is_timeout(ValueError())
+
+
+def test_durations_fall_in_the_bucket_of_their_upper_bound():
+    """A duration on a bound counts in that bucket, beyond the last in +Inf."""
+    histogram = LatencyHistogram()
+    for duration in (0.001, 0.005, 0.006, 0.3, 10.0):
+        histogram.observe(duration)
+    histogram_dict = histogram.as_dict()
+
+    assert histogram_dict["buckets"]["0.005"] == 2
+    assert histogram_dict["buckets"]["0.01"] == 1
+    assert histogram_dict["buckets"]["0.5"] == 1
+    assert histogram_dict["buckets"]["+Inf"] == 1
+    assert sum(histogram.buckets) == histogram.count == 5
+    assert histogram.mean == pytest.approx(10.312 / 5)
+    assert histogram.max == 10.0
+
+
+def test_empty_histogram_has_no_mean():
+    """A unit without requests reports no mean rather than zero."""
+    assert LatencyHistogram().mean is None
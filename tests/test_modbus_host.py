@@ -0,0 +1,55 @@
+"""Tests for the Modbus host."""
+
+import asyncio
+
+
+async def _read_units(modbus_host, unit_ids=(1, 2, 3)):
+    """Read a register of each unit at once."""
+    return await asyncio.gather(
+        *(
+            modbus_host.async_read_holding_registers(unit_id, 0, 1)
+            for unit_id in unit_ids
+        )
+    )
+
+
+async def test_pipelined_requests_overlap(bus, make_host):
+    """Each request in flight has a connection of its own."""
+    bus.latency = 0.05
+
+    await _read_units(make_host(pipeline_depth=1))
+    assert bus.max_in_flight == 1
+    assert len(bus.clients) == 1
+
+    await _read_units(make_host(pipeline_depth=3))
+    assert bus.max_in_flight == 3
+    assert len(bus.clients) == 4
+
+
+async def test_lowering_pipeline_depth_closes_extra_connections(bus, make_host):
+    """Connections beyond the pipeline depth are closed once idle."""
+    modbus_host = make_host(pipeline_depth=3)
+    await _read_units(modbus_host)
+    modbus_host.set_pipeline_depth(1)
+    await modbus_host.async_read_holding_registers(1, 0, 1)
+
+    assert [client.connected for client in bus.clients] == [True, False, False]
+
+
+async def test_disconnect_closes_every_connection(bus, make_host):
+    """The connections of the pipelined requests are closed with the main one."""
+    modbus_host = make_host(pipeline_depth=3)
+    await _read_units(modbus_host)
+    await modbus_host.async_disconnect()
+
+    assert [client.closes for client in bus.clients] == [1, 1, 1]
+    assert not modbus_host.connected
+
+
+async def test_abandoned_request_resyncs_only_its_connection(bus, make_host):
+    """A timed out request drops its own connection, not the others."""
+    bus.absent.add(2)
+    modbus_host = make_host(pipeline_depth=2, max_retries=1, request_timeout=0.1)
+
+    assert await _read_units(modbus_host, (1, 2)) == [[0], None]
+    assert sorted(client.closes for client in bus.clients) == [0, 1]
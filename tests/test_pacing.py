@@ -0,0 +1,38 @@
+"""Tests for the adaptive inter-frame pacing."""
+
+import pytest
+
+from custom_components.fischer_fancoil.pacing import AdaptivePacer
+
+
+def _gaps(pacer, outcomes, latency=0.0):
+    """Record the outcomes of requests to unit 1 and return the gap after each."""
+    gaps = []
+    for success in outcomes:
+        pacer.record(1, latency, success)
+        gaps.append(pacer.get_gap(1))
+    return gaps
+
+
+def test_gap_grows_after_failures_up_to_the_maximum():
+    """A unit that fails gets more time between frames."""
+    pacer = AdaptivePacer()
+
+    assert _gaps(pacer, [False] * 5) == pytest.approx([0.1, 0.2, 0.4, 0.8, 1.0])
+    assert pacer.get_gap(2) == pytest.approx(0.05)
+
+
+def test_gap_shrinks_back_after_successes():
+    """A unit that answers again loses the gap down to the minimum."""
+    pacer = AdaptivePacer(min_gap=0.01)
+    _gaps(pacer, [False] * 3)
+
+    assert _gaps(pacer, [True] * 3) == pytest.approx([0.32, 0.256, 0.2048])
+    assert _gaps(pacer, [True] * 30)[-1] == pytest.approx(0.01)
+
+
+def test_gap_keeps_a_share_of_the_response_time():
+    """A slow unit keeps a gap in proportion to its response time."""
+    pacer = AdaptivePacer()
+
+    assert _gaps(pacer, [True] * 30, latency=0.4)[-1] == pytest.approx(0.1)
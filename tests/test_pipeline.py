@@ -0,0 +1,79 @@
+"""Tests for the request pipeline."""
+
+import asyncio
+import time
+
+import pytest
+
+from custom_components.fischer_fancoil.const import TABLE_COIL, TABLE_HOLDING
+from custom_components.fischer_fancoil.retry import CircuitBreaker
+
+
+@pytest.mark.parametrize(
+    ("call", "method", "result"),
+    [
+        (lambda host: host.async_read_coil(1, 5), "read_coils", True),
+        (lambda host: host.async_read_coils(1, 5, 2), "read_coils", [True, False]),
+        (
+            lambda host: host.async_read_holding_registers(1, 5, 1),
+            "read_holding_registers",
+            [7],
+        ),
+        (
+            lambda host: host.async_read_input_registers(1, 5, 1),
+            "read_input_registers",
+            [0],
+        ),
+        (lambda host: host.async_write_coil(1, 5, True), "write_coil", True),
+        (lambda host: host.async_write_register(1, 5, 9), "write_register", True),
+        (lambda host: host.async_write_coils(1, 5, [True, False]), "write_coils", True),
+        (
+            lambda host: host.async_write_registers(1, 5, [9, 8]),
+            "write_registers",
+            True,
+        ),
+    ],
+)
+async def test_every_function_code_is_retried(bus, make_host, call, method, result):
+    """Reads and writes of every function code go through the same pipeline."""
+    bus.values[(1, TABLE_COIL, 5)] = True
+    bus.values[(1, TABLE_HOLDING, 5)] = 7
+    bus.failures[1] = 1
+    modbus_host = make_host(max_retries=2)
+
+    assert await call(modbus_host) == result
+    assert [request[1] for request in bus.requests] == [method, method]
+    assert modbus_host.metrics.unit(1).retries == 1
+
+
+async def test_cancelled_probe_lets_the_next_probe_through(bus, make_host):
+    """A probe of an open circuit cancelled on the wire does not block it."""
+    bus.failures[1] = 3
+    modbus_host = make_host(max_retries=1)
+    modbus_host.circuit_breaker = CircuitBreaker(reset_timeout=0)
+    for _ in range(3):
+        await modbus_host.async_read_holding_registers(1, 0, 1)
+    assert modbus_host.circuit_breaker.is_open(1)
+
+    bus.gate.clear()
+    probe = asyncio.create_task(modbus_host.async_read_holding_registers(1, 0, 1))
+    while not bus.in_flight:
+        await asyncio.sleep(0.001)
+    probe.cancel()
+    await asyncio.gather(probe, return_exceptions=True)
+    bus.gate.set()
+
+    assert await modbus_host.async_read_holding_registers(1, 0, 1) == [0]
+    assert not modbus_host.circuit_breaker.is_open(1)
+
+
+async def test_request_is_abandoned_at_its_deadline(bus, make_host):
+    """A unit that does not answer fails the request and resyncs its connection."""
+    bus.absent.add(1)
+    modbus_host = make_host(max_retries=2, request_timeout=0.05)
+    start = time.monotonic()
+
+    assert await modbus_host.async_read_holding_registers(1, 0, 1) is None
+    assert time.monotonic() - start < 0.5
+    assert modbus_host.metrics.unit(1).timeouts == 2
+    assert bus.clients[0].closes == 2
@@ -0,0 +1,102 @@
+"""Tests for the bus queue."""
+
+import asyncio
+
+from custom_components.fischer_fancoil.const import TABLE_HOLDING
+from custom_components.fischer_fancoil.priority import (
+    PRIORITY_COMMAND,
+    PRIORITY_CONFIRM,
+    PRIORITY_POLL,
+    BusQueue,
+)
+from custom_components.fischer_fancoil.read_plan import ReadPlan
+from custom_components.fischer_fancoil.register_cache import RegisterCache
+
+PLAN = ReadPlan([(TABLE_HOLDING, 0)])
+
+
+async def test_slots_are_granted_by_priority_then_arrival():
+    """Commands overtake the polls queued before them."""
+    queue = BusQueue()
+    order = []
+
+    async def request(name, unit_id, priority):
+        async with queue.async_slot(unit_id, priority):
+            order.append(name)
+            await asyncio.sleep(0)
+
+    await queue.acquire(9)
+    tasks = [
+        asyncio.create_task(request("poll 1", 1, PRIORITY_POLL)),
+        asyncio.create_task(request("poll 2", 2, PRIORITY_POLL)),
+        asyncio.create_task(request("confirm", 3, PRIORITY_CONFIRM)),
+        asyncio.create_task(request("command", 4, PRIORITY_COMMAND)),
+    ]
+    await asyncio.sleep(0)
+    queue.release(9)
+    await asyncio.gather(*tasks)
+
+    assert order == ["command", "confirm", "poll 1", "poll 2"]
+
+
+async def test_unit_has_a_single_request_in_flight():
+    """A busy unit's requests wait while other units take the free slots."""
+    queue = BusQueue(slots=2)
+    await queue.acquire(1)
+    second = asyncio.create_task(queue.acquire(1, PRIORITY_COMMAND))
+    other = asyncio.create_task(queue.acquire(2))
+    await asyncio.sleep(0)
+
+    assert (second.done(), other.done()) == (False, True)
+    queue.release(1)
+    await second
+
+
+async def test_cancelled_waiter_does_not_hold_a_slot():
+    """A request cancelled while waiting leaves the slot to the next one."""
+    queue = BusQueue()
+    await queue.acquire(1)
+    cancelled = asyncio.create_task(queue.acquire(2))
+    waiting = asyncio.create_task(queue.acquire(3))
+    await asyncio.sleep(0)
+    cancelled.cancel()
+    queue.release(1)
+
+    await asyncio.wait_for(waiting, 1)
+    assert cancelled.cancelled()
+
+
+async def test_command_overtakes_queued_polls(bus, modbus_host):
+    """A write waits for the request on the wire, not for the queued polls."""
+    bus.gate.clear()
+    first = asyncio.create_task(modbus_host.async_read_holding_registers(1, 0, 1))
+    while not bus.in_flight:
+        await asyncio.sleep(0.001)
+    poll = asyncio.create_task(modbus_host.async_read_holding_registers(2, 0, 1))
+    await asyncio.sleep(0.01)
+    write = asyncio.create_task(modbus_host.async_write(3, TABLE_HOLDING, 0, [1]))
+    await asyncio.sleep(0.01)
+    bus.gate.set()
+    await asyncio.gather(first, poll, write)
+
+    assert [request[0] for request in bus.requests] == [1, 3, 2]
+
+
+async def test_newer_poll_supersedes_queued_poll(bus, modbus_host):
+    """A poll that has not reached the bus returns the newer poll's result."""
+    modbus_host.cache = RegisterCache(default_ttl=0)
+    bus.gate.clear()
+    first = asyncio.create_task(modbus_host.async_read_block(1, PLAN))
+    while not bus.in_flight:
+        await asyncio.sleep(0.001)
+    queued = asyncio.create_task(modbus_host.async_read_block(1, PLAN))
+    await asyncio.sleep(0)
+    bus.values[(1, TABLE_HOLDING, 0)] = 7
+    newer = asyncio.create_task(modbus_host.async_read_block(1, PLAN))
+    await asyncio.sleep(0)
+    bus.gate.set()
+
+    assert await first == {(TABLE_HOLDING, 0): 0}
+    assert await queued == await newer == {(TABLE_HOLDING, 0): 7}
+    # The queued poll never reached the bus
+    assert len(bus.requests) == 2
@@ -0,0 +1,67 @@
+"""Tests for block read planning."""
+
+import pytest
+
+from custom_components.fischer_fancoil.const import (
+    TABLE_COIL,
+    TABLE_HOLDING,
+    TABLE_INPUT,
+)
+from custom_components.fischer_fancoil.read_plan import ReadBlock, ReadPlan
+from custom_components.fischer_fancoil.register_map import COMPILED_REGISTER_MAP
+
+
+def test_adjacent_addresses_are_read_together():
+    """Duplicate and adjacent addresses of a table make a single block."""
+    plan = ReadPlan([(TABLE_HOLDING, 67), (TABLE_HOLDING, 65), (TABLE_HOLDING, 66)] * 2)
+
+    assert plan.blocks == (ReadBlock(TABLE_HOLDING, 65, 3),)
+
+
+def test_gaps_up_to_the_maximum_are_read_through():
+    """Unused addresses are read when that saves a request."""
+    points = [(TABLE_HOLDING, 1), (TABLE_HOLDING, 6)]
+
+    assert ReadPlan(points, max_gap=4).blocks == (ReadBlock(TABLE_HOLDING, 1, 6),)
+    assert ReadPlan(points, max_gap=3).blocks == (
+        ReadBlock(TABLE_HOLDING, 1, 1),
+        ReadBlock(TABLE_HOLDING, 6, 1),
+    )
+
+
+def test_tables_are_never_merged():
+    """The same address of different tables takes a request each."""
+    plan = ReadPlan([(TABLE_INPUT, 5), (TABLE_COIL, 5), (TABLE_HOLDING, 5)])
+
+    assert plan.blocks == (
+        ReadBlock(TABLE_COIL, 5, 1),
+        ReadBlock(TABLE_HOLDING, 5, 1),
+        ReadBlock(TABLE_INPUT, 5, 1),
+    )
+
+
+def test_blocks_are_split_at_the_modbus_limit():
+    """A block holds at most 125 registers."""
+    merged = ReadPlan([(TABLE_HOLDING, 0), (TABLE_HOLDING, 124)], max_gap=200)
+    split = ReadPlan([(TABLE_HOLDING, 0), (TABLE_HOLDING, 125)], max_gap=200)
+
+    assert merged.blocks == (ReadBlock(TABLE_HOLDING, 0, 125),)
+    assert split.blocks == (
+        ReadBlock(TABLE_HOLDING, 0, 1),
+        ReadBlock(TABLE_HOLDING, 125, 1),
+    )
+
+
+def test_unknown_table_is_rejected():
+    """A point of an unknown table is a mistake in the register map."""
+    with pytest.raises(ValueError):
+        ReadPlan([("discrete", 1)])
+
+
+def test_register_map_is_read_with_a_request_per_table():
+    """A full poll of a unit takes three requests."""
+    assert COMPILED_REGISTER_MAP.plan.blocks == (
+        ReadBlock(TABLE_COIL, 1, 4),
+        ReadBlock(TABLE_HOLDING, 65, 3),
+        ReadBlock(TABLE_INPUT, 73, 2),
+    )
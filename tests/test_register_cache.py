@@ -0,0 +1,100 @@
+"""Tests for the register cache."""
+
+import asyncio
+from types import SimpleNamespace
+
+from custom_components.fischer_fancoil import register_cache as register_cache_module
+from custom_components.fischer_fancoil.const import (
+    MEASURED_CACHE_TTL,
+    REGISTER_INDOOR_TEMP,
+    REGISTER_SLEEP,
+    SLOW_CACHE_TTL,
+    TABLE_COIL,
+    TABLE_HOLDING,
+    TABLE_INPUT,
+)
+from custom_components.fischer_fancoil.register_cache import RegisterCache
+
+
+def test_values_expire_after_the_ttl_of_their_register(monkeypatch):
+    """A block is only served while every one of its values is fresh."""
+    clock = SimpleNamespace(now=0.0)
+    monkeypatch.setattr(
+        register_cache_module, "time", SimpleNamespace(monotonic=lambda: clock.now)
+    )
+    cache = RegisterCache(default_ttl=10, ttls={(TABLE_HOLDING, 1): 1})
+    cache.put_block(1, TABLE_HOLDING, 0, [5, 6])
+
+    clock.now = 0.5
+    assert cache.get_block(1, TABLE_HOLDING, 0, 2) == [5, 6]
+    clock.now = 2
+    assert cache.get_block(1, TABLE_HOLDING, 0, 1) == [5]
+    assert cache.get_block(1, TABLE_HOLDING, 0, 2) is None
+    assert cache.stats == {"hits": 2, "misses": 1, "size": 2}
+
+
+def test_read_from_before_an_invalidation_is_dropped():
+    """Values of a read that overlapped a write are not stored."""
+    cache = RegisterCache()
+    version = cache.version
+    cache.invalidate(1, TABLE_HOLDING, 0)
+    cache.put_block(1, TABLE_HOLDING, 0, [5], version)
+
+    assert cache.get_block(1, TABLE_HOLDING, 0, 1) is None
+
+
+def test_host_cache_has_the_ttls_of_the_register_map(modbus_host):
+    """Temperatures expire sooner than the settings read by full polls."""
+    cache = modbus_host.cache
+
+    assert cache.get_ttl(TABLE_INPUT, REGISTER_INDOOR_TEMP) == MEASURED_CACHE_TTL
+    assert cache.get_ttl(TABLE_COIL, REGISTER_SLEEP) == SLOW_CACHE_TTL
+
+
+async def test_fresh_reads_are_served_from_the_cache(bus, modbus_host):
+    """A block read again within its TTL does not reach the bus."""
+    assert await modbus_host.async_read_holding_registers(1, 0, 2) == [0, 0]
+    assert await modbus_host.async_read_holding_registers(1, 0, 2) == [0, 0]
+    assert len(bus.requests) == 1
+
+
+async def test_read_during_the_coalescing_window_waits_for_the_write(bus, modbus_host):
+    """A cached value about to be overwritten is not served."""
+    bus.values[(1, TABLE_HOLDING, 0)] = 1
+    assert await modbus_host.async_read_holding_registers(1, 0, 1) == [1]
+    write = asyncio.create_task(modbus_host.async_queue_write(1, TABLE_HOLDING, 0, 2))
+    await asyncio.sleep(0)
+
+    assert await modbus_host.async_read_holding_registers(1, 0, 1) == [2]
+    assert await write
+
+
+async def test_read_overlapping_a_write_is_not_cached(bus, modbus_host):
+    """A read in flight while a write is queued does not cache the old value."""
+    bus.values[(1, TABLE_HOLDING, 0)] = 1
+    bus.gate.clear()
+    read = asyncio.create_task(modbus_host.async_read_holding_registers(1, 0, 1))
+    while not bus.in_flight:
+        await asyncio.sleep(0.001)
+    write = asyncio.create_task(modbus_host.async_write(1, TABLE_HOLDING, 0, [2]))
+    await asyncio.sleep(0)
+    bus.gate.set()
+    await asyncio.gather(read, write)
+
+    assert await modbus_host.async_read_holding_registers(1, 0, 1) == [2]
+    assert len(bus.requests) == 3
+
+
+async def test_read_overlapping_a_broadcast_is_not_cached(bus, make_host):
+    """A read of another unit that outlasts a broadcast is not cached."""
+    bus.values[(1, TABLE_HOLDING, 0)] = 1
+    modbus_host = make_host(pipeline_depth=2)
+    bus.gate.clear()
+    read = asyncio.create_task(modbus_host.async_read_holding_registers(1, 0, 1))
+    while not bus.in_flight:
+        await asyncio.sleep(0.001)
+    await modbus_host.async_broadcast(TABLE_HOLDING, 0, [2])
+    bus.gate.set()
+
+    assert await read == [1]
+    assert await modbus_host.async_read_holding_registers(1, 0, 1) == [2]
@@ -0,0 +1,124 @@
+"""Tests for the register map."""
+
+import pytest
+
+from custom_components.fischer_fancoil.const import (
+    DATA_COIL_TEMP,
+    DATA_FAN_SPEED,
+    DATA_INDOOR_TEMP,
+    DATA_OPMODE,
+    DATA_POWER,
+    DATA_SET_TEMP,
+    DATA_SWING,
+    REGISTER_FAN_SPEED,
+    REGISTER_INDOOR_TEMP,
+    REGISTER_POWER,
+    REGISTER_SWING,
+    TABLE_COIL,
+    TABLE_HOLDING,
+    TABLE_INPUT,
+)
+from custom_components.fischer_fancoil.register_map import (
+    COMPILED_REGISTER_MAP,
+    CompiledRegisterMap,
+    RegisterPoint,
+)
+
+# Points of a map exercising the integer encodings
+SIGNED_MAP = CompiledRegisterMap(
+    [
+        RegisterPoint("offset", TABLE_HOLDING, 10, scale=0.1, signed=True),
+        RegisterPoint("delta", TABLE_HOLDING, 11, width=2, signed=True),
+        RegisterPoint("counter", TABLE_INPUT, 20, width=2),
+        RegisterPoint("flow", TABLE_INPUT, 22, scale=0.5),
+    ]
+)
+
+
+def test_bcd_temperatures_are_decoded():
+    """Each nibble of a BCD register holds a decimal digit."""
+    data = COMPILED_REGISTER_MAP.decode(
+        {(TABLE_INPUT, REGISTER_INDOOR_TEMP): 0x23, (TABLE_INPUT, 74): 0x1234}
+    )
+
+    assert data == {DATA_INDOOR_TEMP: 23, DATA_COIL_TEMP: 1234}
+    assert COMPILED_REGISTER_MAP.encode(DATA_INDOOR_TEMP, 23) == 0x23
+
+
+def test_coils_and_enums_are_decoded():
+    """Enum points decode raw values outside of their options to None."""
+    data = COMPILED_REGISTER_MAP.decode(
+        {
+            (TABLE_COIL, REGISTER_POWER): True,
+            (TABLE_COIL, REGISTER_SWING): False,
+            (TABLE_HOLDING, REGISTER_FAN_SPEED): 9,
+        }
+    )
+
+    assert data == {DATA_POWER: True, DATA_SWING: "off", DATA_FAN_SPEED: None}
+
+
+def test_points_not_in_the_snapshot_are_left_out():
+    """A block that failed to read leaves its points out of the data."""
+    assert COMPILED_REGISTER_MAP.decode({}) == {}
+    assert SIGNED_MAP.decode({(TABLE_INPUT, 20): 1}) == {}
+
+
+@pytest.mark.parametrize(
+    ("key", "value"),
+    [
+        (DATA_POWER, True),
+        (DATA_SWING, "on"),
+        (DATA_SET_TEMP, 22),
+        (DATA_FAN_SPEED, "medium"),
+        (DATA_OPMODE, "fan_only"),
+        (DATA_INDOOR_TEMP, 19),
+    ],
+)
+def test_encoded_values_decode_to_themselves(key, value):
+    """What is written to a point reads back as the same value."""
+    point = COMPILED_REGISTER_MAP.points[key]
+    raw = COMPILED_REGISTER_MAP.encode(key, value)
+
+    assert COMPILED_REGISTER_MAP.decode({(point.table, point.address): raw}) == {
+        key: value
+    }
+
+
+def test_signed_and_scaled_integers_are_decoded():
+    """Signed points use two's complement over all of their registers."""
+    data = SIGNED_MAP.decode(
+        {
+            (TABLE_HOLDING, 10): 0xFFFF,
+            (TABLE_HOLDING, 11): 0xFFFF,
+            (TABLE_HOLDING, 12): 0xFFFE,
+            (TABLE_INPUT, 20): 0x0001,
+            (TABLE_INPUT, 21): 0x0002,
+            (TABLE_INPUT, 22): 7,
+        }
+    )
+
+    assert data == {
+        "offset": pytest.approx(-0.1),
+        "delta": -2,
+        "counter": 0x10002,
+        "flow": 3.5,
+    }
+
+
+def test_signed_integers_are_encoded():
+    """Negative values are written in two's complement."""
+    assert SIGNED_MAP.encode("offset", -0.1) == 0xFFFF
+    assert SIGNED_MAP.encode("offset", 1.5) == 15
+    assert SIGNED_MAP.encode("delta", -2) == 0xFFFFFFFE
+
+
+def test_register_map_is_compiled_into_plans_per_poll():
+    """Polls without the slow points read fewer coils."""
+    assert COMPILED_REGISTER_MAP.slow_keys <= COMPILED_REGISTER_MAP.points.keys()
+    assert len(COMPILED_REGISTER_MAP.fast_plan.points) == len(
+        COMPILED_REGISTER_MAP.plan.points
+    ) - len(COMPILED_REGISTER_MAP.slow_keys)
+    assert COMPILED_REGISTER_MAP.point_plans[DATA_SET_TEMP].points == (
+        (TABLE_HOLDING, 65),
+    )
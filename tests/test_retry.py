@@ -0,0 +1,88 @@
+"""Tests for the retry policy and the circuit breaker."""
+
+import random
+
+import pytest
+
+from custom_components.fischer_fancoil.const import TABLE_HOLDING
+from custom_components.fischer_fancoil.retry import CircuitBreaker, RetryPolicy
+
+
+def test_delays_back_off_exponentially_up_to_the_maximum():
+    """Each failed attempt doubles the delay until it reaches the maximum."""
+    policy = RetryPolicy(base_delay=0.5, max_delay=5, jitter=0)
+
+    assert [policy.get_delay(attempt) for attempt in range(5)] == [0.5, 1, 2, 4, 5]
+
+
+def test_jitter_shortens_the_delay(monkeypatch):
+    """Retries of units that failed together do not go out together."""
+    policy = RetryPolicy(base_delay=1, jitter=0.5)
+    monkeypatch.setattr(random, "random", lambda: 1.0)
+
+    assert policy.get_delay(1) == pytest.approx(1)
+
+
+def test_circuit_lets_a_single_probe_through_after_the_timeout():
+    """An open circuit is closed by a successful probe and reopened by a failed one."""
+    circuit_breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0)
+    circuit_breaker.record_failure(1)
+    assert not circuit_breaker.is_open(1)
+    circuit_breaker.record_failure(1)
+    assert circuit_breaker.is_open(1)
+
+    assert circuit_breaker.allow(1)
+    assert not circuit_breaker.allow(1)
+    circuit_breaker.record_failure(1)
+    assert circuit_breaker.is_open(1)
+
+    assert circuit_breaker.allow(1)
+    circuit_breaker.record_success(1)
+    assert not circuit_breaker.is_open(1)
+    assert circuit_breaker.allow(1)
+
+
+def test_open_circuit_skips_requests_until_the_timeout():
+    """No probe goes out before the reset timeout passed."""
+    circuit_breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60)
+    circuit_breaker.record_failure(1)
+
+    assert not circuit_breaker.allow(1)
+    assert circuit_breaker.allow(2)
+
+
+async def test_failed_request_is_retried(bus, make_host):
+    """A request is retried until the unit answers."""
+    bus.failures[1] = 2
+    modbus_host = make_host(max_retries=3)
+
+    assert await modbus_host.async_read_holding_registers(1, 0, 2) == [0, 0]
+    assert modbus_host.metrics.unit(1).retries == 2
+    assert len(bus.requests) == 3
+
+
+async def test_circuit_opens_after_consecutive_failures(bus, make_host):
+    """A unit that stopped answering is skipped until the reset timeout."""
+    bus.failures[1] = 100
+    modbus_host = make_host(max_retries=1)
+    for _ in range(3):
+        assert await modbus_host.async_read_holding_registers(1, 0, 1) is None
+    assert len(bus.requests) == 3
+
+    assert await modbus_host.async_read_holding_registers(1, 0, 1) is None
+    assert modbus_host.circuit_breaker.is_open(1)
+    assert len(bus.requests) == 3
+
+
+async def test_command_to_a_unit_with_an_open_circuit_is_sent(bus, make_host):
+    """A unit that came back takes the command and is polled again."""
+    modbus_host = make_host(max_retries=1)
+    modbus_host.circuit_breaker = CircuitBreaker(failure_threshold=1)
+    bus.failures[1] = 1
+    assert await modbus_host.async_read_holding_registers(1, 0, 1) is None
+    assert await modbus_host.async_read_holding_registers(1, 0, 1) is None
+    assert len(bus.requests) == 1
+
+    assert await modbus_host.async_write(1, TABLE_HOLDING, 0, [1])
+    assert not modbus_host.circuit_breaker.is_open(1)
+    assert await modbus_host.async_read_holding_registers(1, 0, 1) == [1]
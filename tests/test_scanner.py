@@ -0,0 +1,71 @@
+"""Tests for the unit scanner."""
+
+import time
+
+from custom_components.fischer_fancoil.const import (
+    DATA_SET_TEMP,
+    TABLE_HOLDING,
+    TRANSPORT_RTU_OVER_TCP,
+)
+from custom_components.fischer_fancoil.read_plan import ReadPlan
+from custom_components.fischer_fancoil.register_map import COMPILED_REGISTER_MAP
+from custom_components.fischer_fancoil.scanner import (
+    DEFAULT_SCAN_PARALLELISM,
+    async_scan_units,
+    is_fancoil,
+)
+
+PLAN = ReadPlan([(TABLE_HOLDING, 0)])
+
+
+async def test_absent_units_are_probed_in_parallel(bus, make_host):
+    """Scanning costs about one probe timeout per batch of units."""
+    set_temp = COMPILED_REGISTER_MAP.points[DATA_SET_TEMP]
+    bus.values[(2, set_temp.table, set_temp.address)] = 22
+    modbus_host = make_host(pipeline_depth=DEFAULT_SCAN_PARALLELISM)
+    start = time.monotonic()
+    found = await async_scan_units(modbus_host, range(1, 17), timeout=0.2)
+
+    assert list(found) == [2]
+    # Two batches of eight units, most of them absent
+    assert time.monotonic() - start < 4 * 0.2
+    assert not any(client.closes for client in bus.clients)
+
+
+async def test_unit_with_other_values_is_not_a_fancoil(bus, modbus_host):
+    """A device answering with values out of range is skipped."""
+    set_temp = COMPILED_REGISTER_MAP.points[DATA_SET_TEMP]
+    bus.values[(1, set_temp.table, set_temp.address)] = 22
+    bus.values[(2, set_temp.table, set_temp.address)] = 99
+
+    assert list(await async_scan_units(modbus_host, [1, 2], timeout=0.2)) == [1]
+
+
+def test_fancoil_is_recognised_by_its_values():
+    """Every point decodes and the target temperature is in range."""
+    data = COMPILED_REGISTER_MAP.decode(
+        {register: 0 for register in COMPILED_REGISTER_MAP.plan.points}
+    )
+    assert not is_fancoil(data)
+
+    data[DATA_SET_TEMP] = 22
+    assert is_fancoil(data)
+    del data[DATA_SET_TEMP]
+    assert not is_fancoil(data)
+
+
+async def test_probe_timeout_keeps_tcp_connection(bus, modbus_host):
+    """An absent unit does not cost a reconnect behind a TCP gateway."""
+    bus.absent.add(5)
+
+    assert await modbus_host.async_probe(5, PLAN, 0.05) is None
+    assert [client.closes for client in bus.clients] == [0]
+
+
+async def test_probe_timeout_resyncs_rtu_connection(bus, make_host):
+    """A late RTU frame could be taken for the next response."""
+    bus.absent.add(5)
+    modbus_host = make_host(transport=TRANSPORT_RTU_OVER_TCP)
+
+    assert await modbus_host.async_probe(5, PLAN, 0.05) is None
+    assert [client.closes for client in bus.clients] == [1]
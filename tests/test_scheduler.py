@@ -0,0 +1,113 @@
+"""Tests for the bus scheduler."""
+
+import asyncio
+from functools import partial
+
+import pytest
+
+from custom_components.fischer_fancoil.const import TABLE_HOLDING
+from custom_components.fischer_fancoil.read_plan import ReadPlan
+from custom_components.fischer_fancoil.register_map import COMPILED_REGISTER_MAP
+
+# A read plan of a single request, a third of the register map's
+PLAN = ReadPlan([(TABLE_HOLDING, 65)])
+
+
+async def _schedule(scheduler, units):
+    """Schedule (unit_id, interval, plan) units and wait for their first polls."""
+    polled = []
+
+    async def refresh(unit_id):
+        polled.append(unit_id)
+
+    removers = {
+        unit_id: scheduler.add_unit(unit_id, interval, plan, partial(refresh, unit_id))
+        for unit_id, interval, plan in units
+    }
+    while len(polled) < len(units):
+        await asyncio.sleep(0.01)
+    # Let the last refresh schedule the next polls
+    await asyncio.sleep(0.01)
+    return polled, removers
+
+
+async def test_new_units_are_polled_right_away(modbus_host):
+    """The first polls of the units go out back to back."""
+    scheduler = modbus_host.scheduler
+    polled, _ = await _schedule(
+        scheduler, [(1, 10, COMPILED_REGISTER_MAP.plan), (2, 10, PLAN)]
+    )
+    await scheduler.async_stop()
+
+    assert polled == [1, 2]
+
+
+async def test_polls_are_spread_over_the_interval_by_weight(modbus_host):
+    """Each unit gets a slot of the cycle proportional to its requests."""
+    scheduler = modbus_host.scheduler
+    await _schedule(scheduler, [(1, 10, COMPILED_REGISTER_MAP.plan), (2, 10, PLAN)])
+
+    # Three requests of the four of a cycle go to unit 1
+    assert scheduler.time_until_due(1) == pytest.approx(7.5, abs=0.1)
+    assert scheduler.time_until_due(2) == pytest.approx(10, abs=0.1)
+    await scheduler.async_stop()
+
+
+async def test_removed_unit_hands_its_slot_to_the_others(modbus_host):
+    """The remaining units are spread over the whole interval again."""
+    scheduler = modbus_host.scheduler
+    _, removers = await _schedule(
+        scheduler, [(1, 10, COMPILED_REGISTER_MAP.plan), (2, 10, PLAN)]
+    )
+    removers[2]()
+
+    assert scheduler.time_until_due(1) == pytest.approx(10, abs=0.1)
+    assert scheduler.time_until_due(2) is None
+    await scheduler.async_stop()
+
+
+async def test_shorter_interval_pulls_the_next_poll_closer(modbus_host):
+    """A unit that turned active does not wait out its long interval."""
+    scheduler = modbus_host.scheduler
+    await _schedule(scheduler, [(1, 60, PLAN)])
+    scheduler.set_interval(1, 2)
+
+    assert scheduler.time_until_due(1) == pytest.approx(2, abs=0.1)
+    await scheduler.async_stop()
+
+
+async def test_stopped_scheduler_polls_no_more(modbus_host):
+    """Units are no longer polled once the scheduler stopped."""
+    scheduler = modbus_host.scheduler
+    polls = []
+
+    async def refresh():
+        polls.append(None)
+
+    scheduler.add_unit(1, 0.05, PLAN, refresh)
+    await asyncio.sleep(0.2)
+    await scheduler.async_stop()
+    stopped_polls = len(polls)
+    await asyncio.sleep(0.2)
+
+    assert stopped_polls > 1
+    assert len(polls) == stopped_polls
+    assert scheduler.time_until_due(1) is None
+
+
+async def test_saturated_bus_stretches_the_cycle_until_it_recovers(modbus_host):
+    """Refreshes overrunning their slots back off the polls, fast ones recover."""
+    scheduler = modbus_host.scheduler
+    refresh_time = [0.05]
+
+    async def refresh():
+        await asyncio.sleep(refresh_time[0])
+
+    scheduler.add_unit(1, 0.02, PLAN, refresh)
+    while scheduler.backoff < 2:
+        await asyncio.sleep(0.01)
+
+    refresh_time[0] = 0
+    while scheduler.backoff > 1:
+        await asyncio.sleep(0.01)
+    await scheduler.async_stop()
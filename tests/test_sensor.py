@@ -0,0 +1,88 @@
+"""Tests for the sensors."""
+
+from types import SimpleNamespace
+
+from homeassistant.components.sensor import SensorDeviceClass
+
+from custom_components.fischer_fancoil.const import (
+    DATA_COIL_TEMP,
+    DATA_INDOOR_TEMP,
+    DATA_OPMODE,
+    DATA_POWER,
+)
+from custom_components.fischer_fancoil.register_map import COMPILED_REGISTER_MAP
+from custom_components.fischer_fancoil.sensor import (
+    BOOL_OPTIONS,
+    FischerFancoilMetricSensor,
+    FischerFancoilSensor,
+    async_setup_entry,
+)
+
+
+async def _point_sensors(hass, entry, data=None):
+    """Set up the sensors of an entry and return those of the points by key."""
+    hass.data[entry.entry_id] = SimpleNamespace(modbus_host=None, data=data)
+    entities = []
+    await async_setup_entry(hass, entry, entities.extend)
+    return {
+        sensor._data_key: sensor
+        for sensor in entities
+        if isinstance(sensor, FischerFancoilSensor)
+    }
+
+
+async def test_every_point_has_a_sensor(hass, config_entry):
+    """The sensors follow the register map."""
+    sensors = await _point_sensors(hass, config_entry)
+
+    assert sensors.keys() == COMPILED_REGISTER_MAP.points.keys()
+    assert sensors[DATA_INDOOR_TEMP].device_class == SensorDeviceClass.TEMPERATURE
+    assert sensors[DATA_POWER].options == BOOL_OPTIONS
+    point = COMPILED_REGISTER_MAP.points[DATA_OPMODE]
+    assert sensors[DATA_OPMODE].options == list(point.options.values())
+
+
+async def test_point_sensors_have_unique_ids_per_host(hass, make_config_entry):
+    """Units sharing a unit ID on different hosts do not clash."""
+    sensors = await _point_sensors(hass, make_config_entry(1))
+
+    assert sensors[DATA_INDOOR_TEMP].unique_id == (
+        f"fischer_fancoil_127.0.0.1:502_1_{DATA_INDOOR_TEMP}"
+    )
+    unique_ids = [sensor.unique_id for sensor in sensors.values()]
+    assert len(set(unique_ids)) == len(unique_ids)
+
+
+async def test_coil_sensor_keeps_its_legacy_unique_id(hass, config_entry):
+    """The coil temperature sensor predates the other sensors."""
+    sensors = await _point_sensors(hass, config_entry)
+
+    assert sensors[DATA_COIL_TEMP].unique_id == "fischer_fancoil_1_74"
+
+
+async def test_point_sensors_show_polled_data(hass, config_entry):
+    """Sensors added after the first poll show its values."""
+    sensors = await _point_sensors(
+        hass, config_entry, {DATA_INDOOR_TEMP: 22, DATA_POWER: True}
+    )
+
+    assert sensors[DATA_INDOOR_TEMP].native_value == 22
+    assert sensors[DATA_POWER].native_value == "on"
+
+
+def test_metric_sensor_only_writes_changed_metrics(modbus_host):
+    """Polls that leave a metric unchanged do not write its state."""
+    coordinator = SimpleNamespace(modbus_host=modbus_host)
+    sensor = FischerFancoilMetricSensor(
+        coordinator, "Modbus retries", 1, "retries", None, "retries"
+    )
+    written = []
+    sensor.async_write_ha_state = lambda: written.append(sensor.native_value)
+
+    sensor._handle_coordinator_update()
+    sensor._handle_coordinator_update()
+    modbus_host.metrics.record_retry(1)
+    sensor._handle_coordinator_update()
+
+    assert written == [0, 1]
+    assert not sensor.entity_registry_enabled_default
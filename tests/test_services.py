@@ -0,0 +1,81 @@
+"""Tests for the services."""
+
+from custom_components.fischer_fancoil.const import (
+    DATA_FAN_SPEED,
+    DATA_OPMODE,
+    DATA_POWER,
+    DATA_SET_TEMP,
+    DATA_SLEEP,
+    REGISTER_SET_TEMP,
+    TABLE_HOLDING,
+)
+from custom_components.fischer_fancoil.services import _async_set_units
+
+
+class FakeCoordinator:
+    """Coordinator of a unit, counting the writes it was told about."""
+
+    def __init__(self, unit_id) -> None:
+        """Initialize the coordinator."""
+        self.unit_id = unit_id
+        self.noted_writes = 0
+
+    def async_note_write(self):
+        """Count a write to the unit."""
+        self.noted_writes += 1
+
+
+async def test_adjacent_points_are_written_with_a_request_per_table(bus, modbus_host):
+    """The settings of each unit go out as a write_coils and a write_registers."""
+    coordinators = [FakeCoordinator(1), FakeCoordinator(2)]
+    values = {
+        DATA_POWER: True,
+        DATA_SLEEP: True,
+        DATA_SET_TEMP: 22,
+        DATA_FAN_SPEED: "low",
+        DATA_OPMODE: "heat",
+    }
+    failed = await _async_set_units(modbus_host, coordinators, values, False)
+
+    assert failed == {coordinator: [] for coordinator in coordinators}
+    assert [request[:4] for request in bus.writes()] == [
+        (1, "write_coils", 1, [True, True]),
+        (1, "write_registers", 65, [22, 3, 3]),
+        (2, "write_coils", 1, [True, True]),
+        (2, "write_registers", 65, [22, 3, 3]),
+    ]
+    assert [coordinator.noted_writes for coordinator in coordinators] == [1, 1]
+
+
+async def test_units_that_failed_a_write_report_its_points(bus, make_host):
+    """A unit that does not answer fails, the others succeed."""
+    bus.failures[2] = 100
+    modbus_host = make_host(max_retries=1)
+    first, second = FakeCoordinator(1), FakeCoordinator(2)
+    values = {DATA_SET_TEMP: 22, DATA_FAN_SPEED: "low"}
+    failed = await _async_set_units(modbus_host, [first, second], values, False)
+
+    assert failed == {first: [], second: [DATA_SET_TEMP, DATA_FAN_SPEED]}
+
+
+async def test_broadcast_is_read_back_from_every_unit(bus, modbus_host):
+    """A single broadcast goes out and each unit confirms the values."""
+    bus.read_only.add((2, TABLE_HOLDING, REGISTER_SET_TEMP))
+    first, second = FakeCoordinator(1), FakeCoordinator(2)
+    failed = await _async_set_units(
+        modbus_host, [first, second], {DATA_SET_TEMP: 22}, True
+    )
+
+    assert failed == {first: [], second: [DATA_SET_TEMP]}
+    assert [request[:2] for request in bus.writes()] == [(0, "write_register")]
+    assert bus.values[(3, TABLE_HOLDING, REGISTER_SET_TEMP)] == 22
+
+
+async def test_broadcast_is_only_sent_unanswered_to_unit_0(bus, modbus_host):
+    """The client sends unit 0 unanswered only while broadcasting."""
+    assert await modbus_host.async_broadcast(TABLE_HOLDING, 5, [19])
+    assert await modbus_host.async_write(1, TABLE_HOLDING, 6, [1])
+
+    assert [request[4] for request in bus.requests] == [True, False]
+    assert all(bus.values[(unit_id, TABLE_HOLDING, 5)] == 19 for unit_id in (1, 2, 3))
+    assert not any(client.broadcast_enable for client in bus.clients)
@@ -0,0 +1,69 @@
+"""Tests for the transaction trace."""
+
+from benchmarks.replay import _request
+from custom_components.fischer_fancoil.const import TABLE_COIL, TABLE_HOLDING
+from custom_components.fischer_fancoil.register_cache import RegisterCache
+from custom_components.fischer_fancoil.trace import (
+    ERROR_NONE,
+    ERROR_RESPONSE,
+    MAX_TRACE_VALUES,
+    READ_FUNCTION_CODES,
+    TraceRecorder,
+    read_trace,
+)
+
+
+def test_ring_keeps_the_latest_records(tmp_path):
+    """Once full, the oldest records are overwritten."""
+    path = tmp_path / "ring.trace"
+    recorder = TraceRecorder(path, records=3)
+    for index in range(5):
+        recorder.record(100 + index, 1, 3, index, 1, ERROR_NONE, 0.01, [index])
+    recorder.close()
+
+    trace = read_trace(path)
+    assert [record.timestamp for record in trace] == [102, 103, 104]
+    assert [record.values for record in trace] == [(2,), (3,), (4,)]
+
+
+def test_trace_of_the_same_size_is_continued(tmp_path):
+    """Reopening a trace appends to it, values beyond the limit are cut."""
+    path = tmp_path / "resume.trace"
+    recorder = TraceRecorder(path, records=4)
+    recorder.record(100, 1, 3, 65, 3, ERROR_NONE, 0.25, [22, 3, 1])
+    recorder.close()
+    recorder = TraceRecorder(path, records=4)
+    recorder.record(101, 2, 16, 0, 20, ERROR_RESPONSE, 0.5, range(20))
+    recorder.close()
+
+    first, second = read_trace(path)
+    assert first == (100, 1, 3, 65, 3, ERROR_NONE, 0.25, (22, 3, 1))
+    assert second.unit_id == 2
+    assert second.latency == 0.5
+    assert second.values == tuple(range(MAX_TRACE_VALUES))
+
+
+async def test_recorded_transactions_replay_the_same(tmp_path, bus, make_host):
+    """A trace recorded by a host replays to the same values."""
+    path = str(tmp_path / "host.trace")
+    modbus_host = make_host()
+    modbus_host.cache = RegisterCache(default_ttl=0)
+    modbus_host.set_trace(path)
+    assert await modbus_host.async_write(1, TABLE_HOLDING, 65, [22, 3])
+    assert await modbus_host.async_write(1, TABLE_COIL, 1, [True])
+    await modbus_host.async_read_holding_registers(1, 65, 3)
+    await modbus_host.async_read_coils(1, 1, 2)
+    modbus_host.set_trace(None)
+
+    trace = read_trace(path)
+    assert [record.function_code for record in trace] == [16, 5, 3, 1]
+    assert trace[2].values == (22, 3, 0)
+
+    replay_host = make_host()
+    replay_host.cache = RegisterCache(default_ttl=0)
+    for record in trace:
+        result = await _request(replay_host, record)
+        if record.function_code in READ_FUNCTION_CODES:
+            assert tuple(result) == record.values
+        else:
+            assert result
@@ -0,0 +1,64 @@
+"""Tests for the Modbus transports."""
+
+from pymodbus.client import AsyncModbusSerialClient, AsyncModbusTcpClient
+from pymodbus.framer import ModbusRtuFramer, ModbusSocketFramer
+import pytest
+
+from custom_components.fischer_fancoil.const import (
+    TRANSPORT_RTU_OVER_TCP,
+    TRANSPORT_SERIAL,
+    TRANSPORT_TCP,
+)
+from custom_components.fischer_fancoil.transport import (
+    RTU_FIXED_FRAME_GAP,
+    create_client,
+    rtu_frame_gap,
+)
+
+
+@pytest.mark.parametrize(
+    ("baudrate", "parity", "stopbits", "gap"),
+    [
+        # 3.5 characters of a start bit, 8 data bits and the other bits
+        (2400, "E", 1, 3.5 * 11 / 2400),
+        (9600, "N", 1, 3.5 * 10 / 9600),
+        (9600, "N", 2, 3.5 * 11 / 9600),
+        (19200, "O", 1, 3.5 * 11 / 19200),
+        # Fixed above 19200 baud
+        (38400, "N", 1, RTU_FIXED_FRAME_GAP),
+        (115200, "E", 2, RTU_FIXED_FRAME_GAP),
+    ],
+)
+def test_frame_gap_is_three_and_a_half_characters(baudrate, parity, stopbits, gap):
+    """The silent interval between frames follows the character time."""
+    assert rtu_frame_gap(baudrate, 8, parity, stopbits) == pytest.approx(gap)
+
+
+async def test_tcp_transports_differ_in_their_framing():
+    """RTU over TCP sends RTU frames to the gateway instead of MBAP ones."""
+    tcp = create_client(TRANSPORT_TCP, "192.168.1.10", 502, timeout=3)
+    rtu_over_tcp = create_client(TRANSPORT_RTU_OVER_TCP, "192.168.1.10", 4196)
+
+    assert isinstance(tcp, AsyncModbusTcpClient)
+    assert isinstance(tcp.framer, ModbusSocketFramer)
+    assert (tcp.comm_params.host, tcp.comm_params.port) == ("192.168.1.10", 502)
+    assert tcp.comm_params.timeout_connect == 3
+    assert isinstance(rtu_over_tcp, AsyncModbusTcpClient)
+    assert isinstance(rtu_over_tcp.framer, ModbusRtuFramer)
+    assert rtu_over_tcp.comm_params.port == 4196
+
+
+async def test_serial_transport_opens_the_device_of_the_host():
+    """The host of a serial transport is its device path."""
+    client = create_client(TRANSPORT_SERIAL, "/dev/ttyUSB0", 0, 19200, 8, "E", 1)
+
+    assert isinstance(client, AsyncModbusSerialClient)
+    assert isinstance(client.framer, ModbusRtuFramer)
+    assert client.comm_params.host == "/dev/ttyUSB0"
+    assert (client.comm_params.baudrate, client.comm_params.parity) == (19200, "E")
+
+
+def test_unknown_transport_is_rejected():
+    """A transport from a newer version of the entry is not guessed at."""
+    with pytest.raises(ValueError):
+        create_client("udp", "192.168.1.10", 502)
@@ -0,0 +1,56 @@
+"""Tests for write coalescing."""
+
+import asyncio
+
+from custom_components.fischer_fancoil.const import TABLE_HOLDING
+
+
+async def test_writes_within_the_window_are_coalesced(bus, modbus_host):
+    """Only the last value of a register goes out, adjacent ones together."""
+    results = await asyncio.gather(
+        modbus_host.async_queue_write(1, TABLE_HOLDING, 10, 1),
+        modbus_host.async_queue_write(1, TABLE_HOLDING, 10, 2),
+        modbus_host.async_queue_write(1, TABLE_HOLDING, 11, 3),
+        modbus_host.async_queue_write(2, TABLE_HOLDING, 10, 4),
+    )
+
+    assert results == [True, True, True, True]
+    assert [request[:4] for request in bus.writes()] == [
+        (1, "write_registers", 10, [2, 3]),
+        (2, "write_register", 10, 4),
+    ]
+
+
+async def test_failed_write_is_reported_to_every_waiter(bus, make_host):
+    """Every write merged into a failed request reports the failure."""
+    bus.failures[1] = 100
+    modbus_host = make_host(max_retries=1)
+    results = await asyncio.gather(
+        modbus_host.async_queue_write(1, TABLE_HOLDING, 10, 1),
+        modbus_host.async_queue_write(1, TABLE_HOLDING, 11, 2),
+    )
+
+    assert results == [False, False]
+    assert len(bus.writes()) == 1
+
+
+async def test_close_fails_the_queued_writes(bus, modbus_host):
+    """Writes still collected when the queue closes are never sent."""
+    write = asyncio.create_task(modbus_host.async_queue_write(1, TABLE_HOLDING, 10, 1))
+    await asyncio.sleep(0)
+    await modbus_host.write_queue.async_close()
+
+    assert await write is False
+    assert not bus.writes()
+
+
+async def test_close_fails_the_write_being_sent(bus, modbus_host):
+    """A flush cancelled on the wire reports its writes as failed."""
+    bus.gate.clear()
+    write = asyncio.create_task(modbus_host.async_queue_write(1, TABLE_HOLDING, 10, 1))
+    while not bus.in_flight:
+        await asyncio.sleep(0.001)
+    await modbus_host.write_queue.async_close()
+
+    assert await asyncio.wait_for(write, 1) is False
+    await asyncio.wait_for(modbus_host.write_queue.async_wait_idle(), 1)